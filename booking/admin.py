@@ -1,9 +1,60 @@
+from django import forms
 from django.contrib import admin
-from .models import Truck
+from .availability import TruckUnavailable, check_reservation, reserve_truck
+from .models import Truck, TierRate, PricingSurcharge, LaneRate, TruckReservation
 
 # Register your models here.
 
 @admin.register(Truck)
 class TruckAdmin(admin.ModelAdmin):
     list_display = ('name', 'tracker_id')
-    search_fields = ('name', 'tracker_id')
\ No newline at end of file
+    search_fields = ('name', 'tracker_id')
+
+@admin.register(TierRate)
+class TierRateAdmin(admin.ModelAdmin):
+    list_display = ('weight_tier', 'base_fare', 'per_km_rate', 'minimum_fare', 'updated_at')
+
+
+@admin.register(PricingSurcharge)
+class PricingSurchargeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'weight_tier', 'pickup_state', 'destination_state', 'percent', 'flat_amount', 'active')
+    list_filter = ('active', 'weight_tier')
+
+
+@admin.register(LaneRate)
+class LaneRateAdmin(admin.ModelAdmin):
+    list_display = ('pickup_state', 'destination_state', 'weight_tier', 'cost')
+    list_filter = ('weight_tier',)
+    search_fields = ('pickup_state', 'destination_state')
+
+
+class TruckReservationAdminForm(forms.ModelForm):
+    class Meta:
+        model = TruckReservation
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        truck, start_date, end_date = (cleaned_data.get(field) for field in ('truck', 'start_date', 'end_date'))
+        if truck and start_date and end_date:
+            try:
+                check_reservation(
+                    truck.pk, start_date, end_date, booking=cleaned_data.get('booking'),
+                    reservation=self.instance,
+                )
+            except (ValueError, TruckUnavailable) as e:
+                raise forms.ValidationError(str(e))
+        return cleaned_data
+
+
+@admin.register(TruckReservation)
+class TruckReservationAdmin(admin.ModelAdmin):
+    form = TruckReservationAdminForm
+    list_display = ('truck', 'start_date', 'end_date', 'booking', 'note')
+    list_select_related = ('truck', 'booking')
+    raw_id_fields = ('truck', 'booking')
+    date_hierarchy = 'start_date'
+
+    def save_model(self, request, obj, form, change):
+        # Re-checked under the truck lock; the form check alone can race another booking
+        reserve_truck(obj.truck_id, obj.start_date, obj.end_date, booking=obj.booking, note=obj.note, reservation=obj)
@@ -0,0 +1,113 @@
+"""
+Truck availability calendar.
+
+Each truck's committed periods are TruckReservation rows, half-open
+[start_date, end_date) ranges that never overlap for the same truck. Because
+they are disjoint and indexed on (truck, start_date), the only reservation
+that can clash with a new range is the last one starting before the range
+ends, so a conflict check is a single index seek rather than a scan of the
+truck's bookings.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import Truck, TruckReservation
+
+MAX_RESERVATION_DAYS = 90
+
+
+class TruckUnavailable(Exception):
+    def __init__(self, conflict):
+        self.conflict = conflict
+        last_day = conflict.end_date - timedelta(days=1)
+        super().__init__(f"This truck is already booked from {conflict.start_date:%b %d} to {last_day:%b %d}.")
+
+
+def _check_range(start_date, end_date):
+    if end_date <= start_date:
+        raise ValueError("The end date must be after the start date.")
+    if (end_date - start_date).days > MAX_RESERVATION_DAYS:
+        raise ValueError(f"A reservation cannot be longer than {MAX_RESERVATION_DAYS} days.")
+
+
+def find_conflict(truck_id, start_date, end_date, exclude_booking_id=None, exclude_id=None):
+    """The reservation overlapping [start_date, end_date) for this truck, or None."""
+    reservations = TruckReservation.objects.filter(truck_id=truck_id, start_date__lt=end_date)
+    if exclude_booking_id is not None:
+        reservations = reservations.exclude(booking_id=exclude_booking_id)
+    if exclude_id is not None:
+        reservations = reservations.exclude(pk=exclude_id)
+    latest = reservations.order_by('-start_date').first()
+    return latest if latest and latest.end_date > start_date else None
+
+
+def check_reservation(truck_id, start_date, end_date, booking=None, reservation=None):
+    """Raise ValueError for a bad range or TruckUnavailable on overlap, without locking or writing."""
+    _check_range(start_date, end_date)
+    conflict = find_conflict(
+        truck_id, start_date, end_date,
+        exclude_booking_id=booking.pk if booking else None,
+        exclude_id=reservation.pk if reservation is not None else None,
+    )
+    if conflict:
+        raise TruckUnavailable(conflict)
+
+
+def reserve_truck(truck_id, start_date, end_date, booking=None, note='', reservation=None):
+    """
+    Reserve a truck for [start_date, end_date), replacing the booking's
+    earlier reservation if it has one. A given `reservation` instance (from
+    the admin) is saved with the range instead of a new row. Raises
+    TruckUnavailable on overlap.
+    """
+    with transaction.atomic():
+        # Serialize reservations per truck so two requests cannot both pass the check
+        Truck.objects.select_for_update().filter(pk=truck_id).exists()
+        check_reservation(truck_id, start_date, end_date, booking=booking, reservation=reservation)
+        if booking is not None:
+            previous = TruckReservation.objects.filter(booking_id=booking.pk)
+            if reservation is not None and reservation.pk:
+                previous = previous.exclude(pk=reservation.pk)
+            previous.delete()
+        reservation = TruckReservation() if reservation is None else reservation
+        reservation.truck_id, reservation.booking = truck_id, booking
+        reservation.start_date, reservation.end_date, reservation.note = start_date, end_date, note
+        reservation.save()
+        return reservation
+
+
+def release_booking(booking_id):
+    return TruckReservation.objects.filter(booking_id=booking_id).delete()[0]
+
+
+def available_in_window(queryset, start_date, end_date):
+    """Narrow a Truck queryset to trucks with no reservation overlapping the window."""
+    _check_range(start_date, end_date)
+    return queryset.exclude(Exists(TruckReservation.objects.filter(
+        truck_id=OuterRef('pk'), start_date__lt=end_date, end_date__gt=start_date,
+    )))
+
+
+def truck_calendar(truck_id, start_date=None, days=60):
+    """Reservations of a truck that touch the next `days` days, in date order."""
+    start_date = start_date or timezone.localdate()
+    return list(
+        TruckReservation.objects.filter(
+            truck_id=truck_id, start_date__lt=start_date + timedelta(days=days), end_date__gt=start_date,
+        ).order_by('start_date')
+    )
+
+
+def free_from(truck_ids, on_or_after=None):
+    """
+    {truck_id: first date the truck is free} for several trucks in one query,
+    skipping over back-to-back reservations.
+    """
+    day = on_or_after or timezone.localdate()
+    result = {truck_id: day for truck_id in truck_ids}
+    upcoming = TruckReservation.objects.filter(truck_id__in=truck_ids, end_date__gt=day).order_by('truck_id', 'start_date')
+    for truck_id, start_date, end_date in upcoming.values_list('truck_id', 'start_date', 'end_date'):
+        if start_date <= result[truck_id]:
+            result[truck_id] = end_date
+    return result
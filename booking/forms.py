@@ -3,6 +3,8 @@ import os
 from django import forms
 from .models import Truck, Booking, TruckImage
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import timedelta
 
 
 class TruckForm(forms.ModelForm):
@@ -84,6 +86,10 @@ class TruckImageForm(forms.ModelForm):
 
 
 class BookingForm(forms.ModelForm):
+    # Optional: when given, the truck is reserved from pickup through delivery day
+    pickup_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    delivery_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
     class Meta:
         model = Booking
         fields = [
@@ -99,6 +105,41 @@ class BookingForm(forms.ModelForm):
             'destination_state': forms.Select(attrs={'class': 'form-control'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        reservation = getattr(self.instance, 'reservation', None) if self.instance.pk else None
+        if reservation:
+            self.initial.setdefault('pickup_date', reservation.start_date)
+            self.initial.setdefault('delivery_date', reservation.end_date - timedelta(days=1))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        pickup_date = cleaned_data.get('pickup_date')
+        delivery_date = cleaned_data.get('delivery_date')
+        if bool(pickup_date) != bool(delivery_date):
+            raise ValidationError("Enter both a pickup date and a delivery date, or neither.")
+        if pickup_date and delivery_date:
+            if pickup_date < timezone.localdate() and 'pickup_date' in self.changed_data:
+                self.add_error('pickup_date', "The pickup date cannot be in the past.")
+            if delivery_date < pickup_date:
+                self.add_error('delivery_date', "The delivery date cannot be before the pickup date.")
+        return cleaned_data
+
+    def reservation_range(self):
+        """The half-open [start, end) range to reserve, or None when no dates were given."""
+        pickup_date = self.cleaned_data.get('pickup_date')
+        delivery_date = self.cleaned_data.get('delivery_date')
+        if not pickup_date or not delivery_date:
+            return None
+        return pickup_date, delivery_date + timedelta(days=1)
+
+
+class BookingImportForm(BookingForm):
+    """One manifest row of a bulk import; the truck is checked per batch rather than per row."""
+    truck_id = forms.IntegerField(min_value=1)
+    pickup_date = None
+    delivery_date = None
+
 
 class TruckApprovalForm(forms.Form):
     truck_ids = forms.MultipleChoiceField(
@@ -0,0 +1,58 @@
+"""
+Reference coordinates for the states in Booking.STATES_CHOICES.
+
+Each state is represented by its capital (Abuja for the FCT), which is
+where most freight is picked up or dropped off and is a better anchor for
+road distances than a geometric centroid.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+ROAD_FACTOR = 1.3  # typical ratio of Nigerian road distance to great-circle distance
+MIN_LANE_KM = 40.0  # intra-state and very short hauls are priced at least this far
+
+STATE_CENTROIDS = {
+    'abia': (5.5320, 7.4860), 'abuja': (9.0765, 7.3986), 'adamawa': (9.2035, 12.4954),
+    'akwa_ibom': (5.0377, 7.9128), 'anambra': (6.2100, 7.0700), 'bauchi': (10.3158, 9.8442),
+    'bayelsa': (4.9267, 6.2676), 'benue': (7.7337, 8.5214), 'borno': (11.8333, 13.1500),
+    'cross_river': (4.9757, 8.3417), 'delta': (6.1980, 6.7300), 'ebonyi': (6.3249, 8.1137),
+    'edo': (6.3350, 5.6037), 'ekiti': (7.6210, 5.2210), 'enugu': (6.4584, 7.5464),
+    'gombe': (10.2897, 11.1673), 'imo': (5.4850, 7.0350), 'jigawa': (11.7560, 9.3390),
+    'kaduna': (10.5105, 7.4165), 'kano': (12.0022, 8.5920), 'katsina': (12.9908, 7.6018),
+    'kebbi': (12.4539, 4.1975), 'kogi': (7.8023, 6.7333), 'kwara': (8.4966, 4.5421),
+    'lagos': (6.6018, 3.3515), 'nasarawa': (8.4939, 8.5153), 'niger': (9.6139, 6.5569),
+    'ogun': (7.1475, 3.3619), 'ondo': (7.2571, 5.2058), 'osun': (7.7827, 4.5418),
+    'oyo': (7.3775, 3.9470), 'plateau': (9.8965, 8.8583), 'rivers': (4.8156, 7.0498),
+    'sokoto': (13.0059, 5.2476), 'taraba': (8.8833, 11.3667), 'yobe': (11.7470, 11.9608),
+    'zamfara': (12.1628, 6.6614),
+}
+
+# Sorted so codes can be mapped to matrix indices with np.searchsorted
+STATE_CODES = tuple(sorted(STATE_CENTROIDS))
+STATE_INDEX = {code: i for i, code in enumerate(STATE_CODES)}
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; every argument may be a scalar or a NumPy array."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def state_indices(codes):
+    """
+    Map an array of state codes to matrix indices in one vectorized pass.
+    Unknown codes map to -1.
+    """
+    codes = np.asarray(codes, dtype=str)
+    known = np.asarray(STATE_CODES)
+    idx = np.searchsorted(known, codes).clip(0, len(known) - 1)
+    return np.where(known[idx] == codes, idx, -1)
+
+
+def road_distance_matrix():
+    """Estimated road km between every pair of states, indexed like STATE_CODES."""
+    coords = np.array([STATE_CENTROIDS[code] for code in STATE_CODES])
+    lat, lon = coords[:, 0], coords[:, 1]
+    km = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) * ROAD_FACTOR
+    return np.maximum(km, MIN_LANE_KM)
@@ -0,0 +1,52 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from booking.geography import STATE_CENTROIDS, STATE_CODES
+from booking.route_solver import route_cost, savings_route
+from booking.routing import ROUTE_TIME_LIMIT, build_problem, shutdown_pool, solve_routes
+
+
+class SyntheticBooking:
+    def __init__(self, pk, pickup_state, destination_state):
+        self.pk = pk
+        self.pickup_state = pickup_state
+        self.destination_state = destination_state
+
+
+def synthetic_problem(rng, n_bookings):
+    """Distance matrix for a random start state and `n_bookings` random lanes."""
+    states = rng.choice(STATE_CODES, size=(n_bookings, 2))
+    bookings = [SyntheticBooking(i, pickup, destination) for i, (pickup, destination) in enumerate(states)]
+    return build_problem(STATE_CENTROIDS[rng.choice(STATE_CODES)], bookings)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the route solver on synthetic instances of increasing size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='5,10,20,40', help='Comma-separated bookings per instance.')
+        parser.add_argument('--instances', type=int, default=8, help='Instances per size, solved in parallel.')
+        parser.add_argument('--capacity', type=int, default=1)
+        parser.add_argument('--time-limit', type=float, default=ROUTE_TIME_LIMIT)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"{'bookings':>8} {'savings km':>11} {'improved km':>12} {'gain':>6} {'timed out':>9} {'wall s':>7}")
+        try:
+            for size in sizes:
+                problems = [synthetic_problem(rng, size) for _ in range(options['instances'])]
+                started = time.perf_counter()
+                results = solve_routes(problems, options['capacity'], options['time_limit'])
+                elapsed = time.perf_counter() - started
+
+                initial = np.mean([route_cost(savings_route(cost, size), cost) for cost in problems])
+                improved = np.mean([best for _, best, _, _ in results])
+                timed_out = sum(1 for *_, out in results if out)
+                self.stdout.write(
+                    f"{size:>8} {initial:>11.0f} {improved:>12.0f} {(1 - improved / initial) * 100:>5.1f}% "
+                    f"{timed_out:>4}/{len(results):<4} {elapsed:>7.2f}"
+                )
+        finally:
+            shutdown_pool()
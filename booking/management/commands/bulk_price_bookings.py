@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from booking.services import InvalidCostRow, assign_delivery_costs, parse_cost_csv, parse_cost_rows
+
+
+class Command(BaseCommand):
+    help = 'Set the delivery cost of many bookings at once from a booking_id,delivery_cost CSV or ID=COST pairs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pairs', nargs='*', help='booking_id=delivery_cost pairs, e.g. 42=25000')
+        parser.add_argument('--csv', help='CSV file with booking_id and delivery_cost columns.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Bookings locked and updated per transaction.')
+
+    def handle(self, *args, **options):
+        try:
+            costs = {}
+            if options['csv']:
+                with open(options['csv'], newline='', encoding='utf-8-sig') as f:
+                    costs.update(parse_cost_csv(f.read()))
+            costs.update(parse_cost_rows(pair.split('=', 1) if '=' in pair else (pair, None) for pair in options['pairs']))
+        except (InvalidCostRow, OSError) as e:
+            raise CommandError(str(e))
+        if not costs:
+            raise CommandError('Give booking_id=delivery_cost pairs or --csv.')
+
+        start = time.perf_counter()
+        summary = assign_delivery_costs(costs, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f"Priced {summary['updated']} booking(s) in {elapsed:.2f}s."))
+        if summary['missing']:
+            self.stdout.write(self.style.WARNING(f"Not found: {', '.join(map(str, summary['missing']))}"))
@@ -0,0 +1,43 @@
+import csv
+import sys
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from booking.geography import STATE_CODES
+from booking.pricing import WEIGHT_TIERS, get_rate_card
+
+
+class Command(BaseCommand):
+    help = 'Export the delivery cost of every state-to-state lane per weight tier as CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', action='append', choices=WEIGHT_TIERS, help='Limit to this weight tier (repeatable).')
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        rate_card = get_rate_card()
+        tiers = [tier for tier in options['tier'] or WEIGHT_TIERS if rate_card.is_priced(tier)]
+        if not tiers:
+            raise CommandError('No TierRate is configured for the requested tier(s).')
+
+        # Full grid of (tier, pickup, destination), quoted in one vectorized pass
+        tier_grid, pickup_grid, destination_grid = np.meshgrid(
+            np.array(tiers), np.array(STATE_CODES), np.array(STATE_CODES), indexing='ij'
+        )
+        costs = rate_card.quote_many(pickup_grid.ravel(), destination_grid.ravel(), tier_grid.ravel())
+
+        out = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(out)
+            writer.writerow(['weight_tier', 'pickup_state', 'destination_state', 'delivery_cost'])
+            writer.writerows(
+                (tier, pickup, destination, f'{cost:.2f}')
+                for tier, pickup, destination, cost in zip(
+                    tier_grid.ravel(), pickup_grid.ravel(), destination_grid.ravel(), costs
+                )
+            )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(costs)} lanes to {options['output']}."))
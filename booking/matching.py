@@ -0,0 +1,237 @@
+"""
+Truck matching engine.
+
+Ranks trucks for a shipment from four signals: how well the truck's weight
+tier fits the load, how far its latest tracker position is from the pickup,
+whether it is free right now, and its owner's delivery record.
+
+Every (pickup state, weight tier) pair has its candidate list scored and
+sorted in advance, so a match is a dictionary lookup plus, when dates are
+given, one calendar query for the shortlisted trucks. When reservations in
+the window leave fewer than `limit` of the shortlist, the rest of the fleet
+is ranked from the stored score arrays and checked in further chunks of
+MATCH_POOL_SIZE until `limit` is filled. The index is shared
+per process and rebuilt when trucks change (a version key in the cache,
+bumped by signals) or when its tracker positions are older than
+MATCH_INDEX_TTL.
+"""
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from .geography import STATE_CENTROIDS, STATE_CODES, STATE_INDEX, haversine_km
+from .models import Booking, Truck, TruckReservation
+from .pricing import TIER_INDEX, WEIGHT_TIERS
+
+MATCH_INDEX_VERSION_KEY = 'booking:match_index_version'
+MATCH_INDEX_TTL = 60  # seconds; how stale tracker positions may get
+MATCH_POOL_SIZE = 50  # candidates kept per (pickup state, tier)
+POSITION_MAX_AGE = 24 * 60 * 60  # older fixes fall back to the truck's home state
+DISTANCE_SCALE_KM = 300.0  # distance at which the proximity score drops to 1/e
+
+# Score weights; they sum to 1 so scores fall in [0, 1]
+WEIGHT_PROXIMITY = 0.45
+WEIGHT_TIER_FIT = 0.25
+WEIGHT_OWNER = 0.15
+WEIGHT_FREE_NOW = 0.10
+WEIGHT_HOMEWARD = 0.05  # truck is based at the destination, so the trip takes it home
+
+Match = namedtuple('Match', ['truck_id', 'score', 'distance_km', 'tier_fit', 'owner_score', 'free_now'])
+
+
+class MatchIndex:
+    """Immutable per-process snapshot of the fleet with pre-ranked candidates."""
+
+    def __init__(self, version, built_at, truck_ids, home_states, distances, tier_fit, owner_scores, free_now, ranked, base, proximity):
+        self.version = version
+        self.built_at = built_at
+        self.truck_ids = truck_ids
+        self.home_states = home_states
+        self.distances = distances  # (trucks, states) km from each truck to each state's pickup point
+        self.tier_fit = tier_fit  # (trucks, tiers)
+        self.owner_scores = owner_scores
+        self.free_now = free_now
+        self.ranked = ranked  # {(state index, tier index): (truck positions, scores)} best first
+        self.base = base  # (trucks,) owner and free-now part of every score
+        self.proximity = proximity  # (trucks, states)
+
+    def scores(self, state, tier):
+        """Score of every truck for a pickup state and tier; -inf where the truck is too small."""
+        return self.base + WEIGHT_TIER_FIT * self.tier_fit[:, tier] + WEIGHT_PROXIMITY * self.proximity[:, state]
+
+    def is_fresh(self, version):
+        return self.version == version and time.monotonic() - self.built_at < MATCH_INDEX_TTL
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _owner_scores(owner_ids):
+    """
+    Delivery record per owner, smoothed so new owners start at 0.5:
+    (delivered + 1) / (delivered + cancelled + 2).
+    """
+    # Imported here: delivery.models imports booking.models
+    from delivery.models import DeliveryHistory
+
+    delivered = dict(
+        DeliveryHistory.objects.filter(status='delivered', booking__truck__owner_id__in=set(owner_ids))
+        .values_list('booking__truck__owner_id').annotate(n=Count('id')).order_by()
+    )
+    cancelled = dict(
+        Booking.objects.filter(booking_status='cancelled', truck__owner_id__in=set(owner_ids))
+        .values_list('truck__owner_id').annotate(n=Count('id')).order_by()
+    )
+    return np.array([
+        (delivered.get(owner_id, 0) + 1) / (delivered.get(owner_id, 0) + cancelled.get(owner_id, 0) + 2)
+        for owner_id in owner_ids
+    ])
+
+
+def build_match_index(version):
+    trucks = list(
+        Truck.objects.filter(available=True)
+        .values_list('id', 'owner_id', 'weight_range', 'state', 'tracker__last_latitude',
+                     'tracker__last_longitude', 'tracker__last_fix_at')
+        .order_by('id')
+    )
+    n = len(trucks)
+    truck_ids = np.array([t[0] for t in trucks], dtype=np.int64)
+    truck_tiers = np.array([TIER_INDEX.get(t[2], 0) for t in trucks], dtype=int)
+    home_states = np.array([STATE_INDEX.get(t[3], -1) for t in trucks], dtype=int)
+
+    # Latest fix if recent, otherwise the truck's home state capital
+    stale_before = timezone.now().timestamp() - POSITION_MAX_AGE
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    for i, (_, _, _, state, fix_lat, fix_lon, fixed_at) in enumerate(trucks):
+        if fix_lat is not None and fix_lon is not None and fixed_at and fixed_at.timestamp() >= stale_before:
+            lat[i], lon[i] = fix_lat, fix_lon
+        elif state in STATE_CENTROIDS:
+            lat[i], lon[i] = STATE_CENTROIDS[state]
+
+    centroids = np.array([STATE_CENTROIDS[code] for code in STATE_CODES])
+    distances = haversine_km(lat[:, None], lon[:, None], centroids[None, :, 0], centroids[None, :, 1])
+    proximity = np.nan_to_num(np.exp(-distances / DISTANCE_SCALE_KM), nan=0.0)
+
+    # Exact tier scores 1, each tier of spare capacity costs 0.2; too small is -inf (never a candidate)
+    spare = truck_tiers[:, None] - np.arange(len(WEIGHT_TIERS))[None, :]
+    tier_fit = np.where(spare >= 0, 1.0 - 0.2 * spare, -np.inf)
+
+    owner_scores = _owner_scores([t[1] for t in trucks]) if n else np.zeros(0)
+    today = timezone.localdate()
+    busy = set(
+        TruckReservation.objects.filter(start_date__lte=today, end_date__gt=today).values_list('truck_id', flat=True)
+    )
+    free_now = np.array([truck_id not in busy for truck_id in truck_ids.tolist()], dtype=bool)
+
+    base = WEIGHT_OWNER * owner_scores + WEIGHT_FREE_NOW * free_now
+    index = MatchIndex(
+        version, time.monotonic(), truck_ids, home_states, distances, tier_fit, owner_scores, free_now, {}, base, proximity,
+    )
+    for tier in range(len(WEIGHT_TIERS)):
+        for state in range(len(STATE_CODES)):
+            scores = index.scores(state, tier)
+            candidates = np.flatnonzero(np.isfinite(scores))
+            top = candidates[np.argsort(-scores[candidates], kind='stable')[:MATCH_POOL_SIZE]]
+            index.ranked[state, tier] = (top, scores[top])
+    return index
+
+
+def _current_version():
+    version = cache.get(MATCH_INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(MATCH_INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(MATCH_INDEX_VERSION_KEY)
+    return version
+
+
+def get_match_index():
+    global _index
+    version = _current_version()
+    index = _index
+    if index is None or not index.is_fresh(version):
+        with _lock:
+            if _index is None or not _index.is_fresh(version):
+                _index = build_match_index(version)
+            index = _index
+    return index
+
+
+def invalidate_match_index():
+    global _index
+    try:
+        cache.incr(MATCH_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(MATCH_INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+    _index = None
+
+
+def _candidate_chunks(index, state, tier, destination):
+    """
+    (positions, scores) chunks, best first: the precomputed shortlist, then
+    the rest of the fleet ranked on demand, MATCH_POOL_SIZE trucks at a time.
+    """
+    positions, scores = index.ranked[state, tier]
+    yield positions, scores + WEIGHT_HOMEWARD * (index.home_states[positions] == destination)
+    if len(positions) < MATCH_POOL_SIZE:
+        return  # the shortlist already holds every eligible truck
+
+    scores = index.scores(state, tier) + WEIGHT_HOMEWARD * (index.home_states == destination)
+    scores[positions] = -np.inf
+    rest = np.flatnonzero(np.isfinite(scores))
+    rest = rest[np.argsort(-scores[rest], kind='stable')]
+    for start in range(0, len(rest), MATCH_POOL_SIZE):
+        chunk = rest[start:start + MATCH_POOL_SIZE]
+        yield chunk, scores[chunk]
+
+
+def match_trucks(pickup_state, destination_state, product_weight, start_date=None, end_date=None, limit=10):
+    """
+    Best trucks for a shipment, highest score first.
+
+    With a [start_date, end_date) window, trucks reserved in it are dropped
+    (one query per chunk of candidates, usually just the shortlist). Returns
+    a list of Match tuples; empty if the state or weight is unknown.
+    """
+    state = STATE_INDEX.get(pickup_state)
+    tier = TIER_INDEX.get(product_weight)
+    if state is None or tier is None:
+        return []
+
+    index = get_match_index()
+    destination = STATE_INDEX.get(destination_state, -2)
+    matches = []
+    for positions, scores in _candidate_chunks(index, state, tier, destination):
+        order = np.argsort(-scores, kind='stable')
+        positions, scores = positions[order], scores[order]
+
+        if start_date and end_date:
+            booked = set(
+                TruckReservation.objects.filter(
+                    truck_id__in=index.truck_ids[positions].tolist(), start_date__lt=end_date, end_date__gt=start_date,
+                ).values_list('truck_id', flat=True)
+            )
+        else:
+            booked = set()
+
+        for position, score in zip(positions.tolist(), scores.tolist()):
+            truck_id = int(index.truck_ids[position])
+            if truck_id in booked:
+                continue
+            distance = float(index.distances[position, state])
+            matches.append(Match(
+                truck_id=truck_id,
+                score=round(score, 4),
+                distance_km=None if np.isnan(distance) else round(distance, 1),
+                tier_fit=round(float(index.tier_fit[position, tier]), 2),
+                owner_score=round(float(index.owner_scores[position]), 3),
+                free_now=bool(index.free_now[position]),
+            ))
+            if len(matches) >= limit:
+                return matches
+    return matches
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_quote_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TruckReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='booking.booking')),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='booking.truck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['truck', 'start_date', 'end_date'], name='reservation_truck_start_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='reservation_end_after_start')],
+            },
+        ),
+    ]
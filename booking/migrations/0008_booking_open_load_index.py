@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_truck_reservations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('booking_status', 'pending'), ('payment_completed', False)), fields=['pickup_state', 'product_weight', 'booked_at'], name='booking_open_load_idx'),
+        ),
+    ]
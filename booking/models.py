@@ -112,6 +112,16 @@ class Booking(models.Model):
     insurance_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_delivery_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0.00) 
 
+    class Meta:
+        indexes = [
+            # Open loads by pickup state and weight, for the backhaul finder; only unpaid pending rows are indexed
+            models.Index(
+                fields=['pickup_state', 'product_weight', 'booked_at'],
+                condition=models.Q(booking_status='pending', payment_completed=False),
+                name='booking_open_load_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Booking by {self.client.username} for {self.product_name}"
 
@@ -124,4 +134,75 @@ class Receipt(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Receipt for Booking {self.booking.id} - Total Cost: {self.total_delivery_cost}"
\ No newline at end of file
+        return f"Receipt for Booking {self.booking.id} - Total Cost: {self.total_delivery_cost}"
+
+class TierRate(models.Model):
+    """Distance-based tariff for one weight tier; the quote engine prices every state pair from it."""
+    weight_tier = models.CharField(max_length=15, choices=Truck.WEIGHT_CHOICES, unique=True)
+    base_fare = models.DecimalField(max_digits=12, decimal_places=2)
+    per_km_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    minimum_fare = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_weight_tier_display()}: {self.base_fare} + {self.per_km_rate}/km"
+
+
+class PricingSurcharge(models.Model):
+    """
+    Optional extra applied on top of the distance tariff. Leave a scope field
+    blank to apply it to every tier/state; percent is applied before flat_amount.
+    """
+    name = models.CharField(max_length=100)
+    weight_tier = models.CharField(max_length=15, choices=Truck.WEIGHT_CHOICES, blank=True)
+    pickup_state = models.CharField(max_length=20, choices=Booking.STATES_CHOICES, blank=True)
+    destination_state = models.CharField(max_length=20, choices=Booking.STATES_CHOICES, blank=True)
+    percent = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    flat_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class LaneRate(models.Model):
+    """Fixed price for one lane and tier, overriding the computed tariff and surcharges."""
+    pickup_state = models.CharField(max_length=20, choices=Booking.STATES_CHOICES)
+    destination_state = models.CharField(max_length=20, choices=Booking.STATES_CHOICES)
+    weight_tier = models.CharField(max_length=15, choices=Truck.WEIGHT_CHOICES)
+    cost = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pickup_state', 'destination_state', 'weight_tier'], name='unique_lane_rate'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.pickup_state} -> {self.destination_state} ({self.weight_tier}): {self.cost}"
+
+
+class TruckReservation(models.Model):
+    """
+    A period a truck is committed, as the half-open date range [start_date, end_date).
+    Reservations of one truck never overlap; booking.availability enforces it.
+    """
+    truck = models.ForeignKey(Truck, on_delete=models.CASCADE, related_name='reservations')
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, null=True, blank=True, related_name='reservation')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    note = models.CharField(max_length=255, blank=True)  # e.g. "maintenance" for blocks without a booking
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gt=models.F('start_date')), name='reservation_end_after_start'),
+        ]
+        indexes = [
+            # Conflict check seeks the last reservation starting before a date; calendars scan forward
+            models.Index(fields=['truck', 'start_date', 'end_date'], name='reservation_truck_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.truck.name}: {self.start_date} - {self.end_date}"
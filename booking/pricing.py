@@ -0,0 +1,141 @@
+"""
+State-to-state quote engine.
+
+Every lane is priced once per process into a (tier, pickup, destination)
+cost array built from TierRate, PricingSurcharge and LaneRate, so quoting a
+booking is an array lookup and a full rate card is one fancy-indexing pass.
+The card is cached per process and rebuilt when the version in the shared
+cache moves (signals bump it on any pricing change), like the plan catalog.
+"""
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+from django.core.cache import cache
+from .geography import STATE_CODES, STATE_INDEX, road_distance_matrix, state_indices
+from .models import LaneRate, PricingSurcharge, TierRate, Truck
+
+RATE_CARD_VERSION_KEY = 'booking:rate_card_version'
+QUOTE_ROUNDING = 100  # quotes are rounded up to the nearest ₦100
+
+WEIGHT_TIERS = tuple(code for code, _ in Truck.WEIGHT_CHOICES)
+TIER_INDEX = {tier: i for i, tier in enumerate(WEIGHT_TIERS)}
+
+
+class RateCard:
+    """Read-only cost array for every tier and state pair; NaN where a tier has no TierRate."""
+
+    def __init__(self, version, costs):
+        self.version = version
+        costs.setflags(write=False)
+        self.costs = costs
+
+    def is_priced(self, weight_tier):
+        tier = TIER_INDEX.get(weight_tier)
+        return tier is not None and not np.isnan(self.costs[tier]).all()
+
+    def quote(self, pickup_state, destination_state, weight_tier):
+        """Cost of one lane as a Decimal, or None if the lane or tier cannot be priced."""
+        try:
+            cost = self.costs[TIER_INDEX[weight_tier], STATE_INDEX[pickup_state], STATE_INDEX[destination_state]]
+        except KeyError:
+            return None
+        if np.isnan(cost):
+            return None
+        return Decimal(int(cost))
+
+    def quote_many(self, pickup_states, destination_states, weight_tiers):
+        """
+        Vectorized quote for equal-length sequences of lanes. Returns a float
+        array with NaN wherever a state or tier is unknown or unpriced.
+        """
+        pickups = state_indices(pickup_states)
+        destinations = state_indices(destination_states)
+        tiers = np.array([TIER_INDEX.get(tier, -1) for tier in weight_tiers], dtype=int)
+        valid = (pickups >= 0) & (destinations >= 0) & (tiers >= 0)
+        out = np.full(len(pickups), np.nan)
+        out[valid] = self.costs[tiers[valid], pickups[valid], destinations[valid]]
+        return out
+
+
+_rate_card = None
+_lock = threading.Lock()
+
+
+def _scope_mask(value, codes):
+    """Boolean mask along one axis: every entry when the scope is blank, else only the matching one."""
+    if not value:
+        return np.ones(len(codes), dtype=bool)
+    return np.array([code == value for code in codes])
+
+
+def build_costs():
+    """Compute the (tier, pickup, destination) cost array from the pricing tables."""
+    distance = road_distance_matrix()
+    costs = np.full((len(WEIGHT_TIERS), len(STATE_CODES), len(STATE_CODES)), np.nan)
+
+    for rate in TierRate.objects.all():
+        costs[TIER_INDEX[rate.weight_tier]] = np.maximum(
+            float(rate.base_fare) + float(rate.per_km_rate) * distance, float(rate.minimum_fare)
+        )
+
+    surcharges = list(PricingSurcharge.objects.filter(active=True))
+    masks = [
+        (
+            _scope_mask(s.weight_tier, WEIGHT_TIERS)[:, None, None]
+            & _scope_mask(s.pickup_state, STATE_CODES)[None, :, None]
+            & _scope_mask(s.destination_state, STATE_CODES)[None, None, :],
+            s,
+        )
+        for s in surcharges
+    ]
+    # Percentages compound on the tariff first, then flat amounts are added
+    for mask, surcharge in masks:
+        if surcharge.percent:
+            costs = np.where(mask, costs * (1 + float(surcharge.percent) / 100), costs)
+    for mask, surcharge in masks:
+        if surcharge.flat_amount:
+            costs = np.where(mask, costs + float(surcharge.flat_amount), costs)
+
+    costs = np.ceil(costs / QUOTE_ROUNDING) * QUOTE_ROUNDING
+
+    lanes = LaneRate.objects.values_list('weight_tier', 'pickup_state', 'destination_state', 'cost')
+    for tier, pickup, destination, cost in lanes:
+        if tier in TIER_INDEX and pickup in STATE_INDEX and destination in STATE_INDEX:
+            costs[TIER_INDEX[tier], STATE_INDEX[pickup], STATE_INDEX[destination]] = float(cost)
+    return costs
+
+
+def _current_version():
+    version = cache.get(RATE_CARD_VERSION_KEY)
+    if version is None:
+        cache.add(RATE_CARD_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(RATE_CARD_VERSION_KEY)
+    return version
+
+
+def get_rate_card():
+    """Return the current rate card, rebuilding it only when the version has moved."""
+    global _rate_card
+    version = _current_version()
+    rate_card = _rate_card
+    if rate_card is None or rate_card.version != version:
+        with _lock:
+            if _rate_card is None or _rate_card.version != version:
+                _rate_card = RateCard(version, build_costs())
+            rate_card = _rate_card
+    return rate_card
+
+
+def invalidate_rate_card():
+    """Mark every process's rate card as stale."""
+    global _rate_card
+    try:
+        cache.incr(RATE_CARD_VERSION_KEY)
+    except ValueError:
+        cache.set(RATE_CARD_VERSION_KEY, time.time_ns(), timeout=None)
+    _rate_card = None
+
+
+def quote(pickup_state, destination_state, weight_tier):
+    return get_rate_card().quote(pickup_state, destination_state, weight_tier)
@@ -0,0 +1,161 @@
+"""
+Single-truck pickup-and-delivery route solver.
+
+Kept free of Django imports so it can run in worker processes. A problem is
+a cost matrix over node 0 (the truck's start) and two nodes per load, the
+pickup at 2i+1 and the drop-off at 2i+2. A route is an open path from the
+start through every node with each pickup before its drop-off and no more
+than `capacity` loads on board at once.
+
+The route is built with Clarke-Wright savings (each load starts as its own
+start -> pickup -> drop-off trip; trips are chained in order of how much
+joining them saves), then improved with 2-opt and or-opt moves until
+neither helps or the time limit is reached.
+"""
+import time
+import numpy as np
+
+
+def route_cost(route, cost):
+    route = np.asarray(route)
+    return float(cost[route[:-1], route[1:]].sum())
+
+
+def is_feasible(route, capacity):
+    on_board = 0
+    picked = set()
+    for node in route[1:]:
+        if node % 2:
+            picked.add(node)
+            on_board += 1
+            if on_board > capacity:
+                return False
+        else:
+            if node - 1 not in picked:
+                return False
+            on_board -= 1
+    return True
+
+
+def savings_route(cost, n_loads):
+    """Chain single-load trips by Clarke-Wright savings into one path."""
+    # Each chain is a list of loads; a chain's ends are its first pickup and last drop-off
+    chains = {i: [i] for i in range(n_loads)}
+    head_of = {i: i for i in range(n_loads)}  # load -> chain id where the load is first
+    tail_of = {i: i for i in range(n_loads)}  # load -> chain id where the load is last
+
+    savings = []
+    for a in range(n_loads):
+        for b in range(n_loads):
+            if a != b:
+                drop_a, pick_b = 2 * a + 2, 2 * b + 1
+                # Joining a's trip to b's saves the return to start and the new departure
+                savings.append((cost[drop_a, 0] + cost[0, pick_b] - cost[drop_a, pick_b], a, b))
+    savings.sort(reverse=True)
+
+    for _, a, b in savings:
+        if a in tail_of and b in head_of:
+            left, right = tail_of[a], head_of[b]
+            if left == right:
+                continue
+            merged = chains.pop(left) + chains.pop(right)
+            del tail_of[a], head_of[b]
+            chains[left] = merged
+            head_of[merged[0]] = left
+            tail_of[merged[-1]] = left
+            if len(chains) == 1:
+                break
+
+    order = [load for chain in chains.values() for load in chain]
+    route = [0]
+    for load in order:
+        route += [2 * load + 1, 2 * load + 2]
+    return route
+
+
+def _edge(cost, a, b):
+    """Cost of travelling a -> b; a missing end (past the last stop) costs nothing."""
+    return 0.0 if a is None or b is None else cost[a, b]
+
+
+def two_opt(route, cost, capacity, deadline):
+    """
+    Reverse segments while that shortens the path and keeps it feasible.
+    Moves are scored from the two changed edges, which assumes a symmetric matrix.
+    """
+    best = route_cost(route, cost)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, len(route) - 1):
+            for j in range(i + 1, len(route)):
+                after = route[j + 1] if j + 1 < len(route) else None
+                delta = (
+                    _edge(cost, route[i - 1], route[j]) + _edge(cost, route[i], after)
+                    - _edge(cost, route[i - 1], route[i]) - _edge(cost, route[j], after)
+                )
+                if delta < -1e-9:
+                    candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    if is_feasible(candidate, capacity):
+                        route, best, improved = candidate, best + delta, True
+            if time.monotonic() >= deadline:
+                break
+    return route, best
+
+
+def or_opt(route, cost, capacity, deadline):
+    """Move runs of 1-3 stops to a cheaper position while that helps."""
+    best = route_cost(route, cost)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for length in (1, 2, 3):
+            for i in range(1, len(route) - length + 1):
+                segment = route[i:i + length]
+                after = route[i + length] if i + length < len(route) else None
+                removed = (
+                    _edge(cost, route[i - 1], segment[0]) + _edge(cost, segment[-1], after)
+                    - _edge(cost, route[i - 1], after)
+                )
+                rest = route[:i] + route[i + length:]
+                for j in range(1, len(rest) + 1):
+                    if j == i:
+                        continue
+                    nxt = rest[j] if j < len(rest) else None
+                    added = (
+                        _edge(cost, rest[j - 1], segment[0]) + _edge(cost, segment[-1], nxt)
+                        - _edge(cost, rest[j - 1], nxt)
+                    )
+                    if added - removed < -1e-9:
+                        candidate = rest[:j] + segment + rest[j:]
+                        if is_feasible(candidate, capacity):
+                            route, best, improved = candidate, best + added - removed, True
+                            break
+                if improved or time.monotonic() >= deadline:
+                    break
+            if improved or time.monotonic() >= deadline:
+                break
+    return route, best
+
+
+def solve(cost, capacity=1, time_limit=2.0):
+    """
+    Best route found within `time_limit` seconds.
+
+    Returns (route, cost, construction cost, timed_out). Alternates 2-opt and
+    or-opt until a full round of both finds nothing.
+    """
+    cost = np.asarray(cost, dtype=float)
+    n_loads = (len(cost) - 1) // 2
+    deadline = time.monotonic() + time_limit
+
+    route = savings_route(cost, n_loads)
+    initial = best = route_cost(route, cost)
+    while time.monotonic() < deadline:
+        route, after_two_opt = two_opt(route, cost, capacity, deadline)
+        route, after_or_opt = or_opt(route, cost, capacity, deadline)
+        if after_or_opt >= best - 1e-9:
+            best = after_or_opt
+            break
+        best = after_or_opt
+    return route, best, initial, time.monotonic() >= deadline
@@ -0,0 +1,169 @@
+"""
+Multi-stop route planning for one truck.
+
+Given the bookings assigned to a truck, plan_truck_route orders their
+pickups and drop-offs to minimise road distance or driving time, starting
+from the truck's latest tracker fix (or its home state). Solving is
+CPU-bound, so it runs in a shared process pool; each solve has a time
+limit, and if a worker does not answer in time the savings route is
+computed in-process instead so the caller always gets a plan.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import numpy as np
+from django.conf import settings
+from .geography import ROAD_FACTOR, STATE_CENTROIDS, haversine_km
+from .route_solver import route_cost, savings_route, solve
+
+logger = logging.getLogger(__name__)
+
+ROUTE_TIME_LIMIT = 2.0  # seconds of improvement per solve
+ROUTE_MAX_BOOKINGS = 100  # earliest open bookings planned per route
+ROUTE_RESULT_GRACE = 1.0  # extra seconds allowed for pickling and queueing before falling back
+SHORT_LEG_KM = 100  # legs shorter than this are mostly town driving
+SHORT_LEG_SPEED = 35.0  # km/h
+HIGHWAY_SPEED = 55.0  # km/h
+
+RouteStop = namedtuple('RouteStop', ['booking_id', 'action', 'state'])
+RoutePlan = namedtuple('RoutePlan', ['stops', 'distance_km', 'duration_h', 'initial_distance_km', 'improved', 'timed_out', 'solve_ms'])
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def route_workers():
+    """
+    Solver processes per pool. Every web worker process gets its own pool,
+    so this is kept to settings.ROUTE_WORKERS rather than one per CPU.
+    """
+    return max(1, min(settings.ROUTE_WORKERS, os.cpu_count() or 1))
+
+
+def get_pool():
+    """The shared solver pool, started on first use. Spawned so workers do not inherit Django's connections."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=route_workers(), mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def solve_routes(problems, capacity=1, time_limit=ROUTE_TIME_LIMIT):
+    """
+    Solve several cost matrices in parallel.
+
+    Returns one (route, cost, initial cost, timed_out) per problem, in order.
+    A problem whose worker misses time_limit + ROUTE_RESULT_GRACE (or fails)
+    gets its savings route instead, marked as timed out.
+    """
+    problems = [np.asarray(cost, dtype=float) for cost in problems]
+    if not problems:
+        return []
+    pool = get_pool()
+    futures = [pool.submit(solve, cost, capacity, time_limit) for cost in problems]
+    deadline = time.monotonic() + time_limit + ROUTE_RESULT_GRACE
+
+    results = []
+    for cost, future in zip(problems, futures):
+        try:
+            results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+        except Exception as e:
+            future.cancel()
+            if not isinstance(e, TimeoutError):
+                logger.exception("Route solve failed; using the savings route")
+            route = savings_route(cost, (len(cost) - 1) // 2)
+            initial = route_cost(route, cost)
+            results.append((route, initial, initial, True))
+    return results
+
+
+def leg_hours(km):
+    """Driving hours for legs of `km` road km."""
+    km = np.asarray(km, dtype=float)
+    return km / np.where(km < SHORT_LEG_KM, SHORT_LEG_SPEED, HIGHWAY_SPEED)
+
+
+def build_problem(start, bookings):
+    """
+    Road km between every pair of stops: node 0 is the start, booking i
+    picks up at node 2i+1 and drops off at 2i+2.
+    """
+    points = [start]
+    for booking in bookings:
+        points += [STATE_CENTROIDS[booking.pickup_state], STATE_CENTROIDS[booking.destination_state]]
+    points = np.array(points, dtype=float)
+    lat, lon = points[:, 0], points[:, 1]
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) * ROAD_FACTOR
+
+
+def open_bookings(truck):
+    """The earliest ROUTE_MAX_BOOKINGS bookings the truck still has to carry: not cancelled and not yet delivered."""
+    return list(
+        truck.bookings.filter(booking_status__in=['pending', 'active'])
+        .exclude(deliveryschedule__status='delivered')
+        .order_by('booked_at')[:ROUTE_MAX_BOOKINGS]
+    )
+
+
+def start_point(truck):
+    """The truck's latest tracker fix, or its home state capital."""
+    tracker = getattr(truck, 'tracker', None)
+    if tracker is not None and tracker.last_latitude is not None and tracker.last_longitude is not None:
+        return (tracker.last_latitude, tracker.last_longitude)
+    return STATE_CENTROIDS.get(truck.state, STATE_CENTROIDS['abuja'])
+
+
+def plan_truck_route(truck, bookings=None, objective='distance', capacity=1, time_limit=ROUTE_TIME_LIMIT):
+    """
+    Order the pickups and drop-offs of a truck's bookings.
+
+    `objective` is 'distance' (road km) or 'time' (driving hours); `capacity`
+    is how many loads the truck can carry at once. Returns a RoutePlan, or
+    None if there is nothing to route.
+    """
+    if objective not in ('distance', 'time'):
+        raise ValueError("objective must be 'distance' or 'time'.")
+    bookings = open_bookings(truck) if bookings is None else list(bookings)
+    if not bookings:
+        return None
+
+    km = build_problem(start_point(truck), bookings)
+    cost = km if objective == 'distance' else leg_hours(km)
+    started = time.perf_counter()
+    route, best, initial, timed_out = solve_routes([cost], capacity, time_limit)[0]
+    solve_ms = (time.perf_counter() - started) * 1000
+
+    route = np.asarray(route)
+    stops = []
+    for node in route[1:].tolist():
+        booking = bookings[(node - 1) // 2]
+        if node % 2:
+            stops.append(RouteStop(booking.pk, 'pickup', booking.pickup_state))
+        else:
+            stops.append(RouteStop(booking.pk, 'dropoff', booking.destination_state))
+    legs = km[route[:-1], route[1:]]
+    # The solver starts from the savings route; measure it in km whatever the objective
+    initial_km = route_cost(savings_route(cost, len(bookings)), km)
+    return RoutePlan(
+        stops=stops,
+        distance_km=round(float(legs.sum()), 1),
+        duration_h=round(float(leg_hours(legs).sum()), 2),
+        initial_distance_km=round(float(initial_km), 1),
+        improved=best < initial - 1e-9,
+        timed_out=timed_out,
+        solve_ms=round(solve_ms, 1),
+    )
@@ -0,0 +1,203 @@
+import codecs
+import csv
+import io
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from notifications.models import Notification
+from users.models import User
+from .forms import BookingImportForm
+from .models import Booking, Truck
+from .pricing import get_rate_card
+
+logger = logging.getLogger(__name__)
+
+PRICING_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ROWS = 5000
+
+
+# BULK PRICING
+
+class InvalidCostRow(ValueError):
+    pass
+
+
+def parse_cost_rows(rows):
+    """
+    Turn (booking_id, delivery_cost) pairs into {booking_id: Decimal}.
+    Raises InvalidCostRow naming the first bad row; a repeated id keeps its last cost.
+    """
+    costs = {}
+    for line, (booking_id, delivery_cost) in enumerate(rows, start=1):
+        try:
+            booking_id = int(booking_id)
+            delivery_cost = Decimal(str(delivery_cost).strip())
+        except (TypeError, ValueError, InvalidOperation):
+            raise InvalidCostRow(f"Row {line}: invalid booking id or delivery cost.")
+        if not delivery_cost.is_finite() or delivery_cost <= 0:
+            raise InvalidCostRow(f"Row {line}: delivery cost must be greater than 0.")
+        costs[booking_id] = delivery_cost.quantize(Decimal('0.01'))
+    return costs
+
+
+def parse_cost_csv(text):
+    """Read booking_id,delivery_cost CSV text (header row required) into {booking_id: Decimal}."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'booking_id', 'delivery_cost'} <= set(reader.fieldnames):
+        raise InvalidCostRow("CSV must have booking_id and delivery_cost columns.")
+    return parse_cost_rows((row['booking_id'], row['delivery_cost']) for row in reader)
+
+
+def _notify_cost_added(bookings):
+    """Bulk equivalent of notifications.signals.notify_client_on_delivery_cost."""
+    bookings = [booking for booking in bookings if not booking.payment_completed]
+    notified = set(
+        Notification.objects.filter(
+            booking_id__in=[booking.pk for booking in bookings], notification_type="booking-cost-added"
+        ).values_list('booking_id', flat=True)
+    )
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=booking.client_id,
+            booking=booking,
+            message="The delivery cost for your booking has been set by the admin.",
+            notification_type="booking-cost-added",
+        )
+        for booking in bookings if booking.pk not in notified
+    ])
+
+
+def assign_delivery_costs(costs, batch_size=PRICING_BATCH_SIZE):
+    """
+    Price many bookings at once from {booking_id: delivery_cost}.
+
+    Each batch locks its bookings with one SELECT ... FOR UPDATE and writes
+    the costs with one bulk_update. bulk_update does not fire post_save, so
+    the cost notification the Booking signals send is done here in bulk.
+    Referral bonuses are paid when a booking is settled, not when it is
+    priced. Returns a summary dict.
+    """
+    summary = {'updated': 0, 'missing': []}
+    booking_ids = sorted(costs)
+    for start in range(0, len(booking_ids), batch_size):
+        chunk = booking_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Ordered so concurrent batches take row locks in the same order
+            bookings = list(Booking.objects.select_for_update().filter(pk__in=chunk).order_by('pk'))
+            found = {booking.pk for booking in bookings}
+            summary['missing'].extend(booking_id for booking_id in chunk if booking_id not in found)
+
+            for booking in bookings:
+                booking.delivery_cost = costs[booking.pk]
+                booking.total_delivery_cost = booking.delivery_cost + booking.insurance_payment
+
+            Booking.objects.bulk_update(bookings, ['delivery_cost', 'total_delivery_cost'])
+            _notify_cost_added(bookings)
+
+        summary['updated'] += len(bookings)
+
+    logger.info(f"Bulk priced {summary['updated']} bookings; {len(summary['missing'])} missing")
+    return summary
+
+
+# BULK IMPORT
+
+def _create_import_batch(client, pending, insurance_rate, report):
+    """Check trucks, price and insert one batch of validated rows, then emit its side effects in bulk."""
+    trucks = Truck.objects.filter(
+        pk__in={form.cleaned_data['truck_id'] for _, form in pending}, available=True
+    ).in_bulk()
+    rate_card = get_rate_card()
+
+    rows, bookings = [], []
+    for line, form in pending:
+        if form.cleaned_data['truck_id'] not in trucks:
+            report['errors'].append({'row': line, 'errors': {'truck_id': ['Truck not found or not available.']}})
+            continue
+        booking = form.save(commit=False)
+        booking.client = client
+        booking.truck_id = form.cleaned_data['truck_id']
+        booking.booking_code = str(uuid.uuid4())
+        booking.insurance_payment = (booking.product_value * insurance_rate).quantize(Decimal('0.01'))
+        booking.delivery_cost = rate_card.quote(booking.pickup_state, booking.destination_state, booking.product_weight) or Decimal('0.00')
+        booking.total_delivery_cost = booking.delivery_cost + booking.insurance_payment
+        rows.append(line)
+        bookings.append(booking)
+    if not bookings:
+        return
+
+    with transaction.atomic():
+        bookings = Booking.objects.bulk_create(bookings)
+        # The post_save signals are skipped by bulk_create; do their work once per batch
+        unpriced = sum(1 for booking in bookings if not booking.delivery_cost)
+        message = f"{len(bookings)} bookings were imported from your manifest."
+        if unpriced:
+            message += f" {unpriced} are waiting for delivery cost assignment."
+        notifications = [Notification(user=client, message=message, notification_type="booking-created")]
+        superuser = User.objects.filter(is_superuser=True).first()
+        if superuser and unpriced:
+            notifications.append(Notification(
+                user=superuser,
+                message=f"{client.username} imported {len(bookings)} bookings; "
+                        f"{unpriced} are awaiting delivery cost assignment.",
+                notification_type="booking-created",
+            ))
+        Notification.objects.bulk_create(notifications)
+
+    report['created'].extend(
+        {'row': line, 'booking_id': booking.pk, 'booking_code': booking.booking_code}
+        for line, booking in zip(rows, bookings)
+    )
+
+
+def manifest_is_utf8(upload):
+    """
+    Decode an uploaded manifest chunk by chunk without keeping it, so an
+    encoding error is found before any batch is committed. Rewinds the file.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in upload.chunks():
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        upload.seek(0)
+
+
+def import_bookings(client, rows, insurance_rate=Decimal('0.00'), batch_size=IMPORT_BATCH_SIZE):
+    """
+    Create bookings for `client` from an iterable of manifest rows (dicts).
+
+    Rows are validated one at a time as they are read, so a large CSV is never
+    held in memory; valid rows are inserted every `batch_size` rows with one
+    truck lookup, one bulk_create and one set of notifications. Invalid rows are skipped and reported. Returns
+    {'created': [{row, booking_id, booking_code}], 'errors': [{row, errors}]}.
+    """
+    report = {'created': [], 'errors': []}
+    pending = []
+    for line, row in enumerate(rows, start=1):
+        if line > IMPORT_MAX_ROWS:
+            report['errors'].append({'row': line, 'errors': {'__all__': [f'Imports are limited to {IMPORT_MAX_ROWS} rows.']}})
+            break
+        form = BookingImportForm(row)
+        if not form.is_valid():
+            report['errors'].append({
+                'row': line, 'errors': {field: [str(error) for error in errors] for field, errors in form.errors.items()},
+            })
+            continue
+        pending.append((line, form))
+        if len(pending) >= batch_size:
+            _create_import_batch(client, pending, insurance_rate, report)
+            pending = []
+    if pending:
+        _create_import_batch(client, pending, insurance_rate, report)
+    # Truck errors are found per batch, after later rows' field errors
+    report['errors'].sort(key=lambda error: error['row'])
+
+    logger.info(f"Imported {len(report['created'])} bookings for {client.pk}; {len(report['errors'])} rows rejected")
+    return report
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .availability import release_booking
+from .matching import invalidate_match_index
+from .models import Booking, LaneRate, PricingSurcharge, TierRate, Truck
+from .pricing import invalidate_rate_card
+
+
+@receiver(post_save, sender=TierRate)
+@receiver(post_delete, sender=TierRate)
+@receiver(post_save, sender=PricingSurcharge)
+@receiver(post_delete, sender=PricingSurcharge)
+@receiver(post_save, sender=LaneRate)
+@receiver(post_delete, sender=LaneRate)
+def invalidate_rate_card_on_change(sender, **kwargs):
+    invalidate_rate_card()
+
+
+@receiver(post_save, sender=Booking)
+def release_cancelled_booking(sender, instance, **kwargs):
+    """A cancelled booking no longer holds its truck."""
+    if instance.booking_status == 'cancelled':
+        release_booking(instance.pk)
+
+
+@receiver(post_save, sender=Truck)
+@receiver(post_delete, sender=Truck)
+def invalidate_match_index_on_change(sender, **kwargs):
+    invalidate_match_index()
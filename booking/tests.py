@@ -1,3 +1,72 @@
+from datetime import date
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from users.models import User
+from .admin import TruckReservationAdminForm
+from .availability import TruckUnavailable, reserve_truck
+from .matching import MATCH_POOL_SIZE, invalidate_match_index, match_trucks
+from .models import Truck, TruckReservation
+from .services import manifest_is_utf8
 
-# Create your tests here.
+
+class ManifestEncodingTests(TestCase):
+    def test_bad_byte_after_the_first_chunk_is_caught(self):
+        upload = SimpleUploadedFile('manifest.csv', b'truck_id,product_name\n' + b'1,Cement\n' * 10000 + b'2,Caf\xe9\n')
+        self.assertFalse(manifest_is_utf8(upload))
+        self.assertEqual(upload.tell(), 0)
+
+    def test_utf8_manifest_is_accepted(self):
+        upload = SimpleUploadedFile('manifest.csv', '﻿truck_id,product_name\n1,Café\n'.encode())
+        self.assertTrue(manifest_is_utf8(upload))
+        self.assertEqual(upload.read(3), b'\xef\xbb\xbf')
+
+
+class ReservationOverlapTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='fleet@example.com', username='fleet', password='x')
+        self.truck = Truck.objects.create(owner=owner, name='T1', state='lagos', local_government='Ikeja', available=True)
+        self.reservation = reserve_truck(self.truck.pk, date(2026, 3, 1), date(2026, 3, 5), note='maintenance')
+
+    def admin_form(self, start_date, end_date, instance=None):
+        return TruckReservationAdminForm(
+            {'truck': self.truck.pk, 'start_date': start_date, 'end_date': end_date, 'note': ''}, instance=instance,
+        )
+
+    def test_overlapping_reservation_is_refused(self):
+        with self.assertRaises(TruckUnavailable):
+            reserve_truck(self.truck.pk, date(2026, 3, 4), date(2026, 3, 8))
+        self.assertEqual(TruckReservation.objects.count(), 1)
+
+    def test_back_to_back_reservations_are_allowed(self):
+        reserve_truck(self.truck.pk, date(2026, 3, 5), date(2026, 3, 8))
+        reserve_truck(self.truck.pk, date(2026, 2, 25), date(2026, 3, 1))
+        self.assertEqual(TruckReservation.objects.count(), 3)
+
+    def test_admin_form_refuses_overlap(self):
+        form = self.admin_form('2026-02-27', '2026-03-02')
+        self.assertFalse(form.is_valid())
+        self.assertIn('already booked', str(form.errors))
+
+    def test_admin_can_move_a_reservation_over_its_own_dates(self):
+        form = self.admin_form('2026-03-03', '2026-03-07', instance=self.reservation)
+        self.assertTrue(form.is_valid(), form.errors)
+        moved = reserve_truck(self.truck.pk, date(2026, 3, 3), date(2026, 3, 7), reservation=form.instance)
+        self.assertEqual(moved.pk, self.reservation.pk)
+        self.assertEqual(TruckReservation.objects.get().start_date, date(2026, 3, 3))
+
+
+class MatchWindowTests(TestCase):
+    def test_trucks_past_the_shortlist_fill_the_limit(self):
+        owner = User.objects.create_user(email='big-fleet@example.com', username='big-fleet', password='x')
+        trucks = Truck.objects.bulk_create([
+            Truck(owner=owner, name=f'T{n}', state='lagos', local_government='Ikeja', available=True)
+            for n in range(MATCH_POOL_SIZE + 3)
+        ])
+        window = (date(2026, 5, 1), date(2026, 5, 4))
+        TruckReservation.objects.bulk_create([
+            TruckReservation(truck=truck, start_date=window[0], end_date=window[1]) for truck in trucks[:MATCH_POOL_SIZE]
+        ])
+        invalidate_match_index()
+
+        matches = match_trucks('lagos', 'oyo', trucks[0].weight_range, *window, limit=5)
+        self.assertEqual(sorted(match.truck_id for match in matches), sorted(truck.pk for truck in trucks[MATCH_POOL_SIZE:]))
@@ -3,6 +3,8 @@ from .views import (
     TruckCreateView, TruckListView, BookingCreateView, BookingListView, AvailableTruckListView,
     GenerateReceiptView, BookingUpdateView, AdminBookingCreateView, InsuranceReceiptView,
     AdminTruckListView, AdminTruckDetailView, BookingWithUpdatedCostView, BookingAdminListView,
+    BookingBulkPricingView, BookingImportView, booking_quote, truck_calendar_view,
+    truck_match_view, truck_route_view,
 )
 
 urlpatterns = [
@@ -10,8 +12,13 @@ urlpatterns = [
     path('trucks/', TruckListView.as_view(), name='truck_list'),
     path('bookings/create/<int:truck_id>/', BookingCreateView.as_view(), name='booking-create'),
     path('bookings/', BookingListView.as_view(), name='booking_list'),
+    path('bookings/quote/', booking_quote, name='booking_quote'),
+    path('bookings/match/', truck_match_view, name='truck_match'),
+    path('bookings/import/', BookingImportView.as_view(), name='booking_import'),
     path('edit/<int:pk>/', BookingUpdateView.as_view(), name='booking_edit'),
     path('available-trucks/', AvailableTruckListView.as_view(), name='available_trucks'),
+    path('trucks/<int:pk>/calendar/', truck_calendar_view, name='truck_calendar'),
+    path('trucks/<int:pk>/route/', truck_route_view, name='truck_route'),
     path('bookings/receipt/<str:booking_code>/', GenerateReceiptView.as_view(), name='generate_receipt'),
     path('insurance-receipt/<str:booking_code>/', InsuranceReceiptView.as_view(), name='insurance_receipt'),
     
@@ -20,6 +27,7 @@ urlpatterns = [
     path('admin/trucks/', AdminTruckListView.as_view(), name='admin_truck_list'),
     path('admin/trucks/<int:pk>/', AdminTruckDetailView.as_view(), name='admin_truck_detail'),
     path('admin/bookings/', BookingAdminListView.as_view(), name='admin-booking-list'),
+    path('admin/bookings/bulk-price/', BookingBulkPricingView.as_view(), name='admin-booking-bulk-price'),
     path('bookings/updated-cost/', BookingWithUpdatedCostView.as_view(), name='updated_cost_booking_list'),
     path('admin/create/', AdminBookingCreateView.as_view(), name='admin_booking_create'),
 ]
@@ -3,15 +3,25 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.exceptions import PermissionDenied
 from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, ListView, UpdateView, View, DetailView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.http import JsonResponse, Http404
 from django.contrib import messages
 from django.core.paginator import Paginator
+import csv
+import io
+import json
+from datetime import date, timedelta
+from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 from .forms import TruckForm, BookingForm, TruckApprovalForm, TruckImageForm, AdminBookingForm
 from .models import Truck, Booking, TruckImage
 from subscriptions.models import UserSubscription, SubscriptionPlan
 from users.models import ReferralBonus, Referral, User
+from .availability import MAX_RESERVATION_DAYS, TruckUnavailable, available_in_window, free_from, release_booking, reserve_truck, truck_calendar
+from .matching import MATCH_POOL_SIZE, match_trucks
+from .pricing import quote
+from .routing import plan_truck_route
+from .services import InvalidCostRow, assign_delivery_costs, import_bookings, manifest_is_utf8, parse_cost_csv, parse_cost_rows
 from django.db.models import F
 from django.db import transaction, models
 
@@ -83,6 +93,27 @@ class TruckListView(ListView):
         return Truck.objects.filter(available=True)
 
 
+def _save_with_reservation(form, booking):
+    """Save the booking and reserve its truck for the chosen dates; False if the truck is taken."""
+    reservation_range = form.reservation_range()
+    adding = booking._state.adding
+    try:
+        with transaction.atomic():
+            booking.save()
+            if reservation_range:
+                reserve_truck(booking.truck_id, *reservation_range, booking=booking)
+            else:
+                release_booking(booking.pk)
+    except (TruckUnavailable, ValueError) as e:
+        if adding:
+            # The insert was rolled back with the reservation
+            booking.pk = None
+            booking._state.adding = True
+        form.add_error('pickup_date', str(e))
+        return False
+    return True
+
+
 # Booking Create View
 @method_decorator([login_required, user_type_required('client')], name='dispatch')
 class BookingCreateView(CreateView):
@@ -126,18 +157,24 @@ class BookingCreateView(CreateView):
 
         # Calculate insurance payment as 1% of product value for premium users
         if active_subscription.plan.name == SubscriptionPlan.PREMIUM:
-            insurance_payment = float(form.cleaned_data['product_value']) * 0.01
+            insurance_payment = form.cleaned_data['product_value'] * Decimal('0.01')
         else:
-            insurance_payment = 0
+            insurance_payment = Decimal('0.00')
 
         booking = form.save(commit=False)
         booking.client = user
         booking.truck = get_object_or_404(Truck, id=self.kwargs.get('truck_id'))
         booking.insurance_payment = insurance_payment
 
+        # Price the lane instantly from the rate card; unpriced tiers stay at 0 for an admin to set
+        quoted_cost = quote(booking.pickup_state, booking.destination_state, booking.product_weight)
+        if quoted_cost is not None:
+            booking.delivery_cost = quoted_cost
+
         # Calculate total delivery cost
         booking.total_delivery_cost = booking.delivery_cost + insurance_payment
-        booking.save()
+        if not _save_with_reservation(form, booking):
+            return self.form_invalid(form)
 
         return redirect('booking_list')
     
@@ -188,13 +225,117 @@ class BookingUpdateView(UpdateView):
         ).exclude(plan__name=SubscriptionPlan.FREE).first()
 
         if active_subscription and active_subscription.plan.name == SubscriptionPlan.PREMIUM:
-            booking.insurance_payment = float(form.cleaned_data['product_value']) * 0.01
+            booking.insurance_payment = form.cleaned_data['product_value'] * Decimal('0.01')
         else:
-            booking.insurance_payment = 0
+            booking.insurance_payment = Decimal('0.00')
+
+        # Re-quote only when the lane or weight changed, so a manually set cost survives other edits
+        if {'pickup_state', 'destination_state', 'product_weight'} & set(form.changed_data):
+            quoted_cost = quote(booking.pickup_state, booking.destination_state, booking.product_weight)
+            if quoted_cost is not None:
+                booking.delivery_cost = quoted_cost
 
         booking.total_delivery_cost = booking.delivery_cost + booking.insurance_payment
-        booking.save()
+        if not _save_with_reservation(form, booking):
+            return self.form_invalid(form)
         return redirect(self.success_url)
+
+
+@method_decorator([login_required, user_type_required('client')], name='dispatch')
+class BookingImportView(View):
+    """
+    Create many bookings from a shipment manifest: a CSV upload ("manifest")
+    or a JSON list of rows. Each row has truck_id, product_name, product_weight,
+    product_value, phone_number, pickup_state and destination_state.
+    """
+
+    def post(self, request, *args, **kwargs):
+        active_subscription = UserSubscription.objects.filter(
+            user=request.user,
+            subscription_status='active',
+            is_active=True
+        ).exclude(plan__name=SubscriptionPlan.FREE).select_related('plan').first()
+
+        if not active_subscription:
+            return JsonResponse({"detail": "You must have an active paid subscription to book a truck."}, status=403)
+
+        # Same 1% insurance as BookingCreateView for premium users
+        insurance_rate = Decimal('0.01') if active_subscription.plan.name == SubscriptionPlan.PREMIUM else Decimal('0.00')
+
+        if request.content_type == 'application/json':
+            try:
+                rows = json.loads(request.body)
+            except ValueError:
+                return JsonResponse({"detail": "Invalid JSON body."}, status=400)
+            if isinstance(rows, dict):
+                rows = rows.get('bookings')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return JsonResponse({"detail": "Send a list of booking rows."}, status=400)
+        else:
+            upload = request.FILES.get('manifest')
+            if not upload:
+                return JsonResponse({"detail": "Upload a CSV manifest or send JSON rows."}, status=400)
+            # Batches commit as they fill, so a bad byte must be caught before the first one
+            if not manifest_is_utf8(upload):
+                return JsonResponse({"detail": "The manifest must be UTF-8 encoded CSV."}, status=400)
+            # Read lazily so rows are validated as the file streams in
+            rows = csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+
+        report = import_bookings(request.user, rows, insurance_rate)
+        status = 201 if report['created'] else 400
+        return JsonResponse(report, status=status)
+
+
+@login_required
+def truck_match_view(request):
+    """Ranked trucks for a shipment, best first, as JSON."""
+    pickup_state = request.GET.get('pickup_state')
+    destination_state = request.GET.get('destination_state')
+    weight = request.GET.get('product_weight')
+    if not pickup_state or not weight:
+        return JsonResponse({"detail": "pickup_state and product_weight are required."}, status=400)
+
+    window = None
+    if request.GET.get('start_date') and request.GET.get('end_date'):
+        try:
+            start_date = date.fromisoformat(request.GET['start_date'])
+            end_date = date.fromisoformat(request.GET['end_date'])
+        except ValueError:
+            return JsonResponse({"detail": "Dates must be YYYY-MM-DD."}, status=400)
+        window = (start_date, end_date + timedelta(days=1))
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MATCH_POOL_SIZE))
+    except ValueError:
+        return JsonResponse({"detail": "limit must be a number."}, status=400)
+
+    matches = match_trucks(pickup_state, destination_state, weight, *(window or (None, None)), limit=limit)
+    trucks = Truck.objects.in_bulk([match.truck_id for match in matches])
+    return JsonResponse({"matches": [
+        {
+            **match._asdict(),
+            "name": trucks[match.truck_id].name,
+            "state": trucks[match.truck_id].state,
+            "weight_range": trucks[match.truck_id].weight_range,
+            "book_url": reverse('booking-create', args=[match.truck_id]),
+        }
+        for match in matches if match.truck_id in trucks
+    ]})
+
+
+@login_required
+def booking_quote(request):
+    """Instant delivery cost for a lane, used by the booking form before submitting."""
+    pickup_state = request.GET.get('pickup_state')
+    destination_state = request.GET.get('destination_state')
+    weight = request.GET.get('product_weight')
+    if not pickup_state or not destination_state or not weight:
+        return JsonResponse({"detail": "pickup_state, destination_state and product_weight are required."}, status=400)
+
+    delivery_cost = quote(pickup_state, destination_state, weight)
+    if delivery_cost is None:
+        return JsonResponse({"quoted": False, "detail": "This lane is priced by an admin after booking."})
+    return JsonResponse({"quoted": True, "delivery_cost": str(delivery_cost)})
     
 
 # Generate Receipt View
@@ -460,16 +601,84 @@ class AvailableTruckListView(ListView):
         if state:
             queryset = queryset.filter(state__icontains=state)  # Use icontains for partial matches
 
-        return queryset
+        # Only trucks with no reservation overlapping the requested dates
+        window = self._date_window()
+        if window:
+            queryset = available_in_window(queryset, *window)
+
+        return queryset.order_by('id')
+
+    def _date_window(self):
+        try:
+            start_date = date.fromisoformat(self.request.GET.get('start_date', ''))
+            end_date = date.fromisoformat(self.request.GET.get('end_date', ''))
+        except ValueError:
+            return None
+        if end_date < start_date or (end_date - start_date).days >= MAX_RESERVATION_DAYS:
+            return None
+        return start_date, end_date + timedelta(days=1)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Add filter parameters to the context
         context['weight_range'] = self.request.GET.get('weight_range', '')
         context['state'] = self.request.GET.get('state', '')
+        context['start_date'] = self.request.GET.get('start_date', '')
+        context['end_date'] = self.request.GET.get('end_date', '')
+
+        # When each truck on this page next frees up, in one query
+        trucks = context['available_trucks']
+        free_dates = free_from([truck.id for truck in trucks])
+        for truck in trucks:
+            truck.free_from = free_dates[truck.id]
+        context['today'] = timezone.localdate()
         return context
 
 
+@login_required
+def truck_calendar_view(request, pk):
+    """Booked periods of a truck over the next `days` days (default 60), as JSON."""
+    truck = get_object_or_404(Truck, pk=pk)
+    try:
+        days = min(int(request.GET.get('days', 60)), 365)
+    except ValueError:
+        return JsonResponse({"detail": "days must be a number."}, status=400)
+    reservations = truck_calendar(truck.pk, days=days)
+    return JsonResponse({
+        "truck": truck.pk,
+        "free_from": free_from([truck.pk])[truck.pk].isoformat(),
+        "booked": [
+            # end_date is exclusive; report the last booked day
+            {"start_date": r.start_date.isoformat(), "end_date": (r.end_date - timedelta(days=1)).isoformat()}
+            for r in reservations
+        ],
+    })
+
+
+@login_required
+def truck_route_view(request, pk):
+    """Planned stop order for a truck's open bookings, for its owner or an admin, as JSON."""
+    truck = get_object_or_404(Truck, pk=pk)
+    if truck.owner != request.user and not request.user.is_superuser:
+        raise PermissionDenied("You do not have permission to view this truck's route.")
+    objective = request.GET.get('objective', 'distance')
+    if objective not in ('distance', 'time'):
+        return JsonResponse({"detail": "objective must be 'distance' or 'time'."}, status=400)
+    try:
+        capacity = max(1, int(request.GET.get('capacity', 1)))
+    except ValueError:
+        return JsonResponse({"detail": "capacity must be a number."}, status=400)
+
+    plan = plan_truck_route(truck, objective=objective, capacity=capacity)
+    if plan is None:
+        return JsonResponse({"truck": truck.pk, "stops": []})
+    return JsonResponse({
+        "truck": truck.pk,
+        **plan._asdict(),
+        "stops": [stop._asdict() for stop in plan.stops],
+    })
+
+
 
 
 # ADMIN
@@ -591,41 +800,9 @@ class BookingUpdateDeliveryCostView(View):
         booking.booking_status = 'active'  # Activate booking after assigning cost
         booking.save()
 
-        # Trigger the referral bonus logic
-        self._trigger_referral_bonus(booking)
-
         messages.success(request, f"Delivery cost for Booking {booking.pk} updated successfully.")
         return redirect('admin-update-delivery-cost')
 
-    def _trigger_referral_bonus(self, booking):
-        """
-        Trigger the referral bonus logic after delivery cost is set.
-        """
-        user = booking.client  # Use the correct field (e.g., 'client')
-        try:
-            referral = user.referral_received
-            referrer = referral.referrer
-
-            # Explicitly convert delivery_cost to Decimal
-            delivery_cost = Decimal(str(booking.delivery_cost))  # Convert to string first, then to Decimal
-
-            # Calculate the bonus_amount using Decimal arithmetic
-            bonus_amount = delivery_cost * Decimal('0.015')  # Use Decimal for calculations
-
-            # Add the bonus_amount to the referrer's credits
-            referrer.credits += bonus_amount
-            referrer.save()
-
-            # Create a ReferralBonus record
-            ReferralBonus.objects.create(
-                referrer=referrer,
-                booking_cost=delivery_cost,  # Use the Decimal value
-                bonus_amount=bonus_amount
-            )
-        except AttributeError:
-            # Handle the case where the user has no referral_received
-            pass
-
 
 
 @method_decorator(admin_required, name='dispatch')
@@ -731,36 +908,8 @@ class BookingAdminListView(ListView):
                 booking.total_delivery_cost = booking.delivery_cost + booking.insurance_payment
                 booking.save()
 
-                # Check for referral and apply bonus if exists
-                try:
-                    referral = Referral.objects.select_related('referrer').get(referred_user=booking.client)
-                    referrer = referral.referrer
-                    
-                    # Calculate referral bonus (1.5% of delivery cost)
-                    bonus_amount = delivery_cost * Decimal('0.015')
-                    
-                    # Create referral bonus record
-                    ReferralBonus.objects.create(
-                        referrer=referrer,
-                        booking_cost=delivery_cost,
-                        bonus_amount=bonus_amount
-                    )
-                    
-                    # Update referrer's credits
-                    User.objects.filter(pk=referrer.pk).update(
-                        credits=models.F('credits') + bonus_amount
-                    )
-                    
-                    messages.success(
-                        request, 
-                        f"Delivery cost updated for booking {booking_id}. "
-                        f"Referral bonus of ₦{bonus_amount:.2f} credited to {referrer.email}"
-                    )
-                except Referral.DoesNotExist:
-                    messages.success(
-                        request, 
-                        f"Delivery cost updated for booking {booking_id}. No referral bonus applied."
-                    )
+                # Any referral bonus is paid when the booking's payment is settled
+                messages.success(request, f"Delivery cost updated for booking {booking_id}.")
 
         except Booking.DoesNotExist:
             return JsonResponse({"detail": "Booking not found."}, status=404)
@@ -769,7 +918,42 @@ class BookingAdminListView(ListView):
             return JsonResponse({"detail": "An error occurred while processing your request."}, status=500)
 
         return redirect("admin-booking-list")
-    
+
+
+@method_decorator([login_required, user_type_required('admin')], name='dispatch')
+class BookingBulkPricingView(View):
+    """
+    Price many bookings in one request, from an uploaded booking_id,delivery_cost
+    CSV or a JSON body of {"bookings": [{"booking_id": 1, "delivery_cost": "25000"}, ...]}.
+    """
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_superuser:
+            return JsonResponse({"detail": "Permission denied."}, status=403)
+
+        if request.content_type == 'application/json':
+            try:
+                rows = json.loads(request.body)['bookings']
+                costs = parse_cost_rows((row['booking_id'], row['delivery_cost']) for row in rows)
+            except (ValueError, KeyError, TypeError) as e:
+                return JsonResponse({"detail": str(e) or "Invalid request body."}, status=400)
+            return JsonResponse(assign_delivery_costs(costs))
+
+        upload = request.FILES.get('costs_csv')
+        if not upload:
+            messages.error(request, "Choose a CSV file to upload.")
+            return redirect("admin-booking-list")
+        try:
+            costs = parse_cost_csv(upload.read().decode('utf-8-sig'))
+        except (InvalidCostRow, UnicodeDecodeError) as e:
+            messages.error(request, f"Could not read the CSV: {e}")
+            return redirect("admin-booking-list")
+
+        summary = assign_delivery_costs(costs)
+        messages.success(request, f"Delivery cost updated for {summary['updated']} booking(s).")
+        if summary['missing']:
+            messages.warning(request, f"Bookings not found: {', '.join(map(str, summary['missing'][:20]))}")
+        return redirect("admin-booking-list")
 
 
 @method_decorator([login_required, user_type_required('admin')], name='dispatch')
@@ -0,0 +1,185 @@
+"""
+Streaming data exports for staff.
+
+Each export is a fixed list of columns over one model. Rows are read with
+a server-side cursor (QuerySet.iterator) in EXPORT_CHUNK_SIZE batches and
+written out batch by batch as CSV or Parquet, so memory stays flat however
+many rows there are. The generators here feed StreamingHttpResponse in
+dashboard.views and the export_data command alike.
+
+Parquet needs pyarrow, which is imported only when a Parquet export runs.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import models
+from booking.models import Booking
+from delivery.models import DeliveryHistory
+from payment.models import Payment
+from tracker.models import TrackingEvent
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = ('csv', 'parquet')
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')  # spreadsheets evaluate cells starting with these
+
+# name: (model, date field used by since/until, [(column, lookup), ...])
+EXPORTS = {
+    'bookings': (Booking, 'booked_at', [
+        ('id', 'id'), ('booking_code', 'booking_code'), ('client', 'client__username'),
+        ('truck_id', 'truck_id'), ('truck', 'truck__name'), ('product_name', 'product_name'),
+        ('product_weight', 'product_weight'), ('product_value', 'product_value'),
+        ('pickup_state', 'pickup_state'), ('destination_state', 'destination_state'),
+        ('delivery_cost', 'delivery_cost'), ('insurance_payment', 'insurance_payment'),
+        ('total_delivery_cost', 'total_delivery_cost'), ('booking_status', 'booking_status'),
+        ('payment_completed', 'payment_completed'), ('booked_at', 'booked_at'),
+    ]),
+    'payments': (Payment, 'date_created', [
+        ('id', 'id'), ('ref', 'ref'), ('user', 'user__username'), ('email', 'email'),
+        ('amount', 'amount'), ('verified', 'verified'), ('subscription', 'subscription__name'),
+        ('booking_id', 'booking_id'), ('date_created', 'date_created'),
+    ]),
+    'deliveries': (DeliveryHistory, 'delivery_date', [
+        ('id', 'id'), ('booking_id', 'booking_id'), ('client', 'client__username'),
+        ('truck_id', 'booking__truck_id'), ('pickup_state', 'booking__pickup_state'),
+        ('destination_state', 'booking__destination_state'), ('status', 'status'),
+        ('delivery_date', 'delivery_date'),
+    ]),
+    'tracking_events': (TrackingEvent, 'timestamp', [
+        ('id', 'id'), ('truck_id', 'tracker__truck_id'), ('event_type', 'event_type'),
+        ('timestamp', 'timestamp'), ('latitude', 'latitude'), ('longitude', 'longitude'),
+        ('speed', 'speed'), ('battery_level', 'battery_level'), ('signal_strength', 'signal_strength'),
+    ]),
+}
+
+
+def _field(model, lookup):
+    """The model field a lookup like 'booking__truck_id' ends on."""
+    *path, name = lookup.split('__')
+    for step in path:
+        model = model._meta.get_field(step).related_model
+    field = model._meta.get_field(name)
+    return field.target_field if field.is_relation else field
+
+
+def export_queryset(name, since=None, until=None):
+    """Rows of an export as a values_list queryset, in id order; since/until are dates, until inclusive."""
+    model, date_field, columns = EXPORTS[name]
+    queryset = model.objects.all()
+    is_datetime = isinstance(model._meta.get_field(date_field), models.DateTimeField)
+    if since:
+        since = datetime.combine(since, time.min, tzinfo=dt_timezone.utc) if is_datetime else since
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    if until:
+        until = datetime.combine(until + timedelta(days=1), time.min, tzinfo=dt_timezone.utc) if is_datetime else until + timedelta(days=1)
+        queryset = queryset.filter(**{f'{date_field}__lt': until})
+    return queryset.order_by('id').values_list(*(lookup for _, lookup in columns))
+
+
+def _batches(queryset, chunk_size):
+    batch = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_safe(value):
+    """Quote user-entered text that a spreadsheet would run as a formula; numbers pass through."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(name, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield an export as UTF-8 CSV, one encoded block per batch of rows. Text
+    cells are passed through csv_safe, since names and product descriptions
+    come from users and the file is opened in spreadsheets.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column for column, _ in EXPORTS[name][2])
+    for batch in _batches(export_queryset(name, since, until), chunk_size):
+        writer.writerows([csv_safe(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(name):
+    import pyarrow as pa
+
+    model, _, columns = EXPORTS[name]
+    types = {
+        'BooleanField': pa.bool_(), 'FloatField': pa.float64(), 'DateField': pa.date32(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    fields = []
+    for column, lookup in columns:
+        field = _field(model, lookup)
+        internal = field.get_internal_type()
+        if internal == 'DecimalField':
+            arrow_type = pa.decimal128(field.max_digits, field.decimal_places)
+        elif internal.endswith(('IntegerField', 'AutoField')):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = types.get(internal, pa.string())
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def stream_parquet(name, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield an export as a Parquet file, one row group per batch of rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(name)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for batch in _batches(export_queryset(name, since, until), chunk_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(name, export_format, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format == 'parquet':
+        return stream_parquet(name, since, until, chunk_size)
+    return stream_csv(name, since, until, chunk_size)
@@ -0,0 +1,33 @@
+import sys
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.exports import EXPORT_FORMATS, EXPORTS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings, payments, deliveries or tracking events to a CSV or Parquet file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        if options['format'] == 'parquet' and not options['output']:
+            raise CommandError('Parquet exports need --output.')
+        chunks = stream_export(options['export'], options['format'], options['since'], options['until'])
+
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            size = 0
+            for chunk in chunks:
+                out.write(chunk)
+                size += len(chunk)
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {size / 1024:.0f} KiB to {options['output']}."))
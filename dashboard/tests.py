@@ -1,3 +1,25 @@
+import csv
+import io
+from decimal import Decimal
 from django.test import TestCase
+from booking.models import Booking, Truck
+from users.models import User
+from .exports import csv_safe, stream_csv
 
-# Create your tests here.
+
+class CsvExportTests(TestCase):
+    def test_formula_text_is_quoted(self):
+        for value in ('=HYPERLINK("http://x")', '+1+1', '-2+3', '@SUM(A1)'):
+            self.assertEqual(csv_safe(value), "'" + value)
+        self.assertEqual(csv_safe('Cement'), 'Cement')
+        self.assertEqual(csv_safe(Decimal('-5.00')), Decimal('-5.00'))
+
+    def test_booking_export_neutralises_user_text(self):
+        client = User.objects.create_user(email='c@example.com', username='=cmd|calc', password='x')
+        truck = Truck.objects.create(owner=client, name='T1', state='lagos', local_government='Ikeja')
+        Booking.objects.create(
+            client=client, truck=truck, product_name='@SUM(1+1)', product_weight=truck.weight_range,
+            product_value=Decimal('1000'), phone_number='08000000000', pickup_state='lagos', destination_state='oyo',
+        )
+        rows = list(csv.DictReader(io.StringIO(b''.join(stream_csv('bookings')).decode())))
+        self.assertEqual((rows[0]['client'], rows[0]['product_name']), ("'=cmd|calc", "'@SUM(1+1)"))
@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (ClientDashboardView, 
     TruckOwnerDashboardView, AboutView, 
     ClientHomeView, TruckOwnerHomeView, 
-    AdminHomeView, AdminDashboardView,
+    AdminHomeView, AdminDashboardView, ExportView,
 )
 
 
@@ -15,4 +15,5 @@ urlpatterns = [
     path('client-dashboard/', ClientDashboardView.as_view(), name='client_dashboard'),
     path('truck-owner-dashboard/', TruckOwnerDashboardView.as_view(), name='truck_owner_dashboard'),
     path('admin-dashboard/', AdminDashboardView.as_view(), name='admin_dashboard'),
+    path('exports/<str:name>/', ExportView.as_view(), name='admin_export'),
 ]
@@ -8,16 +8,26 @@ from users.models import User
 from subscriptions.models import UserSubscription
 from booking.models import Booking, Truck, TruckImage
 from delivery.models import DeliverySchedule, DeliveryHistory
+from delivery.eta import get_etas
 from payment.models import Payment
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q, Prefetch, Count
 from django.db import models 
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.contrib.auth import get_user_model
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from datetime import date
+from tracker.health import fleet_health
 from tracker.services import get_tracker_data
+from tracker.telemetry import owner_metrics
+from .exports import EXPORT_FORMATS, EXPORTS, stream_export
 
 User = get_user_model()
 
+DRIVING_METRICS_DAYS = 7
+
 # Create your views here.
 
 @method_decorator(login_required, name='dispatch')
@@ -126,10 +136,13 @@ class ClientDashboardView(TemplateView):
         )
 
         # Delivery schedules
-        delivery_schedules = DeliverySchedule.objects.filter(client=user).values(
-            'booking__truck__name', 'booking__product_name', 'booking__total_delivery_cost', 
+        delivery_schedules = list(DeliverySchedule.objects.filter(client=user).values(
+            'id', 'booking__truck__name', 'booking__product_name', 'booking__total_delivery_cost', 
             'booking__destination_state', 'status'
-        )
+        ))
+        etas = get_etas(schedule['id'] for schedule in delivery_schedules if schedule['status'] != 'delivered')
+        for schedule in delivery_schedules:
+            schedule['eta'] = etas.get(schedule['id'])
 
         # Delivery histories
         delivery_histories = DeliveryHistory.objects.filter(client=user).values(
@@ -277,6 +290,8 @@ class TruckOwnerDashboardView(TemplateView):
             'payment_history': list(payment_history),
             'referral_credits': user.credits,
             'tracked_trucks_page': tracked_trucks_page,
+            'driving_metrics': owner_metrics(user, DRIVING_METRICS_DAYS),
+            'driving_metrics_days': DRIVING_METRICS_DAYS,
         })
 
         return context
@@ -305,17 +320,11 @@ class AdminDashboardView(TemplateView):
         context['pending_trucks_count'] = Truck.objects.filter(available=False).count()
         context['available_trucks_count'] = Truck.objects.filter(available=True).count()
         
-        # Tracking statistics
-        tracked_trucks = Truck.objects.filter(tracker_id__isnull=False)
-        context['tracked_trucks_count'] = tracked_trucks.count()
-
-        # Count online trucks
-        online_count = 0
-        for truck in tracked_trucks:
-            tracker_data = get_tracker_data(truck.tracker_id, self.request.user)
-            if tracker_data and tracker_data.get('status') == 'online':
-                online_count += 1
-        context['online_trucks_count'] = online_count
+        # Tracking statistics, from the health kept by ingestion
+        health = fleet_health()
+        context['fleet_health'] = health
+        context['tracked_trucks_count'] = health['total']
+        context['online_trucks_count'] = health['live']
         
         # Paginated lists
         page = self.request.GET.get('page', 1)
@@ -334,6 +343,9 @@ class AdminDashboardView(TemplateView):
         delivery_schedules = DeliverySchedule.objects.select_related('booking', 'booking__client', 'booking__truck')
         schedule_paginator = Paginator(delivery_schedules, 10)
         context['delivery_schedules'] = schedule_paginator.get_page(page)
+        etas = get_etas(schedule.pk for schedule in context['delivery_schedules'] if schedule.status != 'delivered')
+        for schedule in context['delivery_schedules']:
+            schedule.eta = etas.get(schedule.pk)
         
         # Delivery histories with pagination
         delivery_histories = DeliveryHistory.objects.select_related('booking', 'booking__client', 'booking__truck')
@@ -357,13 +369,9 @@ class AdminDashboardView(TemplateView):
         # Tracked trucks with pagination
         tracked_trucks = Truck.objects.filter(
             tracker_id__isnull=False
-        ).select_related('owner').prefetch_related(
+        ).select_related('owner', 'tracker').prefetch_related(
             Prefetch('bookings', queryset=Booking.objects.filter(booking_status='active'))
-        )  # Added missing closing parenthesis here
-
-        # Add tracker data to each truck
-        for truck in tracked_trucks:
-            truck.tracker_data = get_tracker_data(truck.tracker_id, self.request.user)
+        ).order_by('id')
 
         tracked_paginator = Paginator(tracked_trucks, 10)
         context['tracked_trucks'] = tracked_paginator.get_page(page)
@@ -372,5 +380,36 @@ class AdminDashboardView(TemplateView):
         payments = Payment.objects.select_related('user', 'subscription', 'booking').order_by('-date_created')
         payment_paginator = Paginator(payments, 10)
         context['payments'] = payment_paginator.get_page(page)
+
+        if self.request.user.is_staff:
+            context['export_links'] = [
+                ('bookings', 'Bookings'), ('payments', 'Payments'),
+                ('deliveries', 'Deliveries'), ('tracking_events', 'Tracking events'),
+            ]
         
-        return context
\ No newline at end of file
+        return context
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class ExportView(View):
+    """Stream an export as CSV (default) or ?format=parquet, optionally limited to ?since= and ?until= dates."""
+    content_types = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+    def get(self, request, name):
+        if name not in EXPORTS:
+            raise Http404("Unknown export.")
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest("format must be csv or parquet.")
+        try:
+            since = date.fromisoformat(request.GET['since']) if request.GET.get('since') else None
+            until = date.fromisoformat(request.GET['until']) if request.GET.get('until') else None
+        except ValueError:
+            return HttpResponseBadRequest("Dates must be YYYY-MM-DD.")
+
+        response = StreamingHttpResponse(
+            stream_export(name, export_format, since, until), content_type=self.content_types[export_format],
+        )
+        filename = f"{name}-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,93 @@
+"""
+Backhaul finder.
+
+A truck that delivers lagos -> kano normally drives home empty. For every
+active DeliverySchedule this proposes open bookings (pending and unpaid)
+that pick up near the delivery's destination and fit the truck's weight
+tier, nearest pickup first.
+
+Open bookings are read through booking_open_load_idx, a partial index on
+(pickup_state, product_weight, booked_at) that covers only unpaid pending
+rows. The database keeps it current as bookings are created, paid or
+cancelled, so there is nothing to rebuild, and a whole run is two queries
+however many deliveries are active.
+"""
+from collections import defaultdict, namedtuple
+from itertools import islice
+import numpy as np
+from booking.geography import STATE_CODES, road_distance_matrix
+from booking.models import Booking
+from booking.pricing import TIER_INDEX, WEIGHT_TIERS
+from .models import DeliverySchedule
+
+BACKHAUL_RADIUS_KM = 250  # road km from the drop-off to a return load's pickup
+BACKHAUL_PROPOSALS = 5  # loads proposed per delivery
+
+Backhaul = namedtuple('Backhaul', ['booking_id', 'pickup_state', 'destination_state', 'product_weight', 'distance_km', 'delivery_cost'])
+
+
+def _near_states():
+    """{state: [(state, road km), ...] within BACKHAUL_RADIUS_KM, nearest first}, from the lane distance matrix."""
+    distance = road_distance_matrix()
+    near = {}
+    for i, code in enumerate(STATE_CODES):
+        order = np.argsort(distance[i], kind='stable')
+        near[code] = [(STATE_CODES[j], float(distance[i, j])) for j in order if distance[i, j] <= BACKHAUL_RADIUS_KM]
+    return near
+
+
+NEAR_STATES = _near_states()
+
+
+def active_deliveries():
+    return (
+        DeliverySchedule.objects.filter(status__in=['pending', 'in_transit'])
+        .select_related('booking__truck')
+        .order_by('scheduled_date', 'id')
+    )
+
+
+def find_backhauls(deliveries=None, per_delivery=BACKHAUL_PROPOSALS):
+    """
+    {DeliverySchedule: [Backhaul, ...]} for the given deliveries (default:
+    every active one). Open loads near all of their destinations are fetched
+    in one query and bucketed by (pickup state, weight tier) in memory.
+    """
+    deliveries = list(deliveries if deliveries is not None else active_deliveries())
+    if not deliveries:
+        return {}
+
+    states = {state for d in deliveries for state, _ in NEAR_STATES.get(d.booking.destination_state, [])}
+    max_tier = max(TIER_INDEX.get(d.booking.truck.weight_range, 0) for d in deliveries)
+    loads = (
+        Booking.objects.filter(
+            booking_status='pending', payment_completed=False,
+            pickup_state__in=states, product_weight__in=WEIGHT_TIERS[:max_tier + 1],
+        )
+        .order_by('booked_at')
+        .values_list('id', 'pickup_state', 'destination_state', 'product_weight', 'delivery_cost')
+    )
+    buckets = defaultdict(list)
+    for load in loads.iterator(chunk_size=2000):
+        buckets[load[1], TIER_INDEX[load[3]]].append(load)
+
+    return {
+        delivery: [
+            Backhaul(booking_id, pickup, destination, weight, round(km, 1), cost)
+            for (booking_id, pickup, destination, weight, cost), km in islice(_candidates(delivery, buckets), per_delivery)
+        ]
+        for delivery in deliveries
+    }
+
+
+def _candidates(delivery, buckets):
+    """Open loads for one delivery: nearest pickup state first, then the heaviest load the truck can take."""
+    truck_tier = TIER_INDEX.get(delivery.booking.truck.weight_range, 0)
+    for state, km in NEAR_STATES.get(delivery.booking.destination_state, []):
+        for tier in range(truck_tier, -1, -1):
+            for load in buckets.get((state, tier), ()):
+                yield load, km
+
+
+def backhauls_for(delivery, per_delivery=BACKHAUL_PROPOSALS):
+    return find_backhauls([delivery], per_delivery).get(delivery, [])
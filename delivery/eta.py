@@ -0,0 +1,248 @@
+"""
+Arrival estimates for active deliveries.
+
+An ETA blends two views of the remaining trip:
+
+- live: the truck's remaining road distance to the destination state's
+  capital, divided by its recent effective speed. That speed comes from a
+  time-weighted, exponentially decaying profile of its fixes, so time
+  spent parked slows it down the way it slows the delivery down.
+- lane: how long past deliveries on the same lane took (DeliveryHistory,
+  schedule date to delivery date), scaled to the distance still to go.
+
+The more recent driving the profile has seen, the more weight the live
+view gets. Speed profiles are updated one fix at a time as TrackingEvents
+arrive (delivery.signals for saved events; tracker.services.poll_positions
+calls record_fix for the fixes it bulk-inserts), and each new fix
+recomputes the ETAs of that truck's active deliveries, so pages only read
+ETAs from the cache.
+"""
+import logging
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from booking.geography import MIN_LANE_KM, ROAD_FACTOR, STATE_CENTROIDS, haversine_km
+from tracker.models import TrackingEvent
+from .models import DeliveryHistory, DeliverySchedule
+
+logger = logging.getLogger(__name__)
+
+ETA_CACHE_TTL = 30 * 60
+PROFILE_CACHE_TTL = 24 * 60 * 60
+LANE_STATS_KEY = 'delivery:lane_durations'
+LANE_STATS_TTL = 60 * 60
+PROFILE_HALF_LIFE = 2 * 60 * 60  # seconds; older driving counts half as much
+PROFILE_WINDOW = timedelta(hours=12)  # fixes read when a profile is rebuilt from the database
+MAX_FIX_INTERVAL = 15 * 60  # longer silences are not counted as parked or moving time
+POSITION_MAX_AGE = timedelta(hours=6)  # older positions fall back to the lane estimate
+MOVING_SPEED_KMH = 5.0
+MIN_EFFECTIVE_SPEED = 15.0  # km/h, door to door including stops
+MAX_EFFECTIVE_SPEED = 80.0
+DEFAULT_EFFECTIVE_SPEED = 35.0  # used when a lane has no history
+LIVE_CONFIDENCE_HOURS = 1.0  # hours of recent data at which live and lane views weigh the same
+ARRIVAL_RADIUS_KM = 10.0
+
+Eta = namedtuple('Eta', ['delivery_id', 'eta', 'remaining_km', 'source', 'confidence'])
+
+
+# SPEED PROFILES
+
+def _profile_key(tracker_id):
+    return f'delivery:speed_profile:{tracker_id}'
+
+
+def _decayed(profile, ts):
+    """The profile's sums aged to `ts`."""
+    factor = 0.5 ** (max(ts - profile['ts'], 0) / PROFILE_HALF_LIFE)
+    return {key: profile[key] * factor for key in ('weight', 'moving', 'moving_speed')}
+
+
+def update_speed_profile(tracker_id, ts, speed, latitude, longitude):
+    """
+    Fold one fix (epoch seconds, km/h, position) into the tracker's cached
+    profile. The profile keeps decayed sums of observed time, moving time
+    and moving time x speed; their ratio is the effective speed.
+    """
+    key = _profile_key(tracker_id)
+    profile = cache.get(key)
+    if profile is None:
+        profile = build_speed_profile(tracker_id)
+        if profile is None:
+            return None
+    if ts <= profile['ts']:
+        return profile
+
+    interval = min(ts - profile['ts'], MAX_FIX_INTERVAL)
+    sums = _decayed(profile, ts)
+    moving = speed >= MOVING_SPEED_KMH
+    profile = {
+        'ts': ts,
+        'weight': sums['weight'] + interval,
+        'moving': sums['moving'] + interval * moving,
+        'moving_speed': sums['moving_speed'] + interval * moving * speed,
+        'latitude': latitude if latitude is not None else profile['latitude'],
+        'longitude': longitude if longitude is not None else profile['longitude'],
+    }
+    cache.set(key, profile, PROFILE_CACHE_TTL)
+    return profile
+
+
+def build_speed_profile(tracker_id, now=None):
+    """Rebuild a tracker's profile from its last PROFILE_WINDOW of fixes in one vectorized pass."""
+    now = now or timezone.now()
+    rows = list(
+        TrackingEvent.objects.filter(tracker_id=tracker_id, timestamp__gte=now - PROFILE_WINDOW)
+        .order_by('timestamp').values_list('timestamp', 'speed', 'latitude', 'longitude')
+    )
+    if not rows:
+        return None
+    ts = np.array([row[0].timestamp() for row in rows])
+    speed = np.array([row[1] for row in rows], dtype=float)
+    interval = np.minimum(np.diff(ts, prepend=ts[0]), MAX_FIX_INTERVAL)
+    decay = 0.5 ** ((ts[-1] - ts) / PROFILE_HALF_LIFE)
+    moving = speed >= MOVING_SPEED_KMH
+    positions = [(row[2], row[3]) for row in rows if row[2] is not None and row[3] is not None]
+    latitude, longitude = positions[-1] if positions else (None, None)
+
+    profile = {
+        'ts': float(ts[-1]),
+        'weight': float((decay * interval).sum()),
+        'moving': float((decay * interval * moving).sum()),
+        'moving_speed': float((decay * interval * moving * speed).sum()),
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+    cache.set(_profile_key(tracker_id), profile, PROFILE_CACHE_TTL)
+    return profile
+
+
+def get_speed_profile(tracker_id):
+    return cache.get(_profile_key(tracker_id)) or build_speed_profile(tracker_id)
+
+
+# LANE HISTORY
+
+def lane_durations():
+    """{(pickup, destination): (median hours, deliveries)} from completed deliveries, cached."""
+    stats = cache.get(LANE_STATS_KEY)
+    if stats is not None:
+        return stats
+
+    rows = (
+        DeliveryHistory.objects.filter(status='delivered')
+        # Older histories predate scheduled_date; their reserved pickup day is the next best start
+        .annotate(started=Coalesce('scheduled_date', 'booking__reservation__start_date'))
+        .exclude(started=None)
+        .values_list('booking__pickup_state', 'booking__destination_state', 'started', 'delivery_date')
+    )
+    hours = defaultdict(list)
+    for pickup, destination, started, delivery_date in rows.iterator(chunk_size=2000):
+        # Dates only: a delivery on day d counts as the middle of that day
+        hours[pickup, destination].append((max((delivery_date - started).days, 0) + 0.5) * 24)
+    stats = {lane: (float(np.median(values)), len(values)) for lane, values in hours.items()}
+    cache.set(LANE_STATS_KEY, stats, LANE_STATS_TTL)
+    return stats
+
+
+def invalidate_lane_durations():
+    cache.delete(LANE_STATS_KEY)
+
+
+def _lane_km(pickup_state, destination_state):
+    (lat1, lon1), (lat2, lon2) = STATE_CENTROIDS[pickup_state], STATE_CENTROIDS[destination_state]
+    return max(float(haversine_km(lat1, lon1, lat2, lon2)) * ROAD_FACTOR, MIN_LANE_KM)
+
+
+# ETAS
+
+def _eta_key(delivery_id):
+    return f'delivery:eta:{delivery_id}'
+
+
+def estimate(delivery, profile=None, lanes=None, now=None):
+    """Compute an Eta for a DeliverySchedule (with booking and truck loaded)."""
+    now = now or timezone.now()
+    lanes = lane_durations() if lanes is None else lanes
+    booking = delivery.booking
+    destination = STATE_CENTROIDS.get(booking.destination_state)
+    pickup = STATE_CENTROIDS.get(booking.pickup_state)
+    if destination is None or pickup is None:
+        return None
+    lane_km = _lane_km(booking.pickup_state, booking.destination_state)
+    lane_hours, lane_count = lanes.get((booking.pickup_state, booking.destination_state), (None, 0))
+
+    live = (
+        profile is not None and profile['latitude'] is not None
+        and delivery.status == 'in_transit'
+        and now.timestamp() - profile['ts'] <= POSITION_MAX_AGE.total_seconds()
+    )
+    if not live:
+        # Not under way (or no recent fix): the whole lane from the later of now and the schedule date
+        start = max(now, timezone.make_aware(datetime.combine(delivery.scheduled_date, time.min)))
+        if lane_hours is not None:
+            return Eta(delivery.pk, start + timedelta(hours=lane_hours), round(lane_km, 1), 'lane', round(lane_count / (lane_count + 5), 2))
+        return Eta(delivery.pk, start + timedelta(hours=lane_km / DEFAULT_EFFECTIVE_SPEED), round(lane_km, 1), 'distance', 0.0)
+
+    remaining_km = float(haversine_km(profile['latitude'], profile['longitude'], *destination)) * ROAD_FACTOR
+    if remaining_km <= ARRIVAL_RADIUS_KM:
+        return Eta(delivery.pk, now, 0.0, 'live', 1.0)
+
+    sums = _decayed(profile, now.timestamp())
+    speed = sums['moving_speed'] / sums['weight'] if sums['weight'] else DEFAULT_EFFECTIVE_SPEED
+    live_hours = remaining_km / min(max(speed, MIN_EFFECTIVE_SPEED), MAX_EFFECTIVE_SPEED)
+    prior_hours = (
+        lane_hours * min(remaining_km / lane_km, 1.0) if lane_hours is not None
+        else remaining_km / DEFAULT_EFFECTIVE_SPEED
+    )
+    observed_hours = sums['weight'] / 3600
+    confidence = observed_hours / (observed_hours + LIVE_CONFIDENCE_HOURS)
+    hours = confidence * live_hours + (1 - confidence) * prior_hours
+    return Eta(delivery.pk, now + timedelta(hours=hours), round(remaining_km, 1), 'live', round(confidence, 2))
+
+
+def _active(queryset):
+    return queryset.filter(status__in=['pending', 'in_transit']).select_related('booking__truck__tracker')
+
+
+def refresh_etas(deliveries):
+    """Recompute and cache ETAs for DeliverySchedules. Returns {delivery_id: Eta}."""
+    lanes = lane_durations()
+    profiles = {}
+    etas = {}
+    for delivery in deliveries:
+        tracker = getattr(delivery.booking.truck, 'tracker', None)
+        if tracker is not None and tracker.pk not in profiles:
+            profiles[tracker.pk] = get_speed_profile(tracker.pk)
+        eta = estimate(delivery, profiles.get(tracker.pk) if tracker else None, lanes)
+        if eta is not None:
+            etas[delivery.pk] = eta
+    cache.set_many({_eta_key(delivery_id): eta for delivery_id, eta in etas.items()}, ETA_CACHE_TTL)
+    return etas
+
+
+def get_etas(delivery_ids):
+    """{delivery_id: Eta} for active deliveries, from the cache where possible."""
+    delivery_ids = list(delivery_ids)
+    cached = cache.get_many([_eta_key(delivery_id) for delivery_id in delivery_ids])
+    etas = {eta.delivery_id: eta for eta in cached.values()}
+    missing = [delivery_id for delivery_id in delivery_ids if delivery_id not in etas]
+    if missing:
+        etas.update(refresh_etas(_active(DeliverySchedule.objects.filter(pk__in=missing))))
+    return etas
+
+
+def record_fix(event):
+    """Fold a new TrackingEvent into its tracker's profile and refresh the truck's active ETAs."""
+    profile = update_speed_profile(
+        event.tracker_id, event.timestamp.timestamp(), event.speed, event.latitude, event.longitude,
+    )
+    if profile is None:
+        return {}
+    return refresh_etas(_active(DeliverySchedule.objects.filter(booking__truck__tracker__id=event.tracker_id)))
+
+
+def forget_eta(delivery_id):
+    cache.delete(_eta_key(delivery_id))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from delivery.backhaul import BACKHAUL_PROPOSALS, find_backhauls
+
+
+class Command(BaseCommand):
+    help = 'List open bookings that active deliveries could carry on their return trip.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-delivery', type=int, default=BACKHAUL_PROPOSALS)
+
+    def handle(self, *args, **options):
+        proposals = find_backhauls(per_delivery=options['per_delivery'])
+        matched = 0
+        for delivery, loads in proposals.items():
+            if not loads:
+                continue
+            matched += 1
+            booking = delivery.booking
+            self.stdout.write(f"{booking.truck.name} -> {booking.destination_state} (schedule {delivery.pk}):")
+            for load in loads:
+                self.stdout.write(
+                    f"  booking {load.booking_id}: {load.pickup_state} -> {load.destination_state}, "
+                    f"{load.product_weight}, ~{load.distance_km:.0f} km from drop-off"
+                )
+        self.stdout.write(self.style.SUCCESS(f"{matched} of {len(proposals)} active deliveries have a return load."))
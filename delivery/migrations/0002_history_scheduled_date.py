@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryhistory',
+            name='scheduled_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -27,6 +27,7 @@ class DeliverySchedule(models.Model):
 class DeliveryHistory(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE)
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='delivery_histories', null=True,)
+    scheduled_date = models.DateField(null=True, blank=True)  # copied from the schedule, which is deleted on delivery
     delivery_date = models.DateField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=DeliverySchedule.STATUS_CHOICES)
 
@@ -41,7 +42,8 @@ def move_to_history(sender, instance, **kwargs):
         DeliveryHistory.objects.get_or_create(
             booking=instance.booking,
             client=instance.client,
-            status='delivered'
+            status='delivered',
+            defaults={'scheduled_date': instance.scheduled_date},
         )
         # Optional: Delete the delivery schedule if you don't need it after it's delivered
         instance.delete()
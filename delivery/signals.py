@@ -3,6 +3,8 @@ from django.dispatch import receiver
 from django.utils import timezone
 from booking.models import Booking
 from datetime import datetime
+from tracker.models import TrackingEvent
+from .eta import forget_eta, invalidate_lane_durations, record_fix
 from .models import DeliverySchedule, DeliveryHistory
 
 @receiver(post_save, sender=Booking)
@@ -20,3 +22,19 @@ def create_delivery_schedule(sender, instance, created, **kwargs):
         )
         if not created:
             print(f"Delivery Schedule already exists for Booking {instance.id}")
+
+
+@receiver(post_save, sender=TrackingEvent)
+def update_etas_on_fix(sender, instance, created, **kwargs):
+    if created:
+        record_fix(instance)
+
+
+@receiver(post_save, sender=DeliverySchedule)
+def forget_eta_on_status_change(sender, instance, **kwargs):
+    forget_eta(instance.pk)
+
+
+@receiver(post_save, sender=DeliveryHistory)
+def invalidate_lane_durations_on_delivery(sender, **kwargs):
+    invalidate_lane_durations()
@@ -2,6 +2,7 @@ from django.views.generic import ListView
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from delivery.models import DeliverySchedule, DeliveryHistory
+from .eta import get_etas
 
 # Create your views here.
 
@@ -19,6 +20,13 @@ class ActiveDeliveryView(ListView):
             status__in=['pending', 'in_transit']
         ).select_related('booking')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        etas = get_etas(delivery.pk for delivery in context['active_deliveries'])
+        for delivery in context['active_deliveries']:
+            delivery.eta = etas.get(delivery.pk)
+        return context
+
 
 
 @method_decorator(login_required, name='dispatch')
@@ -61,6 +69,14 @@ class AdminDeliveryScheduleListView(ListView):
             booking__payment_completed=True
         ).select_related('booking', 'client')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        schedules = context['delivery_schedules']
+        etas = get_etas(schedule.pk for schedule in schedules if schedule.status != 'delivered')
+        for schedule in schedules:
+            schedule.eta = etas.get(schedule.pk)
+        return context
+
 @method_decorator([login_required, user_passes_test(admin_required)], name='dispatch')
 class UpdateDeliveryScheduleStatusView(UpdateView):
     model = DeliverySchedule
@@ -76,3 +92,35 @@ class UpdateDeliveryScheduleStatusView(UpdateView):
     def form_valid(self, form):
         # You can add additional logic here if needed
         return super().form_valid(form)
+
+
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.views import View
+from django.http import JsonResponse
+from .backhaul import active_deliveries, find_backhauls
+
+@method_decorator([login_required, user_passes_test(admin_required)], name='dispatch')
+class AdminBackhaulView(View):
+    """Return-load proposals for each active delivery."""
+    template_name = 'delivery/admin_backhauls.html'
+
+    def get(self, request):
+        page_obj = Paginator(active_deliveries(), 20).get_page(request.GET.get('page'))
+        proposals = find_backhauls(page_obj.object_list)
+        return render(request, self.template_name, {
+            'page_obj': page_obj,
+            'deliveries': [(delivery, proposals.get(delivery, [])) for delivery in page_obj],
+        })
+
+
+@login_required
+def delivery_eta_view(request, pk):
+    """Current arrival estimate for one of the client's deliveries (or any, for staff), as JSON."""
+    delivery = get_object_or_404(DeliverySchedule, pk=pk)
+    if delivery.client_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    eta = get_etas([delivery.pk]).get(delivery.pk)
+    if eta is None:
+        return JsonResponse({"delivery": delivery.pk, "status": delivery.status, "eta": None})
+    return JsonResponse({"status": delivery.status, **eta._asdict(), "delivery": delivery.pk})
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('booking-payment-verified', 'Booking Payment Verified'), ('subscription-payment-verified', 'Subscription Payment Verified'), ('booking-created', 'Booking Created'), ('booking-cost-added', 'Booking Cost Added'), ('truck-uploaded', 'Truck Uploaded'), ('truck-available', 'Truck Available'), ('truck-booked', 'Truck Booked'), ('delivery-completed', 'Delivery Completed'), ('subscription-expiring', 'Subscription Expiring'), ('subscription-expired', 'Subscription Expired'), ('tracker-offline', 'Tracker Offline'), ('tracker-low-battery', 'Tracker Low Battery'), ('tracker-restored', 'Tracker Restored')], default='booking-created', max_length=50),
+        ),
+    ]
@@ -14,6 +14,11 @@ class Notification(models.Model):
         ('truck-available', 'Truck Available'),
         ('truck-booked', 'Truck Booked'),
         ('delivery-completed', 'Delivery Completed'),
+        ('subscription-expiring', 'Subscription Expiring'),
+        ('subscription-expired', 'Subscription Expired'),
+        ('tracker-offline', 'Tracker Offline'),
+        ('tracker-low-battery', 'Tracker Low Battery'),
+        ('tracker-restored', 'Tracker Restored'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
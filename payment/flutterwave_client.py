@@ -0,0 +1,72 @@
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.flutterwave.com/v3'
+DEFAULT_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+
+
+class FlutterwaveClient:
+    def __init__(self):
+        self.secret_key = getattr(settings, 'FLUTTERWAVE_SECRET_KEY', None) or ''
+        self.base_url = getattr(settings, 'FLUTTERWAVE_BASE_URL', DEFAULT_BASE_URL)
+        self.timeout = getattr(settings, 'FLUTTERWAVE_TIMEOUT', DEFAULT_TIMEOUT)
+        self.session = self._build_session()
+
+    def _build_session(self):
+        """
+        Keep-alive session shared by every payout call this process makes.
+
+        Transfers move money, so only GETs are retried on 429/5xx; POSTs are
+        retried only when the connection could not be opened at all.
+        """
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.secret_key}',
+            'Content-Type': 'application/json',
+        })
+        return session
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Flutterwave {method} {path} failed: {e}")
+            # Same shape as a Flutterwave error so callers can keep checking response['status']
+            return {'status': 'error', 'message': 'Unable to reach payout provider.', 'data': None}
+
+    def create_transfer(self, account_bank, account_number, amount, narration, reference, beneficiary_name):
+        return self._request('POST', '/transfers', json={
+            'account_bank': account_bank,
+            'account_number': account_number,
+            'amount': float(amount),
+            'narration': narration,
+            'currency': 'NGN',
+            'reference': reference,
+            'beneficiary_name': beneficiary_name,
+        })
+
+    def create_bulk_transfer(self, title, transfers):
+        """
+        Queue several transfers in one call.
+
+        `transfers` are dicts with bank_code, account_number, amount, narration
+        and reference. Flutterwave reports each transfer's outcome separately
+        through the transfer.completed webhook.
+        """
+        return self._request('POST', '/bulk-transfers', json={'title': title, 'bulk_data': transfers})
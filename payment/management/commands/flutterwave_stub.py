@@ -0,0 +1,155 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class StubState:
+    """Transfers and call counters shared by the stub's handler threads."""
+
+    def __init__(self, latency, failure_rate, transfer_failure_rate, webhook_url=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.transfer_failure_rate = transfer_failure_rate
+        self.webhook_url = webhook_url
+        self.secret_hash = getattr(settings, 'FLUTTERWAVE_SECRET_HASH', None) or ''
+        self.transfers = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def count(self, endpoint, n=1):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + n
+
+    def add_transfer(self, item):
+        with self.lock:
+            if item['reference'] in self.transfers:
+                return None
+            transfer = self.transfers[item['reference']] = {
+                'id': len(self.transfers) + 1,
+                'reference': item['reference'],
+                'account_number': item.get('account_number'),
+                'bank_code': item.get('bank_code') or item.get('account_bank'),
+                'amount': item.get('amount'),
+                'currency': item.get('currency', 'NGN'),
+                'status': 'NEW',
+            }
+        return transfer
+
+    def settle(self, transfers):
+        """Complete transfers a moment later and report them, as Flutterwave does."""
+        time.sleep(self.latency)
+        for transfer in transfers:
+            transfer['status'] = 'FAILED' if random.random() < self.transfer_failure_rate else 'SUCCESSFUL'
+            self.count('settled')
+            if self.webhook_url:
+                self.send_webhook(transfer)
+
+    def send_webhook(self, transfer):
+        body = json.dumps({'event': 'transfer.completed', 'event.type': 'Transfer', 'data': transfer}).encode()
+        try:
+            requests.post(
+                self.webhook_url,
+                data=body,
+                headers={'Content-Type': 'application/json', 'verif-hash': self.secret_hash},
+                timeout=10,
+            )
+            self.count('webhook')
+        except requests.exceptions.RequestException:
+            self.count('webhook_failed')
+
+
+class FlutterwaveStubHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate_upstream(self):
+        time.sleep(self.state.latency)
+        if random.random() < self.state.failure_rate:
+            self._send(503, {'status': 'error', 'message': 'Service unavailable (stub)', 'data': None})
+            return False
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+
+        if path == '/transfers':
+            return self._transfer(data)
+        if path == '/bulk-transfers':
+            return self._bulk_transfer(data)
+        self._send(404, {'status': 'error', 'message': 'Not found', 'data': None})
+
+    def _transfer(self, data):
+        self.state.count('transfer')
+        if not self._simulate_upstream():
+            return
+        transfer = self.state.add_transfer(data)
+        if transfer is None:
+            return self._send(400, {'status': 'error', 'message': 'Duplicate reference', 'data': None})
+        threading.Thread(target=self.state.settle, args=([transfer],), daemon=True).start()
+        self._send(200, {'status': 'success', 'message': 'Transfer Queued Successfully', 'data': transfer})
+
+    def _bulk_transfer(self, data):
+        items = data.get('bulk_data') or []
+        self.state.count('bulk_transfer')
+        self.state.count('bulk_items', len(items))
+        if not self._simulate_upstream():
+            return
+        # Duplicate references are skipped, so a resubmitted batch only pays the new ones
+        transfers = [t for t in (self.state.add_transfer(item) for item in items) if t is not None]
+        threading.Thread(target=self.state.settle, args=(transfers,), daemon=True).start()
+        with self.state.lock:
+            batch_id = self.state.calls['bulk_transfer']
+        self._send(200, {
+            'status': 'success',
+            'message': 'Bulk transfer queued',
+            'data': {'id': batch_id, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()), 'approver': 'N/A'},
+        })
+
+
+class Command(BaseCommand):
+    help = 'Run a local Flutterwave transfers stand-in for load testing (set FLUTTERWAVE_BASE_URL to its address).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--latency-ms', type=int, default=300, help='Artificial delay added to every call.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 503.')
+        parser.add_argument('--transfer-failure-rate', type=float, default=0.0, help='Fraction of transfers reported FAILED.')
+        parser.add_argument('--webhook-url', help='Deliver a transfer.completed webhook here for every transfer.')
+
+    def handle(self, *args, **options):
+        state = StubState(
+            options['latency_ms'] / 1000.0, options['failure_rate'], options['transfer_failure_rate'], options['webhook_url'],
+        )
+        handler = type('Handler', (FlutterwaveStubHandler,), {'state': state})
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Flutterwave stub listening on http://{options['host']}:{options['port']} - Ctrl+C to stop"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Upstream calls served: {state.calls}")
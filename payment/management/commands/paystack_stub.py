@@ -0,0 +1,166 @@
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import requests
+from django.core.management.base import BaseCommand
+from payment.paystack_client import PaystackClient
+
+
+class StubState:
+    """Transactions and call counters shared by the stub's handler threads."""
+
+    def __init__(self, latency, failure_rate, webhook_url=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.webhook_url = webhook_url
+        self.secret_key = PaystackClient().secret_key
+        self.transactions = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def send_webhook(self, transaction):
+        """POST a signed charge.success event, as Paystack does once a payment clears."""
+        body = json.dumps({'event': 'charge.success', 'data': transaction}).encode()
+        signature = hmac.new(self.secret_key.encode(), body, hashlib.sha512).hexdigest()
+        try:
+            requests.post(
+                self.webhook_url,
+                data=body,
+                headers={'Content-Type': 'application/json', 'X-Paystack-Signature': signature},
+                timeout=10,
+            )
+            self.count('webhook')
+        except requests.exceptions.RequestException:
+            self.count('webhook_failed')
+
+
+class PaystackStubHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate_upstream(self):
+        time.sleep(self.state.latency)
+        if random.random() < self.state.failure_rate:
+            self._send(503, {'status': False, 'message': 'Service unavailable (stub)'})
+            return False
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+
+        if path != '/transaction/initialize':
+            return self._send(404, {'status': False, 'message': 'Not found'})
+
+        self.state.count('initialize')
+        if not self._simulate_upstream():
+            return
+
+        reference = data.get('reference') or uuid.uuid4().hex
+        with self.state.lock:
+            if reference in self.state.transactions:
+                return self._send(400, {'status': False, 'message': 'Duplicate Transaction Reference'})
+            transaction = self.state.transactions[reference] = {
+                'id': len(self.state.transactions) + 1,
+                'reference': reference,
+                'amount': data.get('amount'),
+                'status': 'success',  # the stub treats every initialized payment as paid
+                'customer': {'email': data.get('email')},
+                'paid_at': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+            }
+        if self.state.webhook_url:
+            threading.Thread(target=self.state.send_webhook, args=(transaction,), daemon=True).start()
+        self._send(200, {
+            'status': True,
+            'message': 'Authorization URL created',
+            'data': {
+                'authorization_url': data.get('callback_url') or f'https://checkout.paystack.com/{reference}',
+                'access_code': uuid.uuid4().hex[:15],
+                'reference': reference,
+            },
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+
+        if path == '/transaction':
+            return self._list_transactions(parse_qs(url.query))
+        if not path.startswith('/transaction/verify/'):
+            return self._send(404, {'status': False, 'message': 'Not found'})
+
+        self.state.count('verify')
+        if not self._simulate_upstream():
+            return
+
+        reference = path.rsplit('/', 1)[-1]
+        transaction = self.state.transactions.get(reference)
+        if transaction is None:
+            return self._send(400, {'status': False, 'message': 'Transaction reference not found'})
+        self._send(200, {'status': True, 'message': 'Verification successful', 'data': transaction})
+
+    def _list_transactions(self, query):
+        self.state.count('list')
+        if not self._simulate_upstream():
+            return
+
+        page = int(query.get('page', ['1'])[0])
+        per_page = int(query.get('perPage', ['50'])[0])
+        with self.state.lock:
+            transactions = sorted(self.state.transactions.values(), key=lambda tx: tx['id'], reverse=True)
+        page_count = max(1, -(-len(transactions) // per_page))
+        self._send(200, {
+            'status': True,
+            'message': 'Transactions retrieved',
+            'data': transactions[(page - 1) * per_page:page * per_page],
+            'meta': {'total': len(transactions), 'perPage': per_page, 'page': page, 'pageCount': page_count},
+        })
+
+
+class Command(BaseCommand):
+    help = 'Run a local Paystack stand-in for load testing (set PAYSTACK_BASE_URL to its address).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=int, default=150, help='Artificial delay added to every call.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 503.')
+        parser.add_argument('--webhook-url', help='Deliver a signed charge.success webhook here for every payment.')
+
+    def handle(self, *args, **options):
+        state = StubState(options['latency_ms'] / 1000.0, options['failure_rate'], options['webhook_url'])
+        handler = type('Handler', (PaystackStubHandler,), {'state': state})
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Paystack stub listening on http://{options['host']}:{options['port']} - Ctrl+C to stop"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Upstream calls served: {state.calls}")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from payment.models import FlutterwaveEvent
+from payment.services import SETTLEMENT_BATCH_SIZE, process_flutterwave_events, replay_flutterwave_events
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Flutterwave webhook events in batches, optionally replaying stored events first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SETTLEMENT_BATCH_SIZE)
+        parser.add_argument('--replay', type=int, nargs='+', metavar='ID', help='Requeue these event ids.')
+        parser.add_argument('--replay-failed', action='store_true', help='Requeue every failed event.')
+        parser.add_argument('--since-hours', type=int, help='Limit --replay-failed to events received in the last N hours.')
+
+    def handle(self, *args, **options):
+        if options['replay'] or options['replay_failed']:
+            events = FlutterwaveEvent.objects.all()
+            if options['replay']:
+                events = events.filter(id__in=options['replay'])
+            else:
+                events = events.filter(status='failed')
+                if options['since_hours']:
+                    events = events.filter(received_at__gte=timezone.now() - timedelta(hours=options['since_hours']))
+            requeued = replay_flutterwave_events(events)
+            self.stdout.write(f'Requeued {requeued} event(s).')
+
+        handled = process_flutterwave_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Handled {handled} Flutterwave event(s).'))
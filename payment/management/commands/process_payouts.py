@@ -0,0 +1,18 @@
+import json
+from django.core.management.base import BaseCommand
+from payment.services import PAYOUT_BATCH_SIZE, payout_metrics, process_payouts
+
+
+class Command(BaseCommand):
+    help = 'Send queued withdrawals to Flutterwave as bulk transfers and report payout queue metrics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PAYOUT_BATCH_SIZE, help='Transfers per bulk-transfer call.')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches (default: drain the queue).')
+        parser.add_argument('--metrics-only', action='store_true', help='Only print queue depth and throughput.')
+
+    def handle(self, *args, **options):
+        if not options['metrics_only']:
+            submitted = process_payouts(batch_size=options['batch_size'], max_batches=options['max_batches'])
+            self.stdout.write(self.style.SUCCESS(f'Submitted {submitted} payout(s).'))
+        self.stdout.write(json.dumps(payout_metrics(), indent=2))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from payment.services import SETTLEMENT_BATCH_SIZE, process_paystack_events
+
+
+class Command(BaseCommand):
+    help = 'Settle pending Paystack webhook events in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SETTLEMENT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        handled = process_paystack_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Handled {handled} Paystack event(s).'))
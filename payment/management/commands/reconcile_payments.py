@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payment.models import ReconciliationRun
+from payment.reconciliation import run_reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Reconcile Payment, Booking and UserSubscription state against Paystack transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Only reconcile transactions from the last N days (0 for all).')
+        parser.add_argument('--per-page', type=int, default=100)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it.')
+        parser.add_argument(
+            '--resume',
+            nargs='?',
+            const='latest',
+            help='Resume an interrupted run (by id, or the latest unfinished one).'
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            runs = ReconciliationRun.objects.exclude(status='completed').order_by('-id')
+            if options['resume'] != 'latest':
+                runs = runs.filter(id=options['resume'])
+            run = runs.first()
+            if run is None:
+                raise CommandError('No unfinished reconciliation run to resume.')
+            run.status = 'running'
+            run.save(update_fields=['status', 'updated_at'])
+            self.stdout.write(f'Resuming run {run.id} after page {run.last_page}.')
+        else:
+            now = timezone.now()
+            run = ReconciliationRun.objects.create(
+                window_start=now - timedelta(days=options['days']) if options['days'] else None,
+                window_end=now,
+                per_page=options['per_page'],
+                dry_run=options['dry_run'],
+            )
+            self.stdout.write(f'Started reconciliation run {run.id}.')
+
+        def report(reference, kind):
+            self.stdout.write(f'{kind}\t{reference}')
+
+        try:
+            run_reconciliation(run, report=report)
+        except Exception as e:
+            raise CommandError(f'Run {run.id} stopped after page {run.last_page}: {e}. Re-run with --resume {run.id}.')
+
+        summary = ', '.join(f'{key}={value}' for key, value in sorted(run.stats.items()))
+        self.stdout.write(self.style.SUCCESS(f'Run {run.id} completed ({summary}).'))
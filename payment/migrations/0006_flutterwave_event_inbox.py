@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_withdrawal_payout_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='withdrawalrequest',
+            name='flutterwave_transfer_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='FlutterwaveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(max_length=50)),
+                ('event_key', models.CharField(max_length=255)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='flutterwave_event_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'event_key'), name='unique_flutterwave_event_key')],
+            },
+        ),
+    ]
@@ -39,7 +39,7 @@ class Payment(models.Model):
             if self.subscription:
                 user_subscription, created = UserSubscription.objects.get_or_create(
                     user=self.user,
-                    subscription=self.subscription,
+                    plan=self.subscription,
                     defaults={
                         'start_date': timezone.now(),
                         'end_date': timezone.now() + self.subscription.duration,
@@ -54,11 +54,93 @@ class Payment(models.Model):
                     user_subscription.is_active = True
                     user_subscription.start_date = timezone.now()
                     user_subscription.end_date = timezone.now() + self.subscription.duration
+                    user_subscription.renewal_reminder_sent_at = None
                     user_subscription.save()
             return True
         return False
 
 
+class PaystackEvent(models.Model):
+    """Raw Paystack webhook delivery, stored once per (event, reference) and settled by a worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    event = models.CharField(max_length=50)
+    reference = models.CharField(max_length=255)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Provider retries of the same delivery collapse into one row
+            models.UniqueConstraint(fields=['event', 'reference'], name='unique_paystack_event_reference'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='paystack_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference} ({self.status})"
+
+
+class FlutterwaveEvent(models.Model):
+    """Raw Flutterwave webhook delivery, stored once per provider event and applied by a worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    event = models.CharField(max_length=50)
+    event_key = models.CharField(max_length=255)  # transfer id + status, stable across provider retries
+    reference = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'event_key'], name='unique_flutterwave_event_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='flutterwave_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.event_key} ({self.status})"
+
+
+class ReconciliationRun(models.Model):
+    """Checkpoint for a reconcile_payments pass over Paystack's transaction listing."""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    window_start = models.DateTimeField(null=True, blank=True)
+    window_end = models.DateTimeField()  # Fixed at start so page numbers stay stable across resumes
+    per_page = models.PositiveIntegerField(default=100)
+    last_page = models.PositiveIntegerField(default=0)
+    dry_run = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    stats = models.JSONField(default=dict)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Reconciliation {self.id} ({self.status}, page {self.last_page})"
+
 
 class WithdrawalMethod(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -75,7 +157,9 @@ class WithdrawalRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
+        ('unknown', 'Unknown'),  # the provider may have received it; awaiting its webhook or an admin
         ('completed', 'Completed'),
+        ('failed', 'Failed'),
         ('rejected', 'Rejected')
     ]
     
@@ -87,5 +171,14 @@ class WithdrawalRequest(models.Model):
     admin_notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
-    flutterwave_transfer_id = models.CharField(max_length=100, blank=True, null=True)
+    flutterwave_transfer_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     flutterwave_reference = models.CharField(max_length=100, blank=True, null=True)
+    flutterwave_batch_id = models.CharField(max_length=100, blank=True, null=True)  # bulk transfer it was sent in
+    attempts = models.PositiveSmallIntegerField(default=0)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Payout queue scans and the queue-depth metrics
+            models.Index(fields=['status', 'id'], name='withdrawal_queue_idx'),
+        ]
@@ -1,29 +1,136 @@
+import time
+import uuid
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.paystack.co'
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+VERIFY_CACHE_TTL = 300  # seconds a successful verification is reused for the same reference
+VERIFY_PENDING_CACHE_TTL = 10  # non-final results (abandoned, ongoing, failed) are only absorbed briefly
+VERIFY_LOCK_TTL = 15  # seconds one caller may hold the upstream verify for a reference
+VERIFY_LOCK_WAIT = 5  # seconds other callers wait for that result before giving up
+
 
 class PaystackClient:
     def __init__(self):
-        self.secret_key = 'sk_test_578e98623123672928132bb40df9ec97f9631cda'
-        self.base_url = 'https://api.paystack.co'
+        self.secret_key = getattr(settings, 'PAYSTACK_SECRET_KEY', None) or 'sk_test_578e98623123672928132bb40df9ec97f9631cda'
+        self.base_url = getattr(settings, 'PAYSTACK_BASE_URL', DEFAULT_BASE_URL)
+        self.timeout = getattr(settings, 'PAYSTACK_TIMEOUT', DEFAULT_TIMEOUT)
+        self.session = self._build_session()
 
-    def initialize_transaction(self, email, amount, reference, callback_url):
-        url = f'{self.base_url}/transaction/initialize'
-        headers = {
+    def _build_session(self):
+        """
+        Keep-alive session shared by every request this process makes.
+
+        GETs are retried with backoff on connection errors and 429/5xx.
+        POSTs are only retried when the connection could not be opened,
+        i.e. when Paystack never saw the request.
+        """
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
             'Authorization': f'Bearer {self.secret_key}',
             'Content-Type': 'application/json',
-        }
+        })
+        return session
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Paystack {method} {path} failed: {e}")
+            # Same shape as a Paystack error so callers can keep checking response['status']
+            return {'status': False, 'message': 'Unable to reach payment provider.'}
+
+    def initialize_transaction(self, email, amount, reference, callback_url):
         data = {
             'email': email,
             'amount': amount,
             'reference': reference,
             'callback_url': callback_url,
         }
-        response = requests.post(url, headers=headers, json=data)
-        return response.json()
+        return self._request('POST', '/transaction/initialize', json=data)
 
-    def verify_transaction(self, reference):
-        url = f'{self.base_url}/transaction/verify/{reference}'
-        headers = {
-            'Authorization': f'Bearer {self.secret_key}',
-        }
-        response = requests.get(url, headers=headers)
-        return response.json()
+    def verify_transaction(self, reference, use_cache=True):
+        """
+        Verify a transaction, reusing a recent result for the same reference.
+
+        Only one caller per reference goes upstream at a time; concurrent
+        callers (callback reloads, webhook retries) wait briefly for its result
+        and get an error response, never a second upstream call, if it does
+        not arrive in time.
+        """
+        if not use_cache:
+            return self._request('GET', f'/transaction/verify/{reference}')
+
+        cache_key = f'paystack:verify:{reference}'
+        lock_key = f'{cache_key}:lock'
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        token = uuid.uuid4().hex
+        if not cache.add(lock_key, token, VERIFY_LOCK_TTL):
+            deadline = time.monotonic() + VERIFY_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            return {'status': False, 'message': 'Verification already in progress, please retry shortly.'}
+
+        try:
+            result = self._request('GET', f'/transaction/verify/{reference}')
+            # Transport failures are not cached so the next caller retries upstream
+            if result.get('status'):
+                succeeded = (result.get('data') or {}).get('status') == 'success'
+                cache.set(cache_key, result, VERIFY_CACHE_TTL if succeeded else VERIFY_PENDING_CACHE_TTL)
+            return result
+        finally:
+            # Only release our own lock; after VERIFY_LOCK_TTL another caller may hold it
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def list_transactions(self, page=1, per_page=100, **filters):
+        """One page of GET /transaction; filters are passed through (status, from, to, ...)."""
+        params = {'page': page, 'perPage': per_page, **filters}
+        return self._request('GET', '/transaction', params=params)
+
+    def iter_transactions(self, start_page=1, per_page=100, **filters):
+        """
+        Yield (page_number, transactions) for every page of the listing.
+
+        Only one page is held in memory at a time. Raises RuntimeError if a
+        page cannot be fetched after the session's retries, so callers can
+        checkpoint and resume from that page later.
+        """
+        page = start_page
+        while True:
+            response = self.list_transactions(page=page, per_page=per_page, **filters)
+            if not response.get('status'):
+                raise RuntimeError(f"Could not list transactions (page {page}): {response.get('message')}")
+            transactions = response.get('data') or []
+            if not transactions:
+                return
+            yield page, transactions
+            page_count = (response.get('meta') or {}).get('pageCount')
+            if page_count is not None and page >= int(page_count):
+                return
+            page += 1
@@ -0,0 +1,179 @@
+"""
+Bulk reconciliation of local payment state against Paystack's transaction listing.
+
+The listing is streamed page by page; each page is matched against Payment,
+Booking and UserSubscription through their indexed reference columns, and
+drift is repaired with a handful of bulk statements per page. Progress is
+checkpointed on a ReconciliationRun after every page so an interrupted run
+can resume where it stopped.
+"""
+import logging
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from booking.models import Booking, Receipt
+from delivery.models import DeliverySchedule
+from subscriptions.models import UserSubscription
+from users.ledger import award_booking_referral_bonus
+from .models import Payment
+from .paystack_client import PaystackClient
+from .services import amount_covers
+
+logger = logging.getLogger(__name__)
+
+FAILED_STATUSES = ('failed', 'reversed')
+
+
+def _repair(bookings, subscriptions, new_payments, unverified_payment_ids):
+    today = timezone.now().date()
+
+    if bookings:
+        booking_ids = [booking.id for booking in bookings]
+        Booking.objects.filter(id__in=booking_ids).update(payment_completed=True, booking_status='active')
+        Receipt.objects.bulk_create([
+            Receipt(
+                booking=booking,
+                delivery_cost=booking.delivery_cost,
+                insurance_payment=booking.insurance_payment,
+                total_delivery_cost=booking.total_delivery_cost,
+            )
+            for booking in bookings
+        ], ignore_conflicts=True)
+
+        # The post_save signal that normally schedules delivery does not fire for bulk updates
+        scheduled = set(DeliverySchedule.objects.filter(booking_id__in=booking_ids).values_list('booking_id', flat=True))
+        DeliverySchedule.objects.bulk_create([
+            DeliverySchedule(booking=booking, client=booking.client, scheduled_date=today, status='pending')
+            for booking in bookings if booking.id not in scheduled
+        ])
+
+        # Settlement pays the referrer; keyed on the booking, so a bonus already paid is skipped
+        for booking in bookings:
+            award_booking_referral_bonus(booking)
+
+    if subscriptions:
+        UserSubscription.objects.filter(id__in=[subscription.id for subscription in subscriptions]).update(
+            payment_completed=True, is_active=True, subscription_status='active', renewal_reminder_sent_at=None,
+        )
+
+    if new_payments:
+        Payment.objects.bulk_create(new_payments, ignore_conflicts=True)
+
+    if unverified_payment_ids:
+        Payment.objects.filter(id__in=unverified_payment_ids).update(verified=True)
+
+
+def reconcile_page(transactions, dry_run=False):
+    """
+    Match one page of provider transactions against local rows.
+
+    Returns (counts, drift) where drift is a list of (reference, kind) pairs.
+    Local rows that look paid while the provider reports the charge as failed
+    or reversed are only reported, never changed.
+    """
+    by_reference = {tx['reference']: tx for tx in transactions if tx.get('reference')}
+    references = list(by_reference)
+
+    payments = {payment.ref: payment for payment in Payment.objects.filter(ref__in=references).only('id', 'ref', 'verified')}
+    bookings = {
+        booking.booking_code: booking
+        for booking in Booking.objects.filter(booking_code__in=references).select_related('client')
+    }
+    subscriptions = {
+        subscription.subscription_code: subscription
+        for subscription in UserSubscription.objects.filter(subscription_code__in=references).select_related('user', 'plan')
+    }
+
+    counts = Counter(seen=len(transactions))
+    drift = []
+    bookings_to_settle, subscriptions_to_settle, new_payments, unverified_payment_ids = [], [], [], []
+
+    for reference, tx in by_reference.items():
+        booking = bookings.get(reference)
+        subscription = subscriptions.get(reference)
+        payment = payments.get(reference)
+
+        if tx.get('status') in FAILED_STATUSES:
+            if (booking and booking.payment_completed) or (subscription and subscription.payment_completed) \
+                    or (payment and payment.verified):
+                drift.append((reference, 'paid_locally_but_failed_upstream'))
+            continue
+        if tx.get('status') != 'success':
+            continue
+
+        counts['succeeded'] += 1
+        if booking is None and subscription is None and payment is None:
+            drift.append((reference, 'unknown_reference'))
+            continue
+
+        expected = booking.total_delivery_cost if booking else (subscription.plan.price if subscription and subscription.plan else 0)
+        if not amount_covers(tx, expected):
+            drift.append((reference, 'amount_mismatch'))
+            continue
+
+        if booking and not booking.payment_completed:
+            drift.append((reference, 'booking_unpaid'))
+            bookings_to_settle.append(booking)
+        if subscription and not subscription.payment_completed:
+            drift.append((reference, 'subscription_unpaid'))
+            subscriptions_to_settle.append(subscription)
+
+        if payment is None:
+            drift.append((reference, 'payment_missing'))
+            if booking:
+                new_payments.append(Payment(
+                    user=booking.client, booking=booking, amount=booking.delivery_cost,
+                    ref=reference, email=booking.client.email, verified=True,
+                ))
+            elif subscription:
+                new_payments.append(Payment(
+                    user=subscription.user, subscription=subscription.plan,
+                    amount=subscription.plan.price if subscription.plan else 0,
+                    ref=reference, email=subscription.user.email, verified=True,
+                ))
+        elif not payment.verified:
+            drift.append((reference, 'payment_unverified'))
+            unverified_payment_ids.append(payment.id)
+
+    counts.update(kind for _, kind in drift)
+
+    if not dry_run and (bookings_to_settle or subscriptions_to_settle or new_payments or unverified_payment_ids):
+        with transaction.atomic():
+            _repair(bookings_to_settle, subscriptions_to_settle, new_payments, unverified_payment_ids)
+        counts['repaired'] += len(bookings_to_settle) + len(subscriptions_to_settle) + len(new_payments) + len(unverified_payment_ids)
+
+    return counts, drift
+
+
+def run_reconciliation(run, client=None, report=None):
+    """
+    Process every remaining page of `run`, checkpointing after each one.
+
+    `report` is called with (reference, kind) for every drift found.
+    """
+    client = client or PaystackClient()
+    filters = {'to': run.window_end.isoformat()}
+    if run.window_start:
+        filters['from'] = run.window_start.isoformat()
+
+    try:
+        for page, transactions in client.iter_transactions(start_page=run.last_page + 1, per_page=run.per_page, **filters):
+            counts, drift = reconcile_page(transactions, dry_run=run.dry_run)
+            if report:
+                for reference, kind in drift:
+                    report(reference, kind)
+
+            stats = Counter(run.stats)
+            stats.update(counts)
+            run.stats = dict(stats)
+            run.last_page = page
+            run.save(update_fields=['stats', 'last_page', 'updated_at'])
+    except Exception:
+        logger.exception(f"Reconciliation run {run.id} stopped at page {run.last_page + 1}")
+        run.status = 'failed'
+        run.save(update_fields=['status', 'updated_at'])
+        raise
+
+    run.status = 'completed'
+    run.save(update_fields=['status', 'updated_at'])
+    return run
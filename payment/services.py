@@ -1,33 +1,485 @@
+import hashlib
+import json
 import uuid
-import requests
+from .flutterwave_client import FlutterwaveClient
+
+flutterwave_client = FlutterwaveClient()
+
+
+# PAYSTACK SETTLEMENT
+
+import logging
+from decimal import Decimal
 from django.conf import settings
-from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail
+from booking.models import Booking, Receipt
+from subscriptions.models import UserSubscription
+from users.ledger import award_booking_referral_bonus
+from .models import Payment, PaystackEvent
 
-FLUTTERWAVE_URL = "https://api.flutterwave.com/v3"
+logger = logging.getLogger(__name__)
 
-def initiate_flutterwave_payout(account_bank, account_number, amount, narration, recipient_name):
-    headers = {
-        "Authorization": f"Bearer {settings.FLUTTERWAVE_SECRET_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "account_bank": account_bank,  # e.g., "044" for Access Bank Nigeria
-        "account_number": account_number,
-        "amount": amount,
-        "narration": narration,
-        "currency": "NGN",
-        "reference": f"WDR_{uuid.uuid4().hex[:10]}",
-        "beneficiary_name": recipient_name
+SETTLEMENT_BATCH_SIZE = 100
+INSURANCE_COMPANY = "Veritas Kapital Assurance"
+
+
+def send_booking_receipt_email(booking, receipt):
+    context = {
+        'booking': booking,
+        'truck_name': booking.truck.name,
+        'has_premium': booking.insurance_payment > 0,
+        'insurance_company': INSURANCE_COMPANY,
+        'receipt': receipt
     }
+    booking_receipt_html = render_to_string('booking/receipt_email.html', context)
+
+    message = Mail(
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to_emails=booking.client.email,
+        subject=f"Your Booking Receipt - #{booking.booking_code}",
+        html_content=booking_receipt_html,
+        plain_text_content=strip_tags(booking_receipt_html)
+    )
 
     try:
-        response = requests.post(
-            f"{FLUTTERWAVE_URL}/transfers",
-            headers=headers,
-            json=payload
+        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
+
+        # Attach insurance receipt if applicable
+        if context['has_premium']:
+            insurance_receipt_html = render_to_string('booking/insurance_receipt_email.html', context)
+            message.add_content(insurance_receipt_html, "text/html")
+
+        response = sg.send(message)
+        logger.info(f"Receipt email sent to {booking.client.email}. Status: {response.status_code}")
+    except Exception as e:
+        logger.error(f"Error sending receipt email: {str(e)}")
+
+
+def amount_covers(data, expected):
+    # Paystack reports amounts in kobo
+    return int(data.get('amount') or 0) >= int(Decimal(expected) * 100)
+
+
+def settle_booking_payment(booking, data):
+    """
+    Mark a booking as paid, record its payment and receipt and pay the
+    client's referrer their booking bonus. Safe to call twice.
+    """
+    if booking.payment_completed:
+        return False
+    if not amount_covers(data, booking.total_delivery_cost):
+        raise ValueError(f"Amount {data.get('amount')} does not cover booking total {booking.total_delivery_cost}")
+
+    booking.payment_completed = True
+    booking.booking_status = 'active'
+    booking.save()
+
+    Payment.objects.get_or_create(
+        ref=booking.booking_code,
+        defaults={
+            'user': booking.client,
+            'booking': booking,
+            'amount': booking.delivery_cost,
+            'email': booking.client.email,
+            'verified': True,
+        }
+    )
+    receipt, _ = Receipt.objects.get_or_create(
+        booking=booking,
+        defaults={
+            'delivery_cost': booking.delivery_cost,
+            'insurance_payment': booking.insurance_payment,
+            'total_delivery_cost': booking.total_delivery_cost,
+        }
+    )
+    # Paid on money received, not on a price being set; keyed on the booking
+    award_booking_referral_bonus(booking)
+
+    # Email only once the settlement is durable
+    transaction.on_commit(lambda: send_booking_receipt_email(booking, receipt))
+    return True
+
+
+def settle_subscription_payment(subscription, data):
+    """Activate a paid subscription and record its payment. Safe to call twice."""
+    if subscription.payment_completed:
+        return False
+    if subscription.plan and not amount_covers(data, subscription.plan.price):
+        raise ValueError(f"Amount {data.get('amount')} does not cover plan price {subscription.plan.price}")
+
+    subscription.payment_completed = True
+    subscription.is_active = True
+    subscription.subscription_status = 'active'
+    subscription.renewal_reminder_sent_at = None
+    subscription.save()
+
+    Payment.objects.get_or_create(
+        ref=subscription.subscription_code,
+        defaults={
+            'user': subscription.user,
+            'subscription': subscription.plan,
+            'amount': subscription.plan.price if subscription.plan else 0,
+            'email': subscription.user.email,
+            'verified': True,
+        }
+    )
+    return True
+
+
+def process_paystack_events(batch_size=SETTLEMENT_BATCH_SIZE):
+    """
+    Settle pending Paystack webhook events, oldest first.
+
+    Each batch locks its events with SKIP LOCKED so several workers can run
+    side by side, and resolves every reference in the batch with one query
+    per target table. Returns the number of events handled.
+    """
+    handled = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                PaystackEvent.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')[:batch_size]
+            )
+            if not events:
+                break
+
+            references = [event.reference for event in events]
+            bookings = {
+                booking.booking_code: booking
+                for booking in Booking.objects.select_related('client', 'truck').filter(booking_code__in=references)
+            }
+            subscriptions = {
+                subscription.subscription_code: subscription
+                for subscription in UserSubscription.objects.select_related('user', 'plan').filter(subscription_code__in=references)
+            }
+
+            now = timezone.now()
+            for event in events:
+                data = event.payload.get('data') or {}
+                event.processed_at = now
+                if event.event != 'charge.success' or data.get('status') != 'success':
+                    event.status = 'ignored'
+                    continue
+
+                try:
+                    # Savepoint per event so one bad row does not roll back the batch
+                    with transaction.atomic():
+                        if event.reference in bookings:
+                            settle_booking_payment(bookings[event.reference], data)
+                        elif event.reference in subscriptions:
+                            settle_subscription_payment(subscriptions[event.reference], data)
+                        else:
+                            raise LookupError("No booking or subscription with this reference")
+                    event.status = 'processed'
+                except Exception as e:
+                    logger.error(f"Failed to settle Paystack event {event.reference}: {e}")
+                    event.status = 'failed'
+                    event.error = str(e)
+
+            PaystackEvent.objects.bulk_update(events, ['status', 'error', 'processed_at'])
+        handled += len(events)
+
+    return handled
+
+
+# PAYOUTS
+
+from datetime import timedelta
+from django.db.models import Count, F, Min, Q
+from users import ledger
+from users.models import CreditEntry
+from .models import FlutterwaveEvent, WithdrawalRequest
+
+PAYOUT_BATCH_SIZE = 100  # transfers per bulk-transfer call
+PAYOUT_MAX_ATTEMPTS = 5
+PAYOUT_NARRATION = "SurgeSeven withdrawal"
+
+
+def queue_withdrawal(user, method, amount):
+    """
+    Debit the user's credits and queue the payout for the payout worker.
+
+    No provider call happens here, so the request (and the user's row lock)
+    never waits on Flutterwave. Raises ledger.InsufficientCredits.
+    """
+    reference = f"WDR_{uuid.uuid4().hex[:12]}"
+    with transaction.atomic():
+        ledger.debit(user.id, amount, CreditEntry.WITHDRAWAL, reference=reference)
+        return WithdrawalRequest.objects.create(
+            user=user,
+            method=method,
+            amount=amount,
+            status='pending',
+            reference=reference,
+            flutterwave_reference=reference,
+        )
+
+
+def refund_withdrawal(withdrawal):
+    """Return a failed or rejected withdrawal's amount to the user. Safe to call twice."""
+    return ledger.credit(
+        withdrawal.user_id, withdrawal.amount, CreditEntry.WITHDRAWAL_REVERSAL, reference=withdrawal.reference
+    )
+
+
+def _fail_withdrawals(withdrawals, reason):
+    """Fail and refund withdrawals that never reached Flutterwave."""
+    now = timezone.now()
+    for withdrawal in withdrawals:
+        with transaction.atomic():
+            updated = WithdrawalRequest.objects.filter(
+                pk=withdrawal.pk, status__in=['pending', 'processing']
+            ).update(status='failed', processed_at=now, admin_notes=reason)
+            if updated:
+                refund_withdrawal(withdrawal)
+
+
+def _park_withdrawals(withdrawals, reason):
+    """
+    Move withdrawals Flutterwave may have received to 'unknown', without a
+    refund. A transfer.completed webhook or an admin settles them later.
+    """
+    WithdrawalRequest.objects.filter(
+        id__in=[w.id for w in withdrawals], status='processing'
+    ).update(status='unknown', admin_notes=reason)
+
+
+# Status an admin may set: the statuses it may be set from
+ADMIN_TRANSITIONS = {
+    'completed': ('processing', 'unknown'),
+    'failed': ('pending', 'processing', 'unknown'),
+    'rejected': ('pending', 'processing', 'unknown'),
+}
+
+
+def set_withdrawal_status(withdrawal, status, notes=''):
+    """
+    Apply an admin's decision if ADMIN_TRANSITIONS allows it from the row's
+    current status; failed and rejected withdrawals are refunded in the same
+    transaction. Returns True if the withdrawal changed.
+    """
+    with transaction.atomic():
+        updated = WithdrawalRequest.objects.filter(
+            pk=withdrawal.pk, status__in=ADMIN_TRANSITIONS[status]
+        ).update(status=status, admin_notes=notes, processed_at=timezone.now())
+        if updated and status in ('failed', 'rejected'):
+            refund_withdrawal(withdrawal)
+    return bool(updated)
+
+
+def _transfer_item(withdrawal):
+    details = withdrawal.method.details if withdrawal.method else {}
+    return {
+        'bank_code': details['bank_code'],
+        'account_number': details['account_number'],
+        'amount': float(withdrawal.amount),
+        'currency': 'NGN',
+        'narration': PAYOUT_NARRATION,
+        'reference': withdrawal.reference,
+    }
+
+
+def submit_payout_batch(batch_size=PAYOUT_BATCH_SIZE, client=None):
+    """
+    Claim up to `batch_size` pending withdrawals and send them as one bulk transfer.
+
+    Rows are claimed with SKIP LOCKED and marked processing before the
+    provider call, so the call runs outside any transaction and parallel
+    workers never submit the same withdrawal. Returns (claimed, submitted).
+    """
+    client = client or flutterwave_client
+    with transaction.atomic():
+        withdrawals = list(
+            WithdrawalRequest.objects.select_for_update(skip_locked=True)
+            .select_related('method')
+            .filter(status='pending')
+            .order_by('id')[:batch_size]
+        )
+        if not withdrawals:
+            return 0, 0
+        WithdrawalRequest.objects.filter(id__in=[w.id for w in withdrawals]).update(
+            status='processing', submitted_at=timezone.now(), attempts=F('attempts') + 1,
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise ValidationError(f"Flutterwave payout failed: {str(e)}")
\ No newline at end of file
+
+    items, invalid = [], []
+    for withdrawal in withdrawals:
+        try:
+            items.append(_transfer_item(withdrawal))
+        except (KeyError, TypeError):
+            invalid.append(withdrawal)
+    if invalid:
+        # An earlier attempt may have reached Flutterwave before the method was removed
+        reason = "Withdrawal method is missing bank details"
+        _fail_withdrawals([w for w in invalid if not w.attempts], reason)
+        _park_withdrawals([w for w in invalid if w.attempts], reason)
+    if not items:
+        return len(withdrawals), 0
+
+    response = client.create_bulk_transfer(f"SurgeSeven payouts {timezone.now():%Y-%m-%d %H:%M}", items)
+    sent = [w for w in withdrawals if w not in invalid]
+    if response.get('status') == 'success':
+        WithdrawalRequest.objects.filter(id__in=[w.id for w in sent], status='processing').update(
+            flutterwave_batch_id=str((response.get('data') or {}).get('id', '')),
+        )
+        return len(withdrawals), len(sent)
+
+    # A failed call may still have been accepted (a read timeout looks the same), so nothing is
+    # refunded here. References are unique at Flutterwave, so resubmitting a batch it did receive
+    # cannot pay twice; after the last attempt the rows wait in 'unknown' for a webhook or an admin.
+    logger.error(f"Bulk transfer of {len(sent)} payouts failed: {response.get('message')}")
+    exhausted = [w for w in sent if w.attempts + 1 >= PAYOUT_MAX_ATTEMPTS]
+    WithdrawalRequest.objects.filter(
+        id__in=[w.id for w in sent if w not in exhausted], status='processing'
+    ).update(status='pending')
+    if exhausted:
+        _park_withdrawals(exhausted, f"Bulk transfer failed after {PAYOUT_MAX_ATTEMPTS} attempts: {response.get('message')}")
+    return len(withdrawals), 0
+
+
+def process_payouts(batch_size=PAYOUT_BATCH_SIZE, max_batches=None, client=None):
+    """
+    Drain the payout queue batch by batch. Stops early when the provider
+    rejects a batch so an outage is not hammered. Returns the number submitted.
+    """
+    submitted = batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed, sent = submit_payout_batch(batch_size, client)
+        batches += 1
+        submitted += sent
+        if not sent:
+            break
+    return submitted
+
+
+def _apply_transfer_result(withdrawal, data):
+    """
+    Move a withdrawal to its final state. Only a withdrawal that is still
+    pending, processing or unknown changes, so replays are no-ops; a failed
+    transfer is refunded once. Returns True if the withdrawal changed.
+    """
+    succeeded = data.get('status') == 'SUCCESSFUL'
+    with transaction.atomic():
+        updated = WithdrawalRequest.objects.filter(
+            pk=withdrawal.pk, status__in=['pending', 'processing', 'unknown']
+        ).update(
+            status='completed' if succeeded else 'failed',
+            processed_at=timezone.now(),
+            flutterwave_transfer_id=str(data.get('id') or withdrawal.flutterwave_transfer_id or ''),
+        )
+        if updated and not succeeded:
+            refund_withdrawal(withdrawal)
+    return bool(updated)
+
+
+def flutterwave_event_key(payload):
+    """
+    Provider-side identity of a delivery: retries of the same result share it.
+    Events that carry neither a transfer id nor a reference are told apart by
+    a hash of their content, so they never collide with one another.
+    """
+    data = payload.get('data') or {}
+    identity = data.get('id') or data.get('reference')
+    if not identity:
+        return 'sha256:' + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return f"{identity}:{data.get('status', '')}"
+
+
+def process_flutterwave_events(batch_size=SETTLEMENT_BATCH_SIZE):
+    """
+    Apply pending Flutterwave webhook events in the order they arrived.
+
+    Batches are locked with SKIP LOCKED, and every withdrawal a batch needs is
+    fetched in one query on the indexed reference and transfer id columns.
+    Returns the number of events handled.
+    """
+    handled = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                FlutterwaveEvent.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')[:batch_size]
+            )
+            if not events:
+                break
+
+            references = {event.reference for event in events if event.reference}
+            transfer_ids = {str((event.payload.get('data') or {}).get('id')) for event in events} - {'None'}
+            by_reference, by_transfer_id = {}, {}
+            for withdrawal in WithdrawalRequest.objects.filter(
+                Q(reference__in=references) | Q(flutterwave_transfer_id__in=transfer_ids)
+            ):
+                by_reference[withdrawal.reference] = withdrawal
+                if withdrawal.flutterwave_transfer_id:
+                    by_transfer_id[withdrawal.flutterwave_transfer_id] = withdrawal
+
+            now = timezone.now()
+            for event in events:
+                data = event.payload.get('data') or {}
+                event.processed_at = now
+                if event.event != 'transfer.completed':
+                    event.status = 'ignored'
+                    continue
+
+                withdrawal = by_reference.get(event.reference) or by_transfer_id.get(str(data.get('id')))
+                if withdrawal is None:
+                    event.status = 'failed'
+                    event.error = "No withdrawal with this reference"
+                    continue
+                try:
+                    with transaction.atomic():
+                        _apply_transfer_result(withdrawal, data)
+                    event.status = 'processed'
+                except Exception as e:
+                    logger.error(f"Failed to apply Flutterwave event {event.event_key}: {e}")
+                    event.status = 'failed'
+                    event.error = str(e)
+
+            FlutterwaveEvent.objects.bulk_update(events, ['status', 'error', 'processed_at'])
+        handled += len(events)
+
+    return handled
+
+
+def replay_flutterwave_events(events):
+    """
+    Queue stored events to be applied again, e.g. after fixing the cause of
+    a failure. Applying is idempotent, so replaying a processed event is safe.
+    Returns the number of events requeued.
+    """
+    return events.update(status='pending', error='', processed_at=None)
+
+
+def payout_metrics(window=timedelta(hours=1)):
+    """Queue depth per status and recent throughput, in one aggregate query."""
+    now = timezone.now()
+    since = now - window
+    stats = WithdrawalRequest.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        processing=Count('id', filter=Q(status='processing')),
+        unknown=Count('id', filter=Q(status='unknown')),
+        oldest_pending=Min('created_at', filter=Q(status='pending')),
+        completed=Count('id', filter=Q(status='completed', processed_at__gte=since)),
+        failed=Count('id', filter=Q(status='failed', processed_at__gte=since)),
+        submitted=Count('id', filter=Q(submitted_at__gte=since)),
+    )
+    oldest = stats.pop('oldest_pending')
+    minutes = window.total_seconds() / 60
+    return {
+        'queue_depth': stats['pending'],
+        'in_flight': stats['processing'],
+        'awaiting_reconciliation': stats['unknown'],
+        'oldest_pending_seconds': int((now - oldest).total_seconds()) if oldest else 0,
+        'window_minutes': int(minutes),
+        'submitted': stats['submitted'],
+        'completed': stats['completed'],
+        'failed': stats['failed'],
+        'completed_per_minute': round(stats['completed'] / minutes, 2),
+    }
@@ -0,0 +1,20 @@
+from celery import shared_task
+from .services import process_flutterwave_events, process_paystack_events, process_payouts
+
+
+@shared_task
+def process_paystack_events_task():
+    """Settle pending Paystack webhook events"""
+    return process_paystack_events()
+
+
+@shared_task
+def process_payouts_task():
+    """Send queued withdrawals to Flutterwave as bulk transfers"""
+    return process_payouts()
+
+
+@shared_task
+def process_flutterwave_events_task():
+    """Apply pending Flutterwave webhook events"""
+    return process_flutterwave_events()
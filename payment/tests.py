@@ -1,3 +1,228 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from booking.models import Booking, Truck
+from users.models import CreditEntry, Referral, User
+from .models import FlutterwaveEvent, WithdrawalMethod, WithdrawalRequest
+from .paystack_client import PaystackClient
+from .reconciliation import reconcile_page
+from .services import (
+    PAYOUT_MAX_ATTEMPTS, flutterwave_event_key, process_flutterwave_events, queue_withdrawal, set_withdrawal_status,
+    settle_booking_payment, submit_payout_batch,
+)
 
-# Create your tests here.
+
+class StubFlutterwave:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def create_bulk_transfer(self, title, transfers):
+        self.calls.append(transfers)
+        return self.response
+
+
+FAILED = {'status': 'error', 'message': 'Unable to reach payout provider.', 'data': None}
+ACCEPTED = {'status': 'success', 'data': {'id': 77}}
+
+
+class PayoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='payee@example.com', username='payee', password='x', credits=Decimal('5000'))
+        self.method = WithdrawalMethod.objects.create(
+            user=self.user, method_type='bank', details={'bank_code': '044', 'account_number': '0123456789'},
+        )
+
+    def balance(self):
+        self.user.refresh_from_db()
+        return self.user.credits
+
+    def test_queue_debits_credits(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        self.assertEqual(withdrawal.status, 'pending')
+        self.assertEqual(self.balance(), Decimal('3800'))
+
+    def test_failed_call_is_retried_then_parked_without_refund(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        client = StubFlutterwave(FAILED)
+        for _ in range(PAYOUT_MAX_ATTEMPTS):
+            submit_payout_batch(client=client)
+        withdrawal.refresh_from_db()
+        self.assertEqual(len(client.calls), PAYOUT_MAX_ATTEMPTS)
+        self.assertEqual(withdrawal.status, 'unknown')
+        self.assertEqual(self.balance(), Decimal('3800'))
+        self.assertFalse(CreditEntry.objects.filter(entry_type=CreditEntry.WITHDRAWAL_REVERSAL).exists())
+
+    def test_late_success_webhook_completes_a_parked_withdrawal(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        WithdrawalRequest.objects.filter(pk=withdrawal.pk).update(status='unknown')
+        FlutterwaveEvent.objects.create(
+            event='transfer.completed', event_key='1:SUCCESSFUL', reference=withdrawal.reference,
+            payload={'event': 'transfer.completed', 'data': {'id': 1, 'reference': withdrawal.reference, 'status': 'SUCCESSFUL'}},
+        )
+        process_flutterwave_events()
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, 'completed')
+        self.assertEqual(self.balance(), Decimal('3800'))
+
+    def test_missing_bank_details_refund_only_if_never_sent(self):
+        fresh = queue_withdrawal(self.user, self.method, Decimal('1000'))
+        retried = queue_withdrawal(self.user, self.method, Decimal('1000'))
+        WithdrawalRequest.objects.filter(pk=retried.pk).update(attempts=1)
+        WithdrawalRequest.objects.update(method=None)
+        submit_payout_batch(client=StubFlutterwave(ACCEPTED))
+        fresh.refresh_from_db()
+        retried.refresh_from_db()
+        self.assertEqual(fresh.status, 'failed')
+        self.assertEqual(retried.status, 'unknown')
+        self.assertEqual(self.balance(), Decimal('4000'))
+
+    def test_accepted_batch_stays_processing(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        self.assertEqual(submit_payout_batch(client=StubFlutterwave(ACCEPTED)), (1, 1))
+        withdrawal.refresh_from_db()
+        self.assertEqual((withdrawal.status, withdrawal.flutterwave_batch_id), ('processing', '77'))
+
+    def test_admin_rejection_refunds_once_and_cannot_be_reopened(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        self.assertTrue(set_withdrawal_status(withdrawal, 'rejected'))
+        self.assertEqual(self.balance(), Decimal('5000'))
+        self.assertFalse(set_withdrawal_status(withdrawal, 'failed'))
+        self.assertEqual(self.balance(), Decimal('5000'))
+
+    def test_completed_withdrawal_cannot_be_rejected(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        WithdrawalRequest.objects.filter(pk=withdrawal.pk).update(status='processing')
+        self.assertTrue(set_withdrawal_status(withdrawal, 'completed'))
+        self.assertFalse(set_withdrawal_status(withdrawal, 'rejected'))
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, 'completed')
+        self.assertEqual(self.balance(), Decimal('3800'))
+
+    def test_pending_withdrawal_cannot_be_marked_completed(self):
+        withdrawal = queue_withdrawal(self.user, self.method, Decimal('1200'))
+        self.assertFalse(set_withdrawal_status(withdrawal, 'completed'))
+
+
+class FlutterwaveWebhookTests(TestCase):
+    body = json.dumps({'event': 'transfer.completed', 'data': {'id': 9, 'reference': 'WDR_x', 'status': 'FAILED'}})
+
+    def post(self, **headers):
+        return self.client.post(reverse('flutterwave-webhook'), self.body, content_type='application/json', headers=headers)
+
+    @override_settings(FLUTTERWAVE_SECRET_HASH=None)
+    def test_rejected_when_secret_not_configured(self):
+        self.assertEqual(self.post(**{'verif-hash': ''}).status_code, 503)
+        self.assertFalse(FlutterwaveEvent.objects.exists())
+
+    @override_settings(FLUTTERWAVE_SECRET_HASH='s3cret')
+    def test_rejected_with_wrong_hash(self):
+        self.assertEqual(self.post(**{'verif-hash': 'guess'}).status_code, 401)
+        self.assertEqual(self.post().status_code, 401)
+        self.assertFalse(FlutterwaveEvent.objects.exists())
+
+    @override_settings(FLUTTERWAVE_SECRET_HASH='s3cret')
+    def test_recorded_once_with_right_hash(self):
+        self.assertEqual(self.post(**{'verif-hash': 's3cret'}).status_code, 200)
+        self.assertEqual(self.post(**{'verif-hash': 's3cret'}).status_code, 200)
+        self.assertEqual(FlutterwaveEvent.objects.count(), 1)
+
+    @override_settings(FLUTTERWAVE_SECRET_HASH='s3cret')
+    def test_events_without_id_or_reference_do_not_collide(self):
+        for amount in (100, 200):
+            body = json.dumps({'event': 'transfer.completed', 'data': {'amount': amount, 'status': 'FAILED'}})
+            self.client.post(reverse('flutterwave-webhook'), body, content_type='application/json', headers={'verif-hash': 's3cret'})
+        self.assertEqual(FlutterwaveEvent.objects.count(), 2)
+
+    def test_event_key_is_stable_across_retries(self):
+        payload = {'event': 'transfer.completed', 'data': {'id': 9, 'reference': 'WDR_x', 'status': 'SUCCESSFUL'}}
+        self.assertEqual(flutterwave_event_key(payload), '9:SUCCESSFUL')
+        self.assertEqual(flutterwave_event_key({'data': {}}), flutterwave_event_key({'data': {}}))
+
+
+class BookingReferralBonusTests(TestCase):
+    def setUp(self):
+        self.referrer = User.objects.create_user(email='referrer@example.com', username='referrer', password='x')
+        client = User.objects.create_user(email='client@example.com', username='client', password='x')
+        Referral.objects.create(referrer=self.referrer, referred_user=client)
+        self.referrer.refresh_from_db()
+        self.signup_bonus = self.referrer.credits
+        owner = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        truck = Truck.objects.create(owner=owner, name='T1', state='lagos', local_government='Ikeja', available=True)
+        self.booking = Booking.objects.create(
+            client=client, truck=truck, product_name='Cement', product_weight=truck.weight_range,
+            product_value=Decimal('100000'), phone_number='08000000000', pickup_state='lagos',
+            destination_state='oyo', booking_code='BK-1',
+        )
+
+    def bonus(self):
+        self.referrer.refresh_from_db()
+        return self.referrer.credits - self.signup_bonus
+
+    def price(self, cost):
+        self.booking.delivery_cost = Decimal(cost)
+        self.booking.total_delivery_cost = self.booking.delivery_cost
+        self.booking.save()
+
+    def test_pricing_a_booking_pays_no_bonus(self):
+        self.price('20000')
+        self.assertEqual(self.bonus(), 0)
+
+    def test_receipt_email_sent_after_commit(self):
+        self.price('20000')
+        with mock.patch('payment.services.SendGridAPIClient') as sendgrid, \
+                mock.patch('payment.services.logger') as logger:
+            with self.captureOnCommitCallbacks(execute=True):
+                settle_booking_payment(self.booking, {'amount': 2000000})
+        message = sendgrid.return_value.send.call_args.args[0]
+        self.assertEqual(message.personalizations[0].tos[0]['email'], 'client@example.com')
+        logger.error.assert_not_called()
+
+    def test_bonus_paid_once_on_settlement(self):
+        self.price('20000')
+        data = {'amount': 2000000}
+        self.assertTrue(settle_booking_payment(self.booking, data))
+        self.assertEqual(self.bonus(), Decimal('300.00'))
+        self.booking.payment_completed = False
+        settle_booking_payment(self.booking, data)
+        self.assertEqual(self.bonus(), Decimal('300.00'))
+
+    def test_reconciliation_repair_pays_bonus(self):
+        self.price('20000')
+        transactions = [{'reference': 'BK-1', 'status': 'success', 'amount': 2000000}]
+        counts, _ = reconcile_page(transactions)
+        self.assertGreater(counts['repaired'], 0)
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.payment_completed)
+        self.assertEqual(self.bonus(), Decimal('300.00'))
+        reconcile_page(transactions)
+        self.assertEqual(self.bonus(), Decimal('300.00'))
+
+
+class PaystackVerifyLockTests(TestCase):
+    lock_key = 'paystack:verify:REF-1:lock'
+
+    def setUp(self):
+        cache.clear()
+        self.paystack = PaystackClient()
+
+    def test_waiter_gives_up_without_calling_upstream(self):
+        cache.set(self.lock_key, 'other-caller', 60)
+        with mock.patch('payment.paystack_client.VERIFY_LOCK_WAIT', 0.2), \
+                mock.patch.object(self.paystack, '_request') as request:
+            result = self.paystack.verify_transaction('REF-1')
+        self.assertFalse(result['status'])
+        request.assert_not_called()
+        self.assertEqual(cache.get(self.lock_key), 'other-caller')
+
+    def test_expired_holder_leaves_the_new_lock_alone(self):
+        def slow_verify(*args, **kwargs):
+            cache.set(self.lock_key, 'next-caller', 60)  # our lock expired and was taken over
+            return {'status': True, 'data': {'status': 'success'}}
+
+        with mock.patch.object(self.paystack, '_request', side_effect=slow_verify):
+            self.assertTrue(self.paystack.verify_transaction('REF-1')['status'])
+        self.assertEqual(cache.get(self.lock_key), 'next-caller')
@@ -8,6 +8,8 @@ urlpatterns = [
     
     path('booking/payment/<int:booking_id>/', views.CreateBookingPaymentView.as_view(), name='create-booking-payment'),
     path('booking/payment/verify/<str:ref>/', views.VerifyBookingPaymentView.as_view(), name='verify-booking-payment'),
+    path('webhooks/paystack/', views.paystack_webhook, name='paystack-webhook'),
+    path('webhooks/flutterwave/', views.flutterwave_webhook, name='flutterwave-webhook'),
 
     # WITHDRAWAL
     path('withdraw/', views.WithdrawalView.as_view(), name='withdraw'),
@@ -17,5 +19,6 @@ urlpatterns = [
     # Admin URLs
     path('admin/withdrawals/', views.process_withdrawals, name='process_withdrawals'),
     path('admin/withdrawals/<int:withdrawal_id>/', views.update_withdrawal_status, name='update_withdrawal_status'),
+    path('admin/withdrawals/metrics/', views.payout_metrics_view, name='payout_metrics'),
 ]
 
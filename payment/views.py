@@ -3,8 +3,9 @@ from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
 from .paystack_client import PaystackClient
-from .models import Payment
+from .models import Payment, PaystackEvent
 from subscriptions.models import SubscriptionPlan, UserSubscription
+from subscriptions.catalog import get_plan_catalog
 from django.contrib.auth.decorators import login_required
 import uuid
 from django.contrib import messages
@@ -16,7 +17,7 @@ paystack_client = PaystackClient()
 
 @login_required
 def create_subscription_payment(request, plan_id):
-    plan = get_object_or_404(SubscriptionPlan, id=plan_id)
+    plan = get_plan_catalog().get(plan_id)
     user = request.user
     amount = int(plan.price * 100)  # Paystack expects amount in kobo (1 Naira = 100 kobo)
     email = user.email
@@ -25,7 +26,7 @@ def create_subscription_payment(request, plan_id):
     # Create a UserSubscription with an initial status
     user_subscription = UserSubscription.objects.create(
         user=user,
-        plan=plan,
+        plan_id=plan.id,
         start_date=timezone.now(),
         end_date=timezone.now() + plan.duration,
         is_active=False,
@@ -49,19 +50,14 @@ def create_subscription_payment(request, plan_id):
 
 @login_required
 def verify_payment(request, ref):
-    # Verify the payment with Paystack using the reference
-    response = paystack_client.verify_transaction(ref)
-
-    if response['status'] and response['data']['status'] == 'success':
-        # Update the subscription status or perform other actions
-        user_subscription = UserSubscription.objects.get(subscription_code=ref)
-        user_subscription.payment_completed = True
-        user_subscription.is_active = True
-        user_subscription.subscription_status = 'active'
-        user_subscription.save()
+    # Settlement happens in the Paystack webhook worker; the callback only reads the result
+    user_subscription = get_object_or_404(UserSubscription, subscription_code=ref, user=request.user)
+
+    if user_subscription.payment_completed:
         return redirect('user-subscriptions')
-    else:
-        return render(request, 'subscriptions/subscribe.html', {'error': 'Payment verification failed.'})
+
+    messages.info(request, "We are confirming your payment. Your subscription will be activated shortly.")
+    return redirect('user-subscriptions')
 
 
 
@@ -127,85 +123,16 @@ from sendgrid.helpers.mail import Mail
 
 class VerifyBookingPaymentView(LoginRequiredMixin, View):
     def get(self, request, ref, *args, **kwargs):
-        response = paystack_client.verify_transaction(ref)
-        logger.debug('Paystack verification response: %s', response)
-
-        if response['status'] and response['data']['status'] == 'success':
-            booking = get_object_or_404(Booking, booking_code=ref)
-            booking.payment_completed = True
-            booking.booking_status = 'active'
-            booking.save()
-
-            # Create payment record
-            Payment.objects.create(
-                user=request.user,
-                booking=booking,
-                amount=booking.delivery_cost,
-                ref=ref,
-                email=request.user.email,
-                verified=True
-            )
-
-            # Create the receipt
-            receipt = Receipt.objects.create(
-                booking=booking,
-                delivery_cost=booking.delivery_cost,
-                insurance_payment=booking.insurance_payment,
-                total_delivery_cost=booking.total_delivery_cost,
-            )
-
-            # Prepare email context
-            context = {
-                'booking': booking,
-                'truck_name': booking.truck.name,
-                'has_premium': booking.insurance_payment > 0,
-                'insurance_company': "Veritas Kapital Assurance",
-                'receipt': receipt
-            }
-
-            # Send receipts via email
-            self.send_receipts_email(booking, context)
+        # Settlement (payment record, receipt, email) happens in the Paystack webhook worker;
+        # the callback only reads the settled status
+        booking = get_object_or_404(Booking, booking_code=ref, client=request.user)
 
+        if booking.payment_completed:
             messages.success(request, "Payment successful! Your receipts have been emailed to you.")
             return HttpResponseRedirect(reverse('generate_receipt', kwargs={'booking_code': booking.booking_code}))
-        else:
-            messages.error(request, "Payment verification failed.")
-            return HttpResponseRedirect(reverse('booking_list'))
 
-    def send_receipts_email(self, booking, context):
-        # Render both receipts
-        booking_receipt_html = render_to_string('booking/receipt_email.html', context)
-        plain_message = strip_tags(booking_receipt_html)
-        
-        # Create email message
-        subject = f"Your Booking Receipt - #{booking.booking_code}"
-        from_email = settings.DEFAULT_FROM_EMAIL
-        to_email = booking.client.email
-        
-        # Create SendGrid email
-        message = Mail(
-            from_email=from_email,
-            to_emails=to_email,
-            subject=subject,
-            html_content=booking_receipt_html,
-            plain_text_content=plain_message
-        )
-        
-        try:
-            # Initialize SendGrid client
-            sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-            
-            # Attach insurance receipt if applicable
-            if context['has_premium']:
-                insurance_receipt_html = render_to_string('booking/insurance_receipt_email.html', context)
-                message.add_content(insurance_receipt_html, "text/html")
-            
-            # Send email
-            response = sg.send(message)
-            logger.info(f"Receipt email sent to {to_email}. Status: {response.status_code}")
-            
-        except Exception as e:
-            logger.error(f"Error sending receipt email: {str(e)}")
+        messages.info(request, "We are confirming your payment. You will be notified as soon as it is verified.")
+        return HttpResponseRedirect(reverse('booking_list'))
 
 
 
@@ -223,53 +150,28 @@ from django.contrib.admin.views.decorators import staff_member_required
 
 
 
-from django.db import transaction
-from .services import initiate_flutterwave_payout
+from .services import queue_withdrawal
+from users import ledger
 
 @method_decorator(login_required, name='dispatch')
 class WithdrawalView(View):
+    template_name = 'payment/withdraw.html'
+
     def post(self, request):
         form = WithdrawalRequestForm(request.user, request.POST)
         if form.is_valid():
             amount = form.cleaned_data['amount']
             method = form.cleaned_data['method']
             
-            if request.user.credits < amount:
+            try:
+                # Credits are deducted now; the payout worker sends the transfer
+                queue_withdrawal(request.user, method, amount)
+            except ledger.InsufficientCredits:
                 messages.error(request, "Insufficient balance")
                 return redirect('withdraw')
 
-            try:
-                with transaction.atomic():
-                    # Deduct credits
-                    request.user.credits -= amount
-                    request.user.save()
-
-                    # Initiate Flutterwave payout
-                    payout_data = initiate_flutterwave_payout(
-                        account_bank=method.details['bank_code'],
-                        account_number=method.details['account_number'],
-                        amount=amount,
-                        narration=f"SurgeSeven withdrawal",
-                        recipient_name=method.details['account_name']
-                    )
-
-                    # Create withdrawal record
-                    withdrawal = WithdrawalRequest.objects.create(
-                        user=request.user,
-                        method=method,
-                        amount=amount,
-                        status='processing',
-                        reference=payout_data['data']['reference'],
-                        flutterwave_transfer_id=payout_data['data']['id'],
-                        flutterwave_reference=payout_data['data']['reference']
-                    )
-
-                    messages.success(request, "Withdrawal initiated successfully!")
-                    return redirect('withdrawal_history')
-
-            except Exception as e:
-                messages.error(request, f"Withdrawal failed: {str(e)}")
-                return redirect('withdraw')
+            messages.success(request, "Withdrawal requested! It will be paid out shortly.")
+            return redirect('withdrawal_history')
 
         return render(request, self.template_name, {'form': form})
     
@@ -299,6 +201,8 @@ def withdrawal_history(request):
 # ADMIN
 
 from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from .services import ADMIN_TRANSITIONS, payout_metrics, set_withdrawal_status
 
 @staff_member_required
 def process_withdrawals(request):
@@ -312,37 +216,96 @@ def update_withdrawal_status(request, withdrawal_id):
         status = request.POST.get('status')
         notes = request.POST.get('notes', '')
         
-        if status in [choice[0] for choice in WithdrawalRequest.STATUS_CHOICES]:
-            withdrawal.status = status
-            withdrawal.admin_notes = notes
-            if status == 'completed':
-                withdrawal.processed_at = timezone.now()
-            withdrawal.save()
+        if status not in ADMIN_TRANSITIONS:
+            messages.error(request, "Invalid status")
+        elif set_withdrawal_status(withdrawal, status, notes):
             messages.success(request, "Withdrawal status updated")
         else:
-            messages.error(request, "Invalid status")
+            messages.error(request, f"A {withdrawal.get_status_display().lower()} withdrawal cannot be marked {status}")
         
         return redirect('process_withdrawals')
     
     return render(request, 'payment/update_withdrawal.html', {'withdrawal': withdrawal})
 
+@staff_member_required
+def payout_metrics_view(request):
+    return JsonResponse(payout_metrics())
+
 
 
 # views.py
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
+import hashlib
+import hmac
 import json
+from .models import FlutterwaveEvent
+from .services import flutterwave_event_key
 
 @csrf_exempt
 def flutterwave_webhook(request):
-    if request.method == 'POST':
+    """
+    Record a Flutterwave event and acknowledge it straight away.
+
+    Authenticated with the verif-hash header against FLUTTERWAVE_SECRET_HASH;
+    every request is refused while that is not set. Redeliveries are absorbed by the unique (event, event_key)
+    constraint; process_flutterwave_events applies them.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=405)
+
+    secret_hash = getattr(settings, 'FLUTTERWAVE_SECRET_HASH', None)
+    if not secret_hash:
+        # Unauthenticated transfer results could trigger refunds; refuse them all until configured
+        logger.error("FLUTTERWAVE_SECRET_HASH is not set; rejecting Flutterwave webhook")
+        return JsonResponse({'status': 'error'}, status=503)
+    if not hmac.compare_digest(request.headers.get('verif-hash', ''), secret_hash):
+        return JsonResponse({'status': 'error'}, status=401)
+
+    try:
         payload = json.loads(request.body)
-        transfer_id = payload['data']['id']
-        
-        try:
-            withdrawal = WithdrawalRequest.objects.get(flutterwave_transfer_id=transfer_id)
-            withdrawal.status = 'completed' if payload['data']['status'] == 'SUCCESSFUL' else 'failed'
-            withdrawal.save()
-            return JsonResponse({'status': 'success'})
-        except WithdrawalRequest.DoesNotExist:
-            return JsonResponse({'status': 'error'}, status=400)
\ No newline at end of file
+        reference = payload['data'].get('reference') or ''
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'status': 'error'}, status=400)
+
+    FlutterwaveEvent.objects.bulk_create(
+        [FlutterwaveEvent(
+            event=payload.get('event', ''),
+            event_key=flutterwave_event_key(payload),
+            reference=reference,
+            payload=payload,
+        )],
+        ignore_conflicts=True,
+    )
+    return JsonResponse({'status': 'success'})
+
+
+
+@csrf_exempt
+def paystack_webhook(request):
+    """
+    Record a Paystack event and acknowledge it straight away.
+
+    The body is authenticated with the HMAC-SHA512 signature Paystack sends in
+    X-Paystack-Signature. Redeliveries of the same event are absorbed by the
+    unique (event, reference) constraint; process_paystack_events settles them.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=405)
+
+    signature = request.headers.get('X-Paystack-Signature', '')
+    expected = hmac.new(paystack_client.secret_key.encode(), request.body, hashlib.sha512).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return JsonResponse({'status': 'error'}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+        reference = payload['data']['reference']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'status': 'error'}, status=400)
+
+    PaystackEvent.objects.bulk_create(
+        [PaystackEvent(event=payload.get('event', ''), reference=reference, payload=payload)],
+        ignore_conflicts=True,
+    )
+    return JsonResponse({'status': 'success'})
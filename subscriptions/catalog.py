@@ -0,0 +1,103 @@
+"""
+In-process catalog of subscription plans.
+
+Plans change maybe once a year, so the pricing and subscribe pages read them
+from an immutable snapshot built once per process instead of querying on every
+request. A version number in the shared cache tells each process when its
+snapshot is stale; signals bump it whenever a plan or feature changes.
+"""
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from django.core.cache import cache
+from django.http import Http404
+from .models import SubscriptionPlan
+
+CATALOG_VERSION_KEY = 'subscriptions:plan_catalog_version'
+
+PlanEntry = namedtuple('PlanEntry', [
+    'id', 'name', 'display_name', 'price', 'duration', 'formatted_duration', 'plan_code', 'features',
+])
+
+
+class PlanCatalog:
+    """Read-only snapshot of every SubscriptionPlan with its features."""
+
+    def __init__(self, version, plans):
+        self.version = version
+        self.plans = tuple(plans)
+        self.by_id = MappingProxyType({plan.id: plan for plan in self.plans})
+        self.by_name = MappingProxyType({plan.name: plan for plan in self.plans})
+
+    def get(self, pk):
+        """Return the plan with this id or raise Http404, like get_object_or_404."""
+        try:
+            return self.by_id[int(pk)]
+        except (KeyError, TypeError, ValueError):
+            raise Http404("No subscription plan matches the given query.")
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def format_duration(duration):
+    days = duration.days
+    if days >= 365:
+        years = days // 365
+        return f"{years} Year{'s' if years > 1 else ''}"
+    elif days >= 30:
+        months = days // 30
+        return f"{months} Month{'s' if months > 1 else ''}"
+    return f"{days} Day{'s' if days > 1 else ''}"
+
+
+def _current_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Time-based seed so an evicted key never comes back with a version a process already holds
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _build_catalog(version):
+    plans = SubscriptionPlan.objects.prefetch_related('features').order_by('id')
+    return PlanCatalog(version, [
+        PlanEntry(
+            id=plan.id,
+            name=plan.name,
+            display_name=plan.get_name_display(),
+            price=plan.price,
+            duration=plan.duration,
+            formatted_duration=format_duration(plan.duration),
+            plan_code=plan.plan_code,
+            features=tuple(feature.name for feature in plan.features.all()),
+        )
+        for plan in plans
+    ])
+
+
+def get_plan_catalog():
+    """Return the current catalog, rebuilding it only when the version has moved."""
+    global _catalog
+    version = _current_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = _build_catalog(version)
+            catalog = _catalog
+    return catalog
+
+
+def invalidate_plan_catalog():
+    """Mark every process's catalog as stale."""
+    global _catalog
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted; start a fresh version sequence
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    _catalog = None
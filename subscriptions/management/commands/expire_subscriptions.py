@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from subscriptions.services import (
+    EXPIRY_BATCH_SIZE, RENEWAL_REMINDER_DAYS, expire_subscriptions, send_renewal_reminders,
+)
+
+
+class Command(BaseCommand):
+    help = 'Deactivate expired subscriptions and send renewal reminders in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE)
+        parser.add_argument(
+            '--remind-days',
+            type=int,
+            default=RENEWAL_REMINDER_DAYS,
+            help='Send renewal reminders for subscriptions ending within this many days (0 to skip).'
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_subscriptions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} subscription(s).'))
+
+        if options['remind_days'] > 0:
+            reminded = send_renewal_reminders(days_before=options['remind_days'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Sent {reminded} renewal reminder(s).'))
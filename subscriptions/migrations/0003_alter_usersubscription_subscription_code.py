@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_usersubscription_renewal_reminder_sent_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersubscription',
+            name='subscription_code',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
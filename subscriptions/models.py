@@ -1,5 +1,6 @@
 from django.db import models
-from datetime import timedelta, timezone
+from django.utils import timezone
+from datetime import timedelta
 from users.models import User
 
 
@@ -72,6 +73,10 @@ class SubscriptionPlan(models.Model):
         # Update features for the premium plan
         premium_plan.features.set([booking_app, tracking_system, insurance_coverage])
 
+        # Make every process reload the plan catalog
+        from .catalog import invalidate_plan_catalog
+        invalidate_plan_catalog()
+
 
 
 class UserSubscription(models.Model):
@@ -82,7 +87,14 @@ class UserSubscription(models.Model):
     is_active = models.BooleanField(default=False)
     payment_completed = models.BooleanField(default=False)
     subscription_status = models.CharField(max_length=10, default='inactive')
-    subscription_code = models.CharField(max_length=100, null=True, blank=True)  # Subscription code for Paystack
+    subscription_code = models.CharField(max_length=100, null=True, blank=True, db_index=True)  # Subscription code for Paystack
+    renewal_reminder_sent_at = models.DateTimeField(null=True, blank=True)  # Set by the renewal reminder sweep
+
+    class Meta:
+        indexes = [
+            # Serves the expiry sweep and renewal reminders (is_active=True, end_date <= cutoff)
+            models.Index(fields=['is_active', 'end_date'], name='usersub_active_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.plan.name}"
@@ -92,6 +104,7 @@ class UserSubscription(models.Model):
             self.is_active = True
             self.subscription_status = 'active'
             self.end_date = timezone.now() + self.plan.duration
+            self.renewal_reminder_sent_at = None
             self.save()
 
     @classmethod
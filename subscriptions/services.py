@@ -0,0 +1,95 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from notifications.models import Notification
+from .models import UserSubscription
+
+EXPIRY_BATCH_SIZE = 500
+RENEWAL_REMINDER_DAYS = 7
+
+
+def _locked_batch(queryset, batch_size):
+    """
+    Lock the next batch of rows for the caller's transaction, skipping rows
+    another sweeper already holds so parallel runs never double-process.
+    """
+    return list(
+        queryset.select_for_update(skip_locked=True)
+        .order_by('end_date')
+        .values_list('id', 'user_id')[:batch_size]
+    )
+
+
+def expire_subscriptions(batch_size=EXPIRY_BATCH_SIZE, now=None):
+    """
+    Deactivate every active subscription whose end_date has passed.
+
+    Works in batches of `batch_size` rows: each batch is one UPDATE plus one
+    bulk INSERT of notifications, so the cost is independent of how many
+    users the platform has. Returns the number of subscriptions expired.
+    """
+    now = now or timezone.now()
+    expired = UserSubscription.objects.filter(is_active=True, end_date__lte=now)
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            batch = _locked_batch(expired, batch_size)
+            if not batch:
+                break
+
+            UserSubscription.objects.filter(id__in=[row[0] for row in batch]).update(
+                is_active=False,
+                subscription_status='inactive',
+            )
+            Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
+                    message="Your subscription has expired. Renew it to keep booking trucks.",
+                    notification_type='subscription-expired',
+                )
+                for _, user_id in batch
+            ])
+        total += len(batch)
+
+    return total
+
+
+def send_renewal_reminders(days_before=RENEWAL_REMINDER_DAYS, batch_size=EXPIRY_BATCH_SIZE, now=None):
+    """
+    Notify users whose active subscription ends within `days_before` days.
+
+    Each subscription is reminded once per billing period; the reminder
+    timestamp is cleared again whenever the subscription is renewed or paid
+    (activate_subscription, payment settlement and Payment.verify_payment).
+    Returns the number of reminders created.
+    """
+    now = now or timezone.now()
+    expiring = UserSubscription.objects.filter(
+        is_active=True,
+        end_date__gt=now,
+        end_date__lte=now + timedelta(days=days_before),
+        renewal_reminder_sent_at__isnull=True,
+    )
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            batch = _locked_batch(expiring, batch_size)
+            if not batch:
+                break
+
+            UserSubscription.objects.filter(id__in=[row[0] for row in batch]).update(
+                renewal_reminder_sent_at=now,
+            )
+            Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
+                    message=f"Your subscription expires within {days_before} days. Renew now to avoid interruption.",
+                    notification_type='subscription-expiring',
+                )
+                for _, user_id in batch
+            ])
+        total += len(batch)
+
+    return total
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserSubscription, SubscriptionPlan
+from .models import UserSubscription, SubscriptionPlan, Feature
+from .catalog import invalidate_plan_catalog
 
 User = get_user_model()
 
@@ -18,3 +19,12 @@ def create_default_subscription(sender, instance, created, **kwargs):
             print(f"Assigned Free plan to user {instance}")
         except SubscriptionPlan.DoesNotExist:
             print("Subscription plan 'Free' does not exist.")
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+@receiver(m2m_changed, sender=SubscriptionPlan.features.through)
+def invalidate_plan_catalog_on_change(sender, **kwargs):
+    invalidate_plan_catalog()
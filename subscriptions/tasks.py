@@ -0,0 +1,14 @@
+from celery import shared_task
+from .services import expire_subscriptions, send_renewal_reminders
+
+
+@shared_task
+def expire_subscriptions_task():
+    """Deactivate subscriptions whose end_date has passed"""
+    return expire_subscriptions()
+
+
+@shared_task
+def send_renewal_reminders_task():
+    """Remind users shortly before their subscription runs out"""
+    return send_renewal_reminders()
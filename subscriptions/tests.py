@@ -1,3 +1,43 @@
+from datetime import timedelta
+from unittest import mock
 from django.test import TestCase
+from django.utils import timezone
+from payment.models import Payment
+from payment.services import settle_subscription_payment
+from users.models import User
+from .models import SubscriptionPlan, UserSubscription
+from .services import send_renewal_reminders
 
-# Create your tests here.
+
+class RenewalReminderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='x')
+        self.plan = SubscriptionPlan.objects.create(name=SubscriptionPlan.BASIC, price=2000, duration=timedelta(days=90))
+        self.subscription = UserSubscription.objects.create(
+            user=self.user, plan=self.plan, is_active=True, payment_completed=True,
+            subscription_status='active', subscription_code='SUB-1', end_date=timezone.now() + timedelta(days=3),
+        )
+        self.assertEqual(send_renewal_reminders(), 1)
+        self.subscription.refresh_from_db()
+
+    def assertReminderCleared(self):
+        self.subscription.refresh_from_db()
+        self.assertIsNone(self.subscription.renewal_reminder_sent_at)
+
+    def test_activate_subscription_clears_reminder(self):
+        self.subscription.activate_subscription()
+        self.assertReminderCleared()
+        self.assertGreater(self.subscription.end_date, timezone.now() + timedelta(days=80))
+
+    def test_settlement_clears_reminder(self):
+        self.subscription.payment_completed = False
+        settle_subscription_payment(self.subscription, {'amount': 200000})
+        self.assertReminderCleared()
+
+    def test_verified_payment_clears_reminder(self):
+        payment = Payment.objects.create(user=self.user, subscription=self.plan, amount=2000, ref='PAY-1', email=self.user.email)
+        with mock.patch('payment.models.paystack_sync') as paystack:
+            paystack.transactions.verify.return_value = (True, {'status': True})
+            self.assertTrue(payment.verify_payment())
+        self.assertReminderCleared()
+        self.assertEqual(UserSubscription.objects.count(), 1)
@@ -9,6 +9,7 @@ from .models import SubscriptionPlan, UserSubscription
 from payment.models import Payment
 from paystackease import PayStackBase
 from payment.paystack_client import PaystackClient
+from .catalog import get_plan_catalog
 import uuid
 from django.contrib.auth.decorators import login_required
 
@@ -19,22 +20,9 @@ paystack_client = PaystackClient()
 
 class SubscriptionPlanListView(View):
     def get(self, request):
-        subscription_plans = SubscriptionPlan.objects.all()
-        
-        # Format the duration for each plan
-        for plan in subscription_plans:
-            days = plan.duration.days
-            if days >= 365:
-                years = days // 365
-                plan.formatted_duration = f"{years} Year{'s' if years > 1 else ''}"
-            elif days >= 30:
-                months = days // 30
-                plan.formatted_duration = f"{months} Month{'s' if months > 1 else ''}"
-            else:
-                plan.formatted_duration = f"{days} Day{'s' if days > 1 else ''}"
-        
+        # Plans, features and formatted durations come precomputed from the plan catalog
         context = {
-            'subscription_plans': subscription_plans,
+            'subscription_plans': get_plan_catalog().plans,
         }
         return render(request, 'subscriptions/subscription_plans.html', context)
     
@@ -53,14 +41,14 @@ class UserSubscriptionsView(ListView):
 
 class SubscribeView(View):
     def get(self, request, pk):
-        plan = get_object_or_404(SubscriptionPlan, pk=pk)
+        plan = get_plan_catalog().get(pk)
         return render(request, 'subscriptions/subscribe.html', {'plan': plan})
 
     def post(self, request, pk):
-        plan = get_object_or_404(SubscriptionPlan, pk=pk)
+        plan = get_plan_catalog().get(pk)
         user_subscription = UserSubscription.objects.create(
             user=request.user,
-            plan=plan,
+            plan_id=plan.id,
             start_date=timezone.now(),
             end_date=timezone.now() + plan.duration
         )
@@ -96,7 +84,7 @@ class PaymentCallbackView(View):
 
 @login_required
 def create_subscription_payment(request, plan_id):
-    plan = get_object_or_404(SubscriptionPlan, id=plan_id)
+    plan = get_plan_catalog().get(plan_id)
     user = request.user
 
     # Check if the user already has an active subscription
@@ -110,7 +98,7 @@ def create_subscription_payment(request, plan_id):
         # Create a new UserSubscription for the user
         user_subscription = UserSubscription.objects.create(
             user=user,
-            plan=plan,
+            plan_id=plan.id,
             start_date=timezone.now(),
             end_date=timezone.now() + plan.duration,
             is_active=False,
@@ -0,0 +1,10 @@
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'surgeseven_demo.settings')
+
+app = Celery('surgeseven_demo')
+
+# Read CELERY_* settings from Django settings and pick up tasks.py in every app
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
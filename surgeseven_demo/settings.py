@@ -15,6 +15,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
 from datetime import timedelta
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -141,8 +143,35 @@ DATABASES = {
 }
 
 
+# Cache shared by every worker process. OTPs, reset tokens and rate limits
+# live only here, so outside DEBUG it must be Redis; the per-process
+# LocMemCache is only good enough for a single development server.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured("REDIS_URL must be set when DEBUG is off")
+
+# Reverse proxies in front of the app; each appends the address it received
+# the request from to X-Forwarded-For. 0 means clients connect directly.
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 0))
+
+
 # Paystack configuration
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
+# Point at `python manage.py paystack_stub` for load testing
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+PAYSTACK_TIMEOUT = (3.05, 10)  # (connect, read) seconds
 
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'sandbox.smtp.mailtrap.io'
@@ -209,9 +238,22 @@ MEDIA_ROOT = BASE_DIR/'media'
 AUTH_USER_MODEL = 'users.User'
 
 AUTHENTICATION_BACKENDS = [
-    'users.backends.EmailBackend',  # Path to your custom backend
-    'django.contrib.auth.backends.ModelBackend',  # Default backend
+    'users.backends.EmailBackend',  # Path to your custom backend (also provides ModelBackend permissions)
+]
+
+# Stored hashes with a different cost are re-encoded on the next successful login
+PASSWORD_HASHERS = [
+    'users.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
 ]
+# Raise-only: values below Django's own PBKDF2 default are ignored
+PASSWORD_HASH_ITERATIONS = max(int(os.getenv("PASSWORD_HASH_ITERATIONS", 0)), PBKDF2PasswordHasher.iterations)
+
+# Seconds EmailBackend may serve a user row from the cache (0 disables)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 0))
 
 
 # iTracksafeX Settings
@@ -223,11 +265,77 @@ ITRACKSAFE_CLIENT_PREFIX = os.getenv("CLIENT_TRACKER_PASSWORD_PREFIX")
 ITRACKSAFE_OWNER_PREFIX = os.getenv("OWNER_TRACKER_PASSWORD_PREFIX")
 ITRACKSAFE_API_URL = "https://itracksafe.com/webapi"
 
+# Tracking events older than this many days move to per-tracker, per-day column files (tracker/archive.py)
+TRACKING_ARCHIVE_DIR = Path(os.getenv("TRACKING_ARCHIVE_DIR", BASE_DIR / 'archive' / 'tracking'))
+TRACKING_ARCHIVE_AFTER_DAYS = int(os.getenv("TRACKING_ARCHIVE_AFTER_DAYS", 90))
+
+# Route solver processes started by each web worker (booking/routing.py); capped at the CPU count
+ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 FLUTTERWAVE_SECRET_KEY = os.getenv("FLUTTERWAVE_SECRET_KEY")
+FLUTTERWAVE_SECRET_HASH = os.getenv("FLUTTERWAVE_SECRET_HASH")  # sent back in the verif-hash webhook header
+FLUTTERWAVE_BASE_URL = os.getenv("FLUTTERWAVE_BASE_URL", "https://api.flutterwave.com/v3")
+FLUTTERWAVE_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+
+
+# Celery (worker: `celery -A surgeseven_demo worker`, scheduler: `celery -A surgeseven_demo beat`)
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_TIMEZONE = TIME_ZONE
+
+CELERY_BEAT_SCHEDULE = {
+    'expire-subscriptions': {
+        'task': 'subscriptions.tasks.expire_subscriptions_task',
+        'schedule': timedelta(minutes=15),
+    },
+    'subscription-renewal-reminders': {
+        'task': 'subscriptions.tasks.send_renewal_reminders_task',
+        'schedule': timedelta(hours=6),
+    },
+    'process-paystack-events': {
+        'task': 'payment.tasks.process_paystack_events_task',
+        'schedule': timedelta(seconds=15),
+    },
+    'process-flutterwave-events': {
+        'task': 'payment.tasks.process_flutterwave_events_task',
+        'schedule': timedelta(seconds=15),
+    },
+    'process-payouts': {
+        'task': 'payment.tasks.process_payouts_task',
+        'schedule': timedelta(seconds=30),
+    },
+    'credit-balance-snapshots': {
+        'task': 'users.tasks.take_credit_snapshots_task',
+        'schedule': timedelta(hours=24),
+    },
+    'poll-tracker-positions': {
+        'task': 'tracker.tasks.poll_tracker_positions_task',
+        'schedule': timedelta(minutes=1),
+    },
+    'build-trips': {
+        'task': 'tracker.tasks.build_trips_task',
+        'schedule': timedelta(minutes=15),
+    },
+    'archive-tracking-events': {
+        'task': 'tracker.tasks.archive_tracking_events_task',
+        'schedule': timedelta(hours=24),
+    },
+    'compute-telemetry-metrics': {
+        'task': 'tracker.tasks.compute_telemetry_metrics_task',
+        'schedule': timedelta(hours=1),
+    },
+    'sweep-tracker-health': {
+        'task': 'tracker.tasks.sweep_tracker_health_task',
+        'schedule': timedelta(minutes=5),
+    },
+    'process-truck-commands': {
+        'task': 'tracker.tasks.process_truck_commands_task',
+        'schedule': timedelta(seconds=10),
+    },
+}
 
 MAX_IMAGE_UPLOAD_SIZE = 5 * 1024 * 1024
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""
+Columnar archive for old tracking events.
+
+TrackingEvent rows older than TRACKING_ARCHIVE_AFTER_DAYS are moved out of
+the database into one file per tracker per (UTC) day, listed in
+TrackingArchiveChunk. A file holds each field as its own compressed column:
+
+    id, timestamp   int64, delta-encoded (timestamp in epoch milliseconds)
+    latitude,       int32 fixed point at 1e-6 degrees (about 0.1 m),
+    longitude       delta-encoded
+    speed           int16 at 0.1 km/h
+    battery_level   int16 at 0.01 V
+    signal_strength int16
+    acc_duration,   int64 milliseconds, delta-encoded
+    park_duration
+    alarm, alarm2   int64 bitmasks
+    event_type      uint8 codes into a vocabulary kept in the header
+
+Columns are byte-shuffled before zlib compression, so the slowly changing
+high bytes of neighbouring values compress together. Nullable columns
+carry a packed null mask. Files are read through mmap and only the
+requested columns are decompressed. Columns added in a later
+ARCHIVE_VERSION read back as all-NaN from older files.
+
+read_range returns a tracker's fixes for a time range as NumPy arrays,
+from the archive and the database alike, so callers need not care where
+the rows live.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Tracker, TrackingArchiveChunk, TrackingEvent
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b'TRKA'
+ARCHIVE_VERSION = 2
+COMPRESSION_LEVEL = 6
+DELETE_BATCH_SIZE = 1000
+
+# name: (stored dtype, scale, delta-encoded, nullable)
+COLUMNS = {
+    'id': (np.int64, 1, True, False),
+    'timestamp': (np.int64, 1, True, False),
+    'latitude': (np.int32, 1e6, True, True),
+    'longitude': (np.int32, 1e6, True, True),
+    'speed': (np.int16, 10, False, False),
+    'battery_level': (np.int16, 100, False, True),
+    'signal_strength': (np.int16, 1, False, True),
+    'acc_duration': (np.int64, 1, True, True),
+    'park_duration': (np.int64, 1, True, True),
+    'alarm': (np.int64, 1, False, True),
+    'alarm2': (np.int64, 1, False, True),
+}
+FIELDS = (
+    'id', 'timestamp', 'event_type', 'latitude', 'longitude', 'speed', 'battery_level', 'signal_strength',
+    'acc_duration', 'park_duration', 'alarm', 'alarm2',
+)
+DEFAULT_COLUMNS = ('timestamp', 'latitude', 'longitude', 'speed')
+
+
+def chunk_path(tracker_id, day):
+    return settings.TRACKING_ARCHIVE_DIR / str(tracker_id) / f'{day:%Y-%m-%d}.trka'
+
+
+def _columns_from_rows(rows):
+    """Column arrays from TrackingEvent values_list rows in FIELDS order; nulls become NaN."""
+    if not rows:
+        return _empty_columns()
+    ids, timestamps, event_types, *numeric = zip(*rows)
+    columns = {
+        'id': np.array(ids, dtype=np.int64),
+        'timestamp': np.array([ts.timestamp() * 1000 for ts in timestamps]).round().astype(np.int64),
+        'event_type': np.array(event_types, dtype=object),
+    }
+    for name, values in zip(FIELDS[3:], numeric):
+        columns[name] = np.array(values, dtype=float)  # None -> nan
+    return columns
+
+
+def _empty_columns():
+    columns = {name: np.zeros(0) for name in COLUMNS}
+    columns['id'] = columns['timestamp'] = np.zeros(0, dtype=np.int64)
+    columns['event_type'] = np.zeros(0, dtype=object)
+    return columns
+
+
+def _pack(values, dtype):
+    """Byte-shuffle and compress an integer array."""
+    values = np.ascontiguousarray(values, dtype=dtype)
+    planes = values.view(np.uint8).reshape(-1, values.itemsize).T
+    return zlib.compress(planes.tobytes(), COMPRESSION_LEVEL)
+
+
+def _unpack(blob, dtype, count):
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def _encode_column(name, values):
+    """{blob name: compressed bytes} for one column."""
+    dtype, scale, delta, nullable = COLUMNS[name]
+    blobs = {}
+    if nullable:
+        valid = ~np.isnan(values)
+        if not valid.all():
+            blobs[f'{name}.null'] = zlib.compress(np.packbits(~valid).tobytes(), COMPRESSION_LEVEL)
+            # Repeat the last known value over nulls so deltas stay small
+            last = np.maximum.accumulate(np.where(valid, np.arange(len(values)), 0))
+            values = np.where(valid[last], values[last], 0)
+    stored = np.round(values * scale).astype(np.int64)
+    if delta:
+        stored = np.diff(stored, prepend=0)
+    else:
+        stored = stored.clip(np.iinfo(dtype).min, np.iinfo(dtype).max)
+    blobs[name] = _pack(stored, dtype)
+    return blobs
+
+
+def _decode_column(name, blobs, count):
+    dtype, scale, delta, nullable = COLUMNS[name]
+    values = _unpack(blobs[name], dtype, count).astype(np.int64)
+    if delta:
+        values = np.cumsum(values)
+    if name in ('id', 'timestamp'):
+        return values
+    values = values / scale
+    if nullable and f'{name}.null' in blobs:
+        null = np.unpackbits(np.frombuffer(zlib.decompress(blobs[f'{name}.null']), dtype=np.uint8), count=count)
+        values[null.astype(bool)] = np.nan
+    return values
+
+
+def write_chunk(path, columns):
+    """Write columns (as produced by _columns_from_rows) to an archive file, atomically."""
+    count = len(columns['id'])
+    vocabulary, codes = np.unique(columns['event_type'].astype(str), return_inverse=True)
+    blobs = {'event_type': _pack(codes, np.uint8)}
+    for name in COLUMNS:
+        blobs.update(_encode_column(name, columns[name]))
+
+    offsets, position = {}, 0
+    for name, blob in blobs.items():
+        offsets[name] = [position, len(blob)]
+        position += len(blob)
+    header = json.dumps({
+        'version': ARCHIVE_VERSION,
+        'rows': count,
+        'first_timestamp': int(columns['timestamp'][0]) if count else None,
+        'last_timestamp': int(columns['timestamp'][-1]) if count else None,
+        'event_types': vocabulary.tolist(),
+        'columns': offsets,
+    }).encode()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.tmp')
+    with open(temporary, 'wb') as f:
+        f.write(struct.pack('<4sI', ARCHIVE_MAGIC, len(header)))
+        f.write(header)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(temporary, path)
+    return path.stat().st_size
+
+
+def read_chunk(path, columns=DEFAULT_COLUMNS):
+    """Read the given columns of an archive file into NumPy arrays."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        magic, header_length = struct.unpack_from('<4sI', mapped)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a tracking archive file.")
+        header = json.loads(mapped[8:8 + header_length])
+        data_start = 8 + header_length
+        count = header['rows']
+
+        def blob(name):
+            offset, length = header['columns'][name]
+            return mapped[data_start + offset:data_start + offset + length]
+
+        result = {}
+        for name in columns:
+            if name == 'event_type':
+                codes = _unpack(blob('event_type'), np.uint8, count)
+                result[name] = np.array(header['event_types'], dtype=object)[codes] if count else np.zeros(0, dtype=object)
+            elif name not in header['columns']:
+                result[name] = np.full(count, np.nan)  # written before this column was archived
+            else:
+                blobs = {key: blob(key) for key in (name, f'{name}.null') if key in header['columns']}
+                result[name] = _decode_column(name, blobs, count)
+    return result
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def archive_day(tracker_id, day):
+    """
+    Move one tracker's events for one UTC day into its archive file, merging
+    with what is already archived for that day. Returns the rows moved.
+    """
+    start, end = _day_bounds(day)
+    path = chunk_path(tracker_id, day)
+    with transaction.atomic():
+        # One archiver per tracker at a time
+        Tracker.objects.select_for_update().filter(pk=tracker_id).exists()
+        rows = list(
+            TrackingEvent.objects.filter(tracker_id=tracker_id, timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp', 'id').values_list(*FIELDS)
+        )
+        if not rows:
+            return 0
+        columns = _columns_from_rows(rows)
+        if path.exists():
+            # Rows already archived by an earlier run that did not get to delete them are dropped by id
+            archived = read_chunk(path, FIELDS)
+            columns = {name: np.concatenate((archived[name], columns[name])) for name in FIELDS}
+            _, unique = np.unique(columns['id'], return_index=True)
+            order = unique[np.lexsort((columns['id'][unique], columns['timestamp'][unique]))]
+            columns = {name: values[order] for name, values in columns.items()}
+
+        size = write_chunk(path, columns)
+        TrackingArchiveChunk.objects.update_or_create(
+            tracker_id=tracker_id, day=day,
+            defaults={
+                'row_count': len(columns['id']),
+                'size_bytes': size,
+                'first_timestamp': datetime.fromtimestamp(columns['timestamp'][0] / 1000, dt_timezone.utc),
+                'last_timestamp': datetime.fromtimestamp(columns['timestamp'][-1] / 1000, dt_timezone.utc),
+            },
+        )
+        ids = [row[0] for row in rows]
+        for batch in range(0, len(ids), DELETE_BATCH_SIZE):
+            TrackingEvent.objects.filter(pk__in=ids[batch:batch + DELETE_BATCH_SIZE]).delete()
+    return len(rows)
+
+
+def archive_events(older_than_days=None):
+    """
+    Archive every whole UTC day of events older than `older_than_days`
+    (default TRACKING_ARCHIVE_AFTER_DAYS). Returns a summary dict.
+    """
+    older_than_days = settings.TRACKING_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff, _ = _day_bounds(timezone.now().astimezone(dt_timezone.utc).date() - timedelta(days=older_than_days))
+    pending = (
+        TrackingEvent.objects.filter(timestamp__lt=cutoff)
+        .annotate(day=TruncDate('timestamp', tzinfo=dt_timezone.utc))
+        .values_list('tracker_id', 'day').distinct().order_by('tracker_id', 'day')
+    )
+    summary = {'chunks': 0, 'rows': 0}
+    for tracker_id, day in list(pending):
+        summary['rows'] += archive_day(tracker_id, day)
+        summary['chunks'] += 1
+    logger.info(f"Archived {summary['rows']} tracking events into {summary['chunks']} day chunks")
+    return summary
+
+
+def read_range(tracker_id, start, end, columns=DEFAULT_COLUMNS, include_live=True):
+    """
+    A tracker's fixes with start <= timestamp < end as {column: array},
+    in time order. Archived days are read from their files and, unless
+    include_live is False, rows still in the database are added.
+
+    timestamp is datetime64[ms] (UTC); numeric columns are float64 with NaN
+    for missing values, except id (int64); event_type is an object array.
+    """
+    columns = tuple(dict.fromkeys(('timestamp', *columns)))
+    start_ms, end_ms = int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+    parts = []
+
+    chunks = TrackingArchiveChunk.objects.filter(
+        tracker_id=tracker_id, first_timestamp__lt=end, last_timestamp__gte=start,
+    ).order_by('day')
+    for chunk in chunks:
+        part = read_chunk(chunk_path(tracker_id, chunk.day), columns)
+        keep = (part['timestamp'] >= start_ms) & (part['timestamp'] < end_ms)
+        parts.append({name: values[keep] for name, values in part.items()})
+
+    if include_live:
+        rows = list(
+            TrackingEvent.objects.filter(tracker_id=tracker_id, timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp', 'id').values_list(*FIELDS)
+        )
+        live = _columns_from_rows(rows)
+        parts.append({name: live[name] for name in columns})
+
+    result = {name: np.concatenate([part[name] for part in parts]) if parts else _empty_columns()[name] for name in columns}
+    order = np.argsort(result['timestamp'], kind='stable')
+    result = {name: values[order] for name, values in result.items()}
+    result['timestamp'] = result['timestamp'].astype('datetime64[ms]')
+    return result
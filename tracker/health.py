@@ -0,0 +1,118 @@
+"""
+Tracker health, kept on Tracker so nothing has to ask the tracking service.
+
+Ingestion (tracker.services.poll_positions every minute, and
+get_tracker_data on page views) stores the vendor's fix time in
+Tracker.last_fix_at and calls record_heartbeat to classify the tracker from
+its fix age, voltage and satellites in view. last_updated is auto_now and
+only says when we last asked, so it is never used here. Heartbeat age is
+judged in the database: sweep_health moves trackers that have gone quiet to
+stale or offline through the last_fix_at index, and fleet_health counts
+every state in one aggregate query with the same age cut-offs, so its
+counts are right between sweeps too.
+
+Changes into or out of offline and low_battery notify the truck owner and
+the superuser. live <-> stale changes happen whenever a truck parks in a
+poor signal area and are only recorded.
+"""
+import logging
+from datetime import timedelta
+from django.db.models import Count, Q
+from django.utils import timezone
+from booking.models import Truck
+from notifications.models import Notification
+from users.models import User
+from .models import Tracker
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER = timedelta(minutes=30)
+OFFLINE_AFTER = timedelta(hours=6)
+MIN_SATELLITES = 4  # fewer cannot give a trustworthy fix
+LOW_BATTERY_RATIO = 0.95  # of the nominal 12 V or 24 V system voltage
+NOTIFY_STATES = {'offline', 'low_battery'}
+
+
+def classify(age, voltage, satellites):
+    """Health state from heartbeat age (a timedelta, None if never heard), voltage and satellites in view."""
+    if age is None or age > OFFLINE_AFTER:
+        return 'offline'
+    # A zero or missing voltage means the tracker does not report it
+    if voltage and voltage < (24 if voltage > 18 else 12) * LOW_BATTERY_RATIO:
+        return 'low_battery'
+    if age > STALE_AFTER or (satellites is not None and satellites < MIN_SATELLITES):
+        return 'stale'
+    return 'live'
+
+
+def _notify(tracker, previous, health):
+    truck = tracker.truck
+    if health == 'offline':
+        notification_type = 'tracker-offline'
+        message = f"The tracker on {truck.name} has sent nothing for over {OFFLINE_AFTER.total_seconds() / 3600:.0f} hours."
+    elif health == 'low_battery':
+        notification_type = 'tracker-low-battery'
+        message = f"The tracker on {truck.name} reports a low battery ({tracker.battery_level:.1f} V)."
+    else:
+        notification_type = 'tracker-restored'
+        message = f"The tracker on {truck.name} is reporting normally again (was {previous.replace('_', ' ')})."
+
+    superuser = User.objects.filter(is_superuser=True).first()
+    for user in {truck.owner, superuser} - {None}:
+        Notification.objects.create(user=user, truck=truck, message=message, notification_type=notification_type)
+
+
+def _set_health(tracker, health, now):
+    previous = tracker.health
+    if health == previous:
+        return False
+    # update() rather than save(): only the health fields change
+    Tracker.objects.filter(pk=tracker.pk).update(health=health, health_changed_at=now)
+    tracker.health, tracker.health_changed_at = health, now
+    if previous in NOTIFY_STATES or health in NOTIFY_STATES:
+        _notify(tracker, previous, health)
+    return True
+
+
+def record_heartbeat(tracker, now=None):
+    """Reclassify a tracker ingestion has just saved. Returns whether its state changed."""
+    now = now or timezone.now()
+    age = now - tracker.last_fix_at if tracker.last_fix_at else None
+    return _set_health(tracker, classify(age, tracker.battery_level, tracker.gps_satellites), now)
+
+
+def sweep_health(now=None):
+    """Move trackers that have gone quiet to stale or offline. Returns how many changed."""
+    now = now or timezone.now()
+    trackers = Tracker.objects.select_related('truck__owner')
+    changed = 0
+    for tracker in trackers.filter(last_fix_at__lt=now - OFFLINE_AFTER).exclude(health='offline'):
+        changed += _set_health(tracker, 'offline', now)
+    # A low battery outranks staleness until the tracker goes offline
+    for tracker in trackers.filter(last_fix_at__lt=now - STALE_AFTER, last_fix_at__gte=now - OFFLINE_AFTER, health='live'):
+        changed += _set_health(tracker, 'stale', now)
+    if changed:
+        logger.info(f"Tracker health sweep changed {changed} trackers")
+    return changed
+
+
+def fleet_health(trucks=None, now=None):
+    """
+    {'total', 'live', 'stale', 'offline', 'low_battery', 'moving'} over
+    trucks with a tracker id, in one query. Trucks never heard from count
+    as offline.
+    """
+    now = now or timezone.now()
+    trucks = Truck.objects.filter(tracker_id__isnull=False) if trucks is None else trucks
+    recent = Q(tracker__last_fix_at__gte=now - STALE_AFTER)
+    heard = Q(tracker__last_fix_at__gte=now - OFFLINE_AFTER)
+    live = recent & Q(tracker__health='live')
+    low_battery = heard & Q(tracker__health='low_battery')
+    return trucks.aggregate(
+        total=Count('pk'),
+        live=Count('pk', filter=live),
+        stale=Count('pk', filter=heard & ~live & ~low_battery),
+        offline=Count('pk', filter=~heard),
+        low_battery=Count('pk', filter=low_battery),
+        moving=Count('pk', filter=recent & Q(tracker__is_moving=True)),
+    )
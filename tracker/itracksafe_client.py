@@ -0,0 +1,63 @@
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .services import ITRACKSAFEX_API_URL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+CMD_SEND_CONFIRMED = 6  # sendcmd status: the device confirmed the command
+COMMAND_PASSWORD = "zhuyi"  # Fixed password from docs
+COMMANDS = {
+    'lock': ("TYPE_SERVER_SET_RELAY_OIL", ["1"]),
+    'unlock': ("TYPE_SERVER_SET_RELAY_OIL", ["0"]),
+}
+
+
+class ITrackSafeClient:
+    def __init__(self, pool_size=10):
+        self.base_url = ITRACKSAFEX_API_URL
+        self.timeout = DEFAULT_TIMEOUT
+        self.session = self._build_session(pool_size)
+
+    def _build_session(self, pool_size):
+        """
+        Keep-alive session shared by every thread of the command worker.
+
+        Commands drive the fuel relay, so a POST is only retried when the
+        connection could not be opened, i.e. when the service never saw it.
+        """
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _post(self, action, token, payload):
+        try:
+            response = self.session.post(
+                self.base_url, params={'action': action, 'token': token}, json=payload, timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"iTrackSafe {action} failed: {e}")
+            # No status: the service may not have seen the request, so it can be sent again
+            return {'status': None, 'cause': 'Unable to reach tracking service.'}
+
+    def send_command(self, token, tracker_id, action):
+        cmdcode, params = COMMANDS[action]
+        return self._post('sendcmd', token, {
+            "deviceid": tracker_id,
+            "cmdcode": cmdcode,
+            "params": params,
+            "cmdpwd": COMMAND_PASSWORD,
+        })
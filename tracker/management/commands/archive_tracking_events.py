@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from tracker.archive import archive_events
+from tracker.models import TrackingArchiveChunk
+
+
+class Command(BaseCommand):
+    help = 'Move tracking events older than TRACKING_ARCHIVE_AFTER_DAYS into per-tracker, per-day column files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.TRACKING_ARCHIVE_AFTER_DAYS)
+
+    def handle(self, *args, **options):
+        summary = archive_events(options['older_than_days'])
+        totals = TrackingArchiveChunk.objects.aggregate(rows=Sum('row_count'), size=Sum('size_bytes'))
+        self.stdout.write(self.style.SUCCESS(f"Archived {summary['rows']} events into {summary['chunks']} day chunks."))
+        if totals['rows']:
+            self.stdout.write(
+                f"Archive holds {totals['rows']} events in {totals['size'] / 1024:.0f} KiB "
+                f"({totals['size'] / totals['rows']:.1f} bytes per event)."
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from tracker.models import Tracker
+from tracker.trips import build_all_trips, build_trips
+
+
+class Command(BaseCommand):
+    help = 'Rebuild trips from tracking events recorded since each tracker\'s last build.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--truck', type=int, help='Only this truck id.')
+
+    def handle(self, *args, **options):
+        if options['truck']:
+            tracker = Tracker.objects.filter(truck_id=options['truck']).first()
+            if tracker is None:
+                raise CommandError(f"Truck {options['truck']} has no tracker.")
+            summary = {'trackers': 1, 'trips': build_trips(tracker)}
+        else:
+            summary = build_all_trips()
+        self.stdout.write(self.style.SUCCESS(f"Built {summary['trips']} trips for {summary['trackers']} trackers."))
@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tracker.models import Tracker
+from tracker.telemetry import TELEMETRY_RECOMPUTE_DAYS, compute_daily_metrics
+
+
+class Command(BaseCommand):
+    help = 'Compute per-truck daily driving and telemetry metrics from tracking events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=TELEMETRY_RECOMPUTE_DAYS, help='Days back from today to compute.')
+        parser.add_argument('--day', type=date.fromisoformat, help='Only this day (YYYY-MM-DD).')
+        parser.add_argument('--truck', type=int, help='Only this truck id.')
+
+    def handle(self, *args, **options):
+        tracker_ids = None
+        if options['truck']:
+            tracker = Tracker.objects.filter(truck_id=options['truck']).first()
+            if tracker is None:
+                raise CommandError(f"Truck {options['truck']} has no tracker.")
+            tracker_ids = [tracker.pk]
+
+        today = timezone.localdate()
+        days = [options['day']] if options['day'] else [today - timedelta(days=offset) for offset in range(options['days'])]
+        rows = sum(compute_daily_metrics(day, tracker_ids) for day in days)
+        self.stdout.write(self.style.SUCCESS(f"Computed {rows} daily truck metrics over {len(days)} days."))
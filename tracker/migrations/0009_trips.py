@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_alter_trackingevent_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('start_latitude', models.FloatField()),
+                ('start_longitude', models.FloatField()),
+                ('end_latitude', models.FloatField()),
+                ('end_longitude', models.FloatField()),
+                ('distance_km', models.FloatField()),
+                ('max_speed', models.FloatField()),
+                ('avg_speed', models.FloatField()),
+                ('point_count', models.PositiveIntegerField(help_text='Fixes recorded during the trip')),
+                ('polyline', models.TextField(help_text='Simplified path, Google encoded polyline')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trackingevent',
+            index=models.Index(fields=['tracker', 'timestamp'], name='tracking_event_tracker_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='tracker',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='tracker.tracker'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['tracker', '-ended_at'], name='trip_tracker_end_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trip',
+            constraint=models.UniqueConstraint(fields=('tracker', 'started_at'), name='unique_trip_start'),
+        ),
+    ]
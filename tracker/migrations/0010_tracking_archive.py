@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_trips'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingArchiveChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tracker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_chunks', to='tracker.tracker')),
+            ],
+            options={
+                'ordering': ['tracker', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('tracker', 'day'), name='unique_archive_chunk_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_tracking_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trackingevent',
+            name='acc_duration',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Milliseconds the ignition has been on (accduration)', null=True),
+        ),
+        migrations.AddField(
+            model_name='trackingevent',
+            name='alarm',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trackingevent',
+            name='alarm2',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trackingevent',
+            name='park_duration',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Milliseconds parked (parkduration)', null=True),
+        ),
+        migrations.CreateModel(
+            name='TruckDailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('fix_count', models.PositiveIntegerField()),
+                ('max_speed', models.FloatField()),
+                ('overspeed_events', models.PositiveIntegerField()),
+                ('overspeed_seconds', models.PositiveIntegerField()),
+                ('idle_seconds', models.PositiveIntegerField(help_text='Standing still with the ignition on')),
+                ('harsh_accelerations', models.PositiveIntegerField()),
+                ('harsh_brakings', models.PositiveIntegerField()),
+                ('alarm_events', models.PositiveIntegerField()),
+                ('min_voltage', models.FloatField(blank=True, null=True)),
+                ('voltage_anomalies', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tracker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='tracker.tracker')),
+            ],
+            options={
+                'ordering': ['tracker', '-day'],
+                'constraints': [models.UniqueConstraint(fields=('tracker', 'day'), name='unique_truck_daily_metrics')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_open_load_index'),
+        ('tracker', '0011_telemetry_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tracker',
+            name='health',
+            field=models.CharField(choices=[('live', 'Live'), ('stale', 'Stale'), ('offline', 'Offline'), ('low_battery', 'Low Battery')], default='offline', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='tracker',
+            name='health_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tracker',
+            index=models.Index(fields=['last_updated'], name='tracker_last_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_open_load_index'),
+        ('tracker', '0012_tracker_health'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TruckCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tracker_id', models.CharField(help_text='Device the command was addressed to', max_length=100)),
+                ('action', models.CharField(choices=[('lock', 'Lock'), ('unlock', 'Unlock')], max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sent', 'Sent'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('batch', models.CharField(db_index=True, help_text='Commands issued together in one action', max_length=32)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('response_status', models.IntegerField(blank=True, help_text='Status code returned by the tracking service', null=True)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='truck_commands', to=settings.AUTH_USER_MODEL)),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='booking.truck')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='truck_command_queue_idx')],
+            },
+        ),
+    ]
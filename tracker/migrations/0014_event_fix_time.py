@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:19
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_fixes(apps, schema_editor):
+    """Keep the first row of each (tracker, timestamp) so the unique constraint can be added."""
+    TrackingEvent = apps.get_model('tracker', 'TrackingEvent')
+    duplicates = (
+        TrackingEvent.objects.values('tracker_id', 'timestamp')
+        .annotate(n=Count('id'), keep=Min('id')).filter(n__gt=1)
+    )
+    for row in duplicates.iterator():
+        TrackingEvent.objects.filter(tracker_id=row['tracker_id'], timestamp=row['timestamp']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_truck_commands'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trackingevent',
+            name='tracking_event_tracker_ts_idx',
+        ),
+        migrations.AddField(
+            model_name='tracker',
+            name='trips_built_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trackingevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the device took the fix (updatetime)'),
+        ),
+        migrations.RunPython(drop_duplicate_fixes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trackingevent',
+            constraint=models.UniqueConstraint(fields=('tracker', 'timestamp'), name='unique_tracking_event_fix'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_open_load_index'),
+        ('tracker', '0014_event_fix_time'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tracker',
+            name='tracker_last_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='tracker',
+            name='last_fix_at',
+            field=models.DateTimeField(blank=True, help_text='When the device took its latest fix (updatetime)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tracker',
+            index=models.Index(fields=['last_fix_at'], name='tracker_last_fix_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_tracker_fix_time'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='truckdailymetrics',
+            name='harsh_accelerations',
+        ),
+        migrations.RemoveField(
+            model_name='truckdailymetrics',
+            name='harsh_brakings',
+        ),
+    ]
@@ -1,17 +1,37 @@
 from django.db import models
+from django.utils import timezone
 from booking.models import Truck
 from django.conf import settings
 
 class Tracker(models.Model):
+    HEALTH_CHOICES = [
+        ('live', 'Live'),
+        ('stale', 'Stale'),
+        ('offline', 'Offline'),
+        ('low_battery', 'Low Battery'),
+    ]
+
     truck = models.OneToOneField(Truck, on_delete=models.CASCADE, related_name="tracker")
     last_latitude = models.FloatField(null=True, blank=True)
     last_longitude = models.FloatField(null=True, blank=True)
     speed = models.FloatField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
+    last_fix_at = models.DateTimeField(null=True, blank=True, help_text="When the device took its latest fix (updatetime)")
     battery_level = models.FloatField(null=True, blank=True)
     signal_strength = models.IntegerField(null=True, blank=True)
     gps_satellites = models.IntegerField(null=True, blank=True)
     is_moving = models.BooleanField(default=False)
+    # Maintained by tracker.health from ingestion and its periodic sweep
+    health = models.CharField(max_length=12, choices=HEALTH_CHOICES, default='offline')
+    health_changed_at = models.DateTimeField(null=True, blank=True)
+    # Fix time tracker.trips has read up to; trip builds resume here
+    trips_built_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Heartbeat age, for the health sweep
+            models.Index(fields=['last_fix_at'], name='tracker_last_fix_idx'),
+        ]
 
     def __str__(self):
         return f"Tracker for {self.truck.name} - {self.truck.tracker_id}"
@@ -36,15 +56,137 @@ class TrackingEvent(models.Model):
     speed = models.FloatField()
     battery_level = models.FloatField(null=True, blank=True)
     signal_strength = models.IntegerField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Raw vendor telemetry, read by tracker.telemetry
+    acc_duration = models.PositiveBigIntegerField(null=True, blank=True, help_text="Milliseconds the ignition has been on (accduration)")
+    park_duration = models.PositiveBigIntegerField(null=True, blank=True, help_text="Milliseconds parked (parkduration)")
+    alarm = models.BigIntegerField(null=True, blank=True)
+    alarm2 = models.BigIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now, help_text="When the device took the fix (updatetime)")
 
     class Meta:
         ordering = ['-timestamp']
+        constraints = [
+            # One row per fix, however often it is fetched; its index serves per-tracker history in time order
+            models.UniqueConstraint(fields=['tracker', 'timestamp'], name='unique_tracking_event_fix'),
+        ]
 
     def __str__(self):
         return f"{self.event_type} at {self.timestamp} for {self.tracker.truck.name}"
 
 
+class Trip(models.Model):
+    """A stretch of driving rebuilt from TrackingEvent fixes by tracker.trips."""
+    tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="trips")
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    start_latitude = models.FloatField()
+    start_longitude = models.FloatField()
+    end_latitude = models.FloatField()
+    end_longitude = models.FloatField()
+    distance_km = models.FloatField()
+    max_speed = models.FloatField()
+    avg_speed = models.FloatField()
+    point_count = models.PositiveIntegerField(help_text="Fixes recorded during the trip")
+    polyline = models.TextField(help_text="Simplified path, Google encoded polyline")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(fields=['tracker', 'started_at'], name='unique_trip_start'),
+        ]
+        indexes = [
+            models.Index(fields=['tracker', '-ended_at'], name='trip_tracker_end_idx'),
+        ]
+
+    @property
+    def duration(self):
+        return self.ended_at - self.started_at
+
+    def __str__(self):
+        return f"Trip of {self.tracker.truck.name} on {self.started_at:%Y-%m-%d} ({self.distance_km} km)"
+
+
+class TruckDailyMetrics(models.Model):
+    """One tracker's driving and telemetry summary for one day, computed by tracker.telemetry."""
+    tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="daily_metrics")
+    day = models.DateField()
+    fix_count = models.PositiveIntegerField()
+    max_speed = models.FloatField()
+    overspeed_events = models.PositiveIntegerField()
+    overspeed_seconds = models.PositiveIntegerField()
+    idle_seconds = models.PositiveIntegerField(help_text="Standing still with the ignition on")
+    alarm_events = models.PositiveIntegerField()
+    min_voltage = models.FloatField(null=True, blank=True)
+    voltage_anomalies = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['tracker', '-day']
+        constraints = [
+            models.UniqueConstraint(fields=['tracker', 'day'], name='unique_truck_daily_metrics'),
+        ]
+
+    def __str__(self):
+        return f"Metrics of tracker {self.tracker_id} for {self.day}"
+
+
+class TrackingArchiveChunk(models.Model):
+    """One tracker's events for one UTC day, moved to a column file by tracker.archive."""
+    tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="archive_chunks")
+    day = models.DateField()
+    row_count = models.PositiveIntegerField()
+    size_bytes = models.PositiveIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['tracker', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['tracker', 'day'], name='unique_archive_chunk_day'),
+        ]
+
+    def __str__(self):
+        return f"Archive of tracker {self.tracker_id} for {self.day} ({self.row_count} events)"
+
+
+class TruckCommand(models.Model):
+    """A lock/unlock command for one truck, queued and sent by tracker.remote."""
+    ACTION_CHOICES = [
+        ('lock', 'Lock'),
+        ('unlock', 'Unlock'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('confirmed', 'Confirmed'),
+        ('failed', 'Failed'),
+    ]
+
+    truck = models.ForeignKey(Truck, on_delete=models.CASCADE, related_name="commands")
+    tracker_id = models.CharField(max_length=100, help_text="Device the command was addressed to")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    batch = models.CharField(max_length=32, db_index=True, help_text="Commands issued together in one action")
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="truck_commands")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    response_status = models.IntegerField(null=True, blank=True, help_text="Status code returned by the tracking service")
+    message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Command queue scans
+            models.Index(fields=['status', 'id'], name='truck_command_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.truck.name} - {self.status}"
+
 
 class Geofence(models.Model):
     name = models.CharField(max_length=255)
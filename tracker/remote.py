@@ -0,0 +1,182 @@
+"""
+Queued lock/unlock commands.
+
+Operators queue a command for any number of trucks in one action
+(enqueue_commands); each truck gets a TruckCommand row and the rows share a
+batch id. The worker (process_commands, run by beat) claims queued rows
+with SKIP LOCKED, marks them sent and sends them through one pooled
+ITrackSafeClient from at most COMMAND_CONCURRENCY threads, outside any
+transaction. Threads only make HTTP calls; results are written back by the
+worker itself.
+
+A command is confirmed when the tracking service answers status 6
+(CMD_SEND_CONFIRMED) and failed on any other answer. Calls that got no
+answer are queued again until COMMAND_MAX_ATTEMPTS, and so are rows a
+worker that died left in sent.
+
+Only a truck's latest command may go out: before anything is re-queued or
+claimed, commands with a newer command for the same truck are failed as
+superseded, so a retried lock can never land after a later unlock. A truck
+with a command still in flight gets nothing more until it is answered, and
+a batch never holds two commands for one truck.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from users.models import User
+from .itracksafe_client import CMD_SEND_CONFIRMED, ITrackSafeClient
+from .models import TruckCommand
+from .services import get_or_refresh_token
+
+logger = logging.getLogger(__name__)
+
+COMMAND_BATCH_SIZE = 50
+COMMAND_CONCURRENCY = 8
+COMMAND_MAX_ATTEMPTS = 3
+COMMAND_SENT_TIMEOUT = timedelta(minutes=2)  # a sent row older than this lost its worker
+
+itracksafe_client = ITrackSafeClient(pool_size=COMMAND_CONCURRENCY)
+
+
+def enqueue_commands(trucks, action, user):
+    """Queue `action` for every truck with a tracker. Returns (batch id, commands queued)."""
+    trucks = [truck for truck in trucks if truck.tracker_id]
+    batch = uuid.uuid4().hex
+    with transaction.atomic():
+        # Only the latest instruction for a truck matters
+        TruckCommand.objects.filter(truck__in=trucks, status='queued').update(
+            status='failed', message='Superseded by a newer command', completed_at=timezone.now(),
+        )
+        TruckCommand.objects.bulk_create([
+            TruckCommand(truck=truck, tracker_id=truck.tracker_id, action=action, batch=batch, requested_by=user)
+            for truck in trucks
+        ])
+    return batch, len(trucks)
+
+
+def _superseded():
+    return Exists(TruckCommand.objects.filter(truck_id=OuterRef('truck_id'), id__gt=OuterRef('id')))
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        stuck = TruckCommand.objects.filter(status='sent', sent_at__lt=now - COMMAND_SENT_TIMEOUT)
+        # Retries must never overtake a newer command for the same truck
+        for pending in (stuck, TruckCommand.objects.filter(status='queued')):
+            pending.filter(_superseded()).update(
+                status='failed', message='Superseded by a newer command', completed_at=now,
+            )
+        stuck.filter(attempts__gte=COMMAND_MAX_ATTEMPTS).update(
+            status='failed', message='No answer from the tracking service', completed_at=now,
+        )
+        stuck.update(status='queued')
+
+        in_flight = TruckCommand.objects.filter(truck_id=OuterRef('truck_id'), status='sent')
+        claimed = (
+            # of=('self',): requested_by is nullable, and the outer join's side cannot be locked
+            TruckCommand.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('requested_by')
+            .filter(status='queued')
+            .exclude(Exists(in_flight))
+            .order_by('id')[:batch_size]
+        )
+        # One command per truck per batch; the newest wins and the rest are superseded next run
+        latest = {}
+        for command in claimed:
+            latest[command.truck_id] = command
+        commands = sorted(latest.values(), key=lambda command: command.id)
+        if commands:
+            TruckCommand.objects.filter(id__in=[command.id for command in commands]).update(
+                status='sent', sent_at=now, attempts=F('attempts') + 1,
+            )
+    return commands
+
+
+def _tokens(commands):
+    """Tracking service token per requesting user; commands of deleted users go out as the superuser."""
+    superuser = None
+    tokens = {}
+    for user in {command.requested_by for command in commands}:
+        if user is None:
+            superuser = superuser or User.objects.filter(is_superuser=True).first()
+        account = user or superuser
+        tokens[user] = get_or_refresh_token(account) if account else None
+    return tokens
+
+
+def _send(command, token):
+    if token is None:
+        return {'status': None, 'cause': 'Unable to authenticate with tracking service'}
+    return itracksafe_client.send_command(token, command.tracker_id, command.action)
+
+
+def _apply_result(command, response):
+    """Record a sendcmd response on a sent command. Returns its new status."""
+    status = response.get('status')
+    attempts = command.attempts + 1
+    if status == CMD_SEND_CONFIRMED:
+        update = {'status': 'confirmed', 'message': '', 'completed_at': timezone.now()}
+    elif status is None and attempts < COMMAND_MAX_ATTEMPTS:
+        update = {'status': 'queued', 'message': response.get('cause', '')}
+    else:
+        update = {'status': 'failed', 'message': (response.get('cause') or 'Command failed')[:255], 'completed_at': timezone.now()}
+    TruckCommand.objects.filter(pk=command.pk, status='sent').update(response_status=status, **update)
+    return update['status']
+
+
+def send_command_batch(batch_size=COMMAND_BATCH_SIZE):
+    """Claim and send up to `batch_size` commands. Returns {status: count} for the claimed commands."""
+    commands = _claim(batch_size)
+    if not commands:
+        return {}
+    tokens = _tokens(commands)
+    with ThreadPoolExecutor(max_workers=COMMAND_CONCURRENCY) as pool:
+        responses = list(pool.map(lambda command: _send(command, tokens[command.requested_by]), commands))
+
+    results = {}
+    for command, response in zip(commands, responses):
+        status = _apply_result(command, response)
+        results[status] = results.get(status, 0) + 1
+    return results
+
+
+def process_commands(batch_size=COMMAND_BATCH_SIZE, max_batches=None):
+    """
+    Drain the command queue batch by batch. Stops early when a whole batch
+    got no answer so an outage is not hammered. Returns {status: count}.
+    """
+    summary = {}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        results = send_command_batch(batch_size)
+        batches += 1
+        for status, count in results.items():
+            summary[status] = summary.get(status, 0) + count
+        if not results or set(results) == {'queued'}:
+            break
+    if summary:
+        logger.info(f"Truck commands processed: {summary}")
+    return summary
+
+
+def batch_progress(batch):
+    """Counts by status and per-truck rows for one batch, for the live progress view."""
+    commands = list(
+        TruckCommand.objects.filter(batch=batch).order_by('id')
+        .values('id', 'truck_id', 'truck__name', 'action', 'status', 'attempts', 'message')
+    )
+    counts = {status: 0 for status, _ in TruckCommand.STATUS_CHOICES}
+    for command in commands:
+        counts[command['status']] += 1
+    return {
+        'batch': batch,
+        'total': len(commands),
+        'counts': counts,
+        'done': counts['queued'] + counts['sent'] == 0,
+        'commands': commands,
+    }
@@ -2,16 +2,56 @@ from celery import shared_task
 from datetime import timedelta
 from django.utils import timezone
 from tracker.models import TrackerToken
-from tracker.services import TrackerAccountService
+from tracker.services import get_or_refresh_token, poll_positions
+from tracker.archive import archive_events
+from tracker.health import sweep_health
+from tracker.remote import process_commands
+from tracker.telemetry import compute_recent_metrics
+from tracker.trips import build_all_trips
 
 @shared_task
 def refresh_tracker_tokens():
     """Refresh all tracker tokens that are about to expire"""
-    service = TrackerAccountService()
     # Get tokens that were updated more than 23 hours ago
     expired_tokens = TrackerToken.objects.filter(
         updated_at__lt=timezone.now() - timedelta(hours=23)
-    )
-    
+    ).select_related('user')
+
     for token in expired_tokens:
-        service.login(token.user.username, token.user.tracker_password)
\ No newline at end of file
+        get_or_refresh_token(token.user)
+
+
+@shared_task
+def poll_tracker_positions_task():
+    """Ingest the latest fix of every tracked truck"""
+    return poll_positions()
+
+
+@shared_task
+def build_trips_task():
+    """Rebuild trips from new tracking events"""
+    return build_all_trips()
+
+
+@shared_task
+def archive_tracking_events_task():
+    """Move aged tracking events into the columnar archive"""
+    return archive_events()
+
+
+@shared_task
+def compute_telemetry_metrics_task():
+    """Recompute recent per-truck daily telemetry metrics"""
+    return compute_recent_metrics()
+
+
+@shared_task
+def sweep_tracker_health_task():
+    """Mark trackers that have gone quiet as stale or offline"""
+    return sweep_health()
+
+
+@shared_task
+def process_truck_commands_task():
+    """Send queued lock/unlock commands"""
+    return process_commands()
@@ -0,0 +1,185 @@
+"""
+Daily driving-behaviour and telemetry metrics per truck.
+
+A day's fixes are read for TELEMETRY_BATCH_TRACKERS trackers at a time,
+ordered by tracker and time, and every metric is computed over the whole
+batch at once: consecutive fixes of the same tracker form pairs, and
+per-tracker totals are bincounts over the tracker index. A pair only counts
+when its fixes are at most MAX_FIX_INTERVAL apart, so time the tracker was
+silent is never claimed as driving or idling.
+
+- overspeed: episodes above OVERSPEED_KMH, and the time spent above it
+- idle: time standing still with the ignition on (accduration > 0)
+- alarms: fixes where alarm or alarm2 becomes set or changes
+- voltage anomalies: fixes more than VOLTAGE_TOLERANCE off the tracker's
+  median voltage for the day, which suits 12 V and 24 V systems alike
+
+Results are upserted into TruckDailyMetrics, one row per tracker per day.
+"""
+import logging
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+from .models import TrackingEvent, TruckDailyMetrics
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_BATCH_TRACKERS = 50
+TELEMETRY_RECOMPUTE_DAYS = 2  # today and yesterday, so late fixes are picked up
+MAX_FIX_INTERVAL = 15 * 60  # seconds
+MOVING_SPEED_KMH = 5.0
+OVERSPEED_KMH = 90.0
+VOLTAGE_TOLERANCE = 0.15
+
+FIELDS = ('tracker_id', 'timestamp', 'speed', 'battery_level', 'acc_duration', 'alarm', 'alarm2')
+METRICS = (
+    'fix_count', 'max_speed', 'overspeed_events', 'overspeed_seconds', 'idle_seconds',
+    'alarm_events', 'min_voltage', 'voltage_anomalies',
+)
+
+
+def compute_metrics(tracker, ts, speed, voltage, acc, alarm, alarm2):
+    """
+    Per-tracker metrics for a batch of fixes sorted by tracker, then time.
+
+    `tracker` holds tracker ids, `ts` epoch seconds, `speed` km/h, `voltage`
+    volts and `acc` ignition-on milliseconds; missing values are NaN.
+    Returns (tracker ids, {metric: array aligned with the ids}).
+    """
+    if not len(tracker):
+        return np.zeros(0, dtype=np.int64), {name: np.zeros(0) for name in METRICS}
+    ids, group = np.unique(tracker, return_inverse=True)
+    n = len(ids)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(group)) + 1))
+
+    def total(values, index=group):
+        return np.bincount(index, weights=values.astype(float), minlength=n)
+
+    # Pairs of consecutive fixes of one tracker, attributed to the earlier fix
+    same = group[1:] == group[:-1]
+    dt = np.diff(ts)
+    paired = same & (dt > 0) & (dt <= MAX_FIX_INTERVAL)
+    pair_group = group[:-1]
+    pair_dt = np.where(paired, dt, 0.0)
+
+    over = speed > OVERSPEED_KMH
+    over_started = over.copy()
+    over_started[1:] &= ~(over[:-1] & paired)
+
+    idling = (speed < MOVING_SPEED_KMH) & (np.nan_to_num(acc) > 0)
+
+    alarm, alarm2 = np.nan_to_num(alarm), np.nan_to_num(alarm2)
+    alarm_changed = np.ones(len(group), dtype=bool)
+    alarm_changed[1:] = ~same | (alarm[1:] != alarm[:-1]) | (alarm2[1:] != alarm2[:-1])
+    alarm_raised = ((alarm != 0) | (alarm2 != 0)) & alarm_changed
+
+    # Medians do not reduce with bincount; one small call per tracker
+    median = np.array([
+        np.median(values[~np.isnan(values)]) if (~np.isnan(values)).any() else np.nan
+        for values in np.split(voltage, starts[1:])
+    ])
+    with np.errstate(invalid='ignore'):
+        voltage_off = np.abs(voltage - median[group]) > VOLTAGE_TOLERANCE * median[group]
+
+    metrics = {
+        'fix_count': np.bincount(group, minlength=n),
+        'max_speed': np.maximum.reduceat(speed, starts),
+        'overspeed_events': total(over_started),
+        'overspeed_seconds': total(pair_dt * over[:-1], pair_group),
+        'idle_seconds': total(pair_dt * idling[:-1], pair_group),
+        'alarm_events': total(alarm_raised),
+        'min_voltage': np.fmin.reduceat(voltage, starts),
+        'voltage_anomalies': total(voltage_off),
+    }
+    return ids, metrics
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _load(tracker_ids, start, end):
+    rows = list(
+        TrackingEvent.objects.filter(tracker_id__in=tracker_ids, timestamp__gte=start, timestamp__lt=end)
+        .order_by('tracker_id', 'timestamp').values_list(*FIELDS)
+    )
+    if not rows:
+        return None
+    tracker, timestamps, *numeric = zip(*rows)
+    ts = np.array([timestamp.timestamp() for timestamp in timestamps])
+    return (np.array(tracker, dtype=np.int64), ts, *(np.array(values, dtype=float) for values in numeric))
+
+
+def compute_daily_metrics(day, tracker_ids=None):
+    """Compute and store TruckDailyMetrics for one day. Returns the rows written."""
+    start, end = _day_bounds(day)
+    if tracker_ids is None:
+        tracker_ids = (
+            TrackingEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .values_list('tracker_id', flat=True).distinct().order_by('tracker_id')
+        )
+    tracker_ids = list(tracker_ids)
+    written = 0
+    for batch in range(0, len(tracker_ids), TELEMETRY_BATCH_TRACKERS):
+        columns = _load(tracker_ids[batch:batch + TELEMETRY_BATCH_TRACKERS], start, end)
+        if columns is None:
+            continue
+        ids, metrics = compute_metrics(*columns)
+        rows = []
+        for index, tracker_id in enumerate(ids.tolist()):
+            counts = {name: int(round(metrics[name][index])) for name in METRICS if name not in ('max_speed', 'min_voltage')}
+            min_voltage = metrics['min_voltage'][index]
+            rows.append(TruckDailyMetrics(
+                tracker_id=tracker_id, day=day,
+                max_speed=float(metrics['max_speed'][index]),
+                min_voltage=None if np.isnan(min_voltage) else round(float(min_voltage), 2),
+                **counts,
+            ))
+        with transaction.atomic():
+            TruckDailyMetrics.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['tracker', 'day'],
+                update_fields=[*METRICS, 'updated_at'],
+            )
+        written += len(rows)
+    return written
+
+
+def compute_recent_metrics(days=TELEMETRY_RECOMPUTE_DAYS):
+    """Recompute the last `days` days, today included. Returns {'days': n, 'rows': n}."""
+    today = timezone.localdate()
+    summary = {'days': 0, 'rows': 0}
+    for offset in range(days):
+        summary['rows'] += compute_daily_metrics(today - timedelta(days=offset))
+        summary['days'] += 1
+    logger.info(f"Computed {summary['rows']} daily truck metrics over {summary['days']} days")
+    return summary
+
+
+def owner_metrics(owner, days=7):
+    """Per-truck totals of an owner's last `days` days of metrics, for the owner dashboard."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        TruckDailyMetrics.objects.filter(tracker__truck__owner=owner, day__gte=since)
+        .values('tracker__truck_id', 'tracker__truck__name')
+        .annotate(
+            max_speed=Max('max_speed'),
+            overspeed_events=Sum('overspeed_events'),
+            idle_seconds=Sum('idle_seconds'),
+            alarm_events=Sum('alarm_events'),
+            min_voltage=Min('min_voltage'),
+            voltage_anomalies=Sum('voltage_anomalies'),
+        )
+        .order_by('tracker__truck__name')
+    )
+    return [
+        {
+            'truck_id': row['tracker__truck_id'],
+            'truck': row['tracker__truck__name'],
+            'idle_hours': round(row['idle_seconds'] / 3600, 1),
+            **{key: value for key, value in row.items() if not key.startswith('tracker__')},
+        }
+        for row in rows
+    ]
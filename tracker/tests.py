@@ -1,3 +1,185 @@
-from django.test import TestCase
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from booking.models import Truck
+from delivery.eta import get_speed_profile
+from users.models import User
+from .archive import archive_day, read_range
+from .health import fleet_health, sweep_health
+from .models import Tracker, TrackingEvent, TruckCommand
+from .remote import COMMAND_SENT_TIMEOUT, enqueue_commands, process_commands
+from .services import poll_positions
+from .trips import build_trips
 
-# Create your tests here.
+FIX_MS = 1_767_225_600_000  # 2026-01-01 00:00 UTC
+
+
+def record(device, updatetime, **fields):
+    return {'deviceid': device, 'callat': 6.5, 'callon': 3.4, 'speed': 0, 'updatetime': updatetime, 'voltagev': 12.6, **fields}
+
+
+class PollMixin:
+    def setUp(self):
+        User.objects.create_superuser(email='admin@example.com', username='admin', password='x')
+        owner = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.truck = Truck.objects.create(owner=owner, name='T1', state='lagos', local_government='Ikeja', tracker_id='868120')
+
+    def poll(self, *records):
+        response = {'status': 0, 'records': list(records)}
+        with mock.patch('tracker.services.get_or_refresh_token', return_value='token'), \
+                mock.patch('tracker.services._fetch_positions', return_value=response):
+            return poll_positions()
+
+
+class PositionPollTests(PollMixin, TestCase):
+    def test_fix_is_stored_once_at_the_vendor_time(self):
+        self.assertEqual(self.poll(record('868120', FIX_MS))['events'], 1)
+        self.assertEqual(self.poll(record('868120', FIX_MS))['events'], 0)
+        event = TrackingEvent.objects.get()
+        self.assertEqual(event.timestamp, datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+
+    def test_newer_fix_is_added(self):
+        self.poll(record('868120', FIX_MS))
+        self.poll(record('868120', FIX_MS + 60_000, speed=40))
+        self.assertEqual(TrackingEvent.objects.count(), 2)
+        self.assertEqual(Tracker.objects.get().speed, 40)
+
+    def test_unknown_devices_and_bad_fixes_are_skipped(self):
+        summary = self.poll(record('999', FIX_MS), record('868120', FIX_MS, callat=None), record('868120', None))
+        self.assertEqual(summary['events'], 0)
+
+    def test_polled_fixes_feed_the_speed_profile(self):
+        cache.clear()
+        fix_ms = int(timezone.now().timestamp() * 1000) - 60_000
+        self.poll(record('868120', fix_ms - 60_000))
+        self.poll(record('868120', fix_ms, speed=60))
+        profile = get_speed_profile(Tracker.objects.get().id)
+        self.assertEqual(profile['ts'], fix_ms / 1000)
+        self.assertGreater(profile['moving_speed'], 0)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        truck = Truck.objects.create(owner=owner, name='T1', state='lagos', local_government='Ikeja')
+        self.tracker = Tracker.objects.create(truck=truck)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_settings = override_settings(TRACKING_ARCHIVE_DIR=Path(directory.name))
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+    def test_telemetry_columns_survive_archiving(self):
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        for minute, (acc, park, alarm) in enumerate([(60_000, None, 0), (120_000, 0, 4), (None, 30_000, None)]):
+            TrackingEvent.objects.create(
+                tracker=self.tracker, event_type='position', speed=10, timestamp=start + timedelta(minutes=minute),
+                acc_duration=acc, park_duration=park, alarm=alarm, alarm2=1,
+            )
+        self.assertEqual(archive_day(self.tracker.id, start.date()), 3)
+        self.assertFalse(TrackingEvent.objects.exists())
+
+        fixes = read_range(self.tracker.id, start, start + timedelta(days=1),
+                           columns=('acc_duration', 'park_duration', 'alarm', 'alarm2'))
+        np.testing.assert_array_equal(fixes['acc_duration'], [60_000, 120_000, np.nan])
+        np.testing.assert_array_equal(fixes['park_duration'], [np.nan, 0, 30_000])
+        np.testing.assert_array_equal(fixes['alarm'], [0, 4, np.nan])
+        np.testing.assert_array_equal(fixes['alarm2'], [1, 1, 1])
+
+
+class TrackerHealthTests(PollMixin, TestCase):
+    def ms_ago(self, delta):
+        return int((timezone.now() - delta).timestamp() * 1000)
+
+    def test_health_follows_the_fix_time_not_the_fetch_time(self):
+        self.poll(record('868120', self.ms_ago(timedelta(hours=2))))
+        tracker = Tracker.objects.get()
+        self.assertEqual(tracker.health, 'stale')
+        self.assertEqual(fleet_health()['stale'], 1)
+
+        self.poll(record('868120', self.ms_ago(timedelta(minutes=1))))
+        tracker.refresh_from_db()
+        self.assertEqual(tracker.health, 'live')
+
+    def test_sweep_takes_quiet_trackers_offline(self):
+        self.poll(record('868120', self.ms_ago(timedelta(minutes=1))))
+        Tracker.objects.update(last_fix_at=timezone.now() - timedelta(hours=7))
+        self.assertEqual(sweep_health(), 1)
+        self.assertEqual(Tracker.objects.get().health, 'offline')
+        self.assertEqual(fleet_health()['offline'], 1)
+
+
+class TripBuildPositionTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='fleet@example.com', username='fleet', password='x')
+        truck = Truck.objects.create(owner=owner, name='T1', state='lagos', local_government='Ikeja', tracker_id='1')
+        self.tracker = Tracker.objects.create(truck=truck)
+        self.start = timezone.now() - timedelta(days=1)
+
+    def fixes(self, count, speed=0.0, offset=0):
+        TrackingEvent.objects.bulk_create([
+            TrackingEvent(
+                tracker=self.tracker, event_type='position_update', latitude=6.5 + i * 0.001 * bool(speed),
+                longitude=3.4, speed=speed, timestamp=self.start + timedelta(minutes=offset + i),
+            )
+            for i in range(count)
+        ])
+
+    def test_position_advances_without_a_trip(self):
+        self.fixes(30)
+        self.assertEqual(build_trips(self.tracker), 0)
+        self.tracker.refresh_from_db()
+        self.assertEqual(self.tracker.trips_built_until, self.start + timedelta(minutes=29))
+
+    def test_trip_still_under_way_is_read_again(self):
+        self.fixes(5)
+        self.fixes(10, speed=50.0, offset=5)
+        self.assertEqual(build_trips(self.tracker, now=self.start + timedelta(minutes=16)), 0)
+        self.tracker.refresh_from_db()
+        self.assertLessEqual(self.tracker.trips_built_until, self.start + timedelta(minutes=5))
+        self.assertEqual(build_trips(self.tracker, now=self.start + timedelta(hours=2)), 1)
+
+
+class TruckCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='ops@example.com', username='ops', password='x')
+        self.truck = Truck.objects.create(owner=self.user, name='T1', state='lagos', local_government='Ikeja', tracker_id='42')
+        self.sent = []
+
+    def process(self):
+        def send(token, tracker_id, action):
+            self.sent.append(action)
+            return {'status': 6}
+        with mock.patch('tracker.remote.get_or_refresh_token', return_value='token'), \
+                mock.patch('tracker.remote.itracksafe_client.send_command', side_effect=send):
+            return process_commands()
+
+    def command(self, action, **fields):
+        return TruckCommand.objects.create(truck=self.truck, tracker_id='42', action=action, batch='b', requested_by=self.user, **fields)
+
+    def test_stuck_command_is_not_retried_after_a_newer_one(self):
+        lock = self.command('lock', status='sent', attempts=1, sent_at=timezone.now() - COMMAND_SENT_TIMEOUT * 2)
+        enqueue_commands([self.truck], 'unlock', self.user)
+        self.process()
+        lock.refresh_from_db()
+        self.assertEqual((lock.status, lock.message), ('failed', 'Superseded by a newer command'))
+        self.assertEqual(self.sent, ['unlock'])
+
+    def test_one_command_per_truck_per_batch(self):
+        older, newer = self.command('lock'), self.command('unlock')
+        self.process()
+        self.assertEqual(self.sent, ['unlock'])
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual((older.status, newer.status), ('failed', 'confirmed'))
+
+    def test_nothing_more_is_sent_while_a_command_is_in_flight(self):
+        self.command('lock', status='sent', attempts=1, sent_at=timezone.now())
+        self.command('unlock')
+        self.process()
+        self.assertEqual(self.sent, [])
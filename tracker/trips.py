@@ -0,0 +1,220 @@
+"""
+Trip reconstruction from TrackingEvent history.
+
+Each tracker's fixes are read in time order and cut into trips wherever the
+tracker went quiet for longer than TRIP_GAP or the truck stood still for at
+least PARK_MIN. Distances are summed with a vectorized haversine over the
+whole stream, and each trip's path is simplified with Douglas-Peucker and
+stored as an encoded polyline (the Google format, 1e-5 degree precision),
+so replaying a week-long trip sends a few kilobytes rather than every fix.
+
+Builds are incremental: each run reads from Tracker.trips_built_until and
+moves it past every fix it has settled, whether or not a trip was stored,
+so long stretches of parked or drifting fixes are read once. A trip that
+may still be under way is left for a later run, which starts at its first
+fix.
+"""
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from booking.geography import EARTH_RADIUS_KM, haversine_km
+from .models import Tracker, TrackingEvent, Trip
+
+logger = logging.getLogger(__name__)
+
+TRIP_GAP = timedelta(minutes=15)  # no fix for this long ends a trip
+PARK_MIN = timedelta(minutes=5)  # standing still this long ends a trip
+MOVING_SPEED_KMH = 5.0  # slower fixes count as standing still
+MIN_TRIP_KM = 0.5  # shorter "trips" are GPS drift in a yard
+SIMPLIFY_TOLERANCE_M = 25.0
+TRIP_BUILD_MAX_EVENTS = 200_000  # fixes read per tracker per run
+
+
+def _runs(mask):
+    """(start, end) inclusive index pairs of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def segment_trips(ts, speed):
+    """
+    Split a time-ordered fix stream into trips.
+
+    `ts` is in epoch seconds and `speed` in km/h. Returns inclusive (start,
+    end) index pairs; each trip includes the fix it set off from and the fix
+    it stopped at when those are in the stream.
+    """
+    n = len(ts)
+    if n < 2:
+        return []
+    # gap_after[i]: the tracker went quiet between fix i and i + 1
+    gap_after = np.concatenate((np.diff(ts) > TRIP_GAP.total_seconds(), [True]))
+
+    # Stops long enough to end a trip; a stop is timed up to the next fix in its block
+    in_trip = speed >= MOVING_SPEED_KMH
+    next_ts = np.where(gap_after, ts, np.append(ts[1:], ts[-1]))
+    starts, ends = _runs(~in_trip)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        # A stop that spans a gap is split at it; each piece is judged on its own
+        cuts = np.flatnonzero(gap_after[start:end]) + start
+        for piece_start, piece_end in zip([start, *(cuts + 1).tolist()], [*cuts.tolist(), end]):
+            if next_ts[piece_end] - ts[piece_start] < PARK_MIN.total_seconds():
+                in_trip[piece_start:piece_end + 1] = True
+
+    trips = []
+    starts, ends = _runs(in_trip)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        # Trips never cross a gap
+        cuts = np.flatnonzero(gap_after[start:end]) + start
+        for piece_start, piece_end in zip([start, *(cuts + 1).tolist()], [*cuts.tolist(), end]):
+            if piece_start > 0 and not gap_after[piece_start - 1]:
+                piece_start -= 1
+            if piece_end < n - 1 and not gap_after[piece_end]:
+                piece_end += 1
+            if piece_end > piece_start:
+                trips.append((piece_start, piece_end))
+    return trips
+
+
+def douglas_peucker(lat, lon, tolerance_m=SIMPLIFY_TOLERANCE_M):
+    """Indices of the points kept when simplifying a path to within `tolerance_m` metres."""
+    n = len(lat)
+    if n < 3:
+        return np.arange(n)
+    # Local equirectangular projection in metres; accurate to well under the tolerance at trip scale
+    scale = EARTH_RADIUS_KM * 1000 * np.pi / 180
+    x = lon * scale * np.cos(np.radians(lat.mean()))
+    y = lat * scale
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distance = np.hypot(px, py)
+        else:
+            distance = np.abs(dx * py - dy * px) / length
+        worst = int(np.argmax(distance))
+        if distance[worst] > tolerance_m:
+            split = first + 1 + worst
+            keep[split] = True
+            stack += [(first, split), (split, last)]
+    return np.flatnonzero(keep)
+
+
+def encode_polyline(lat, lon):
+    """Encode coordinates in the Google polyline format."""
+    points = np.round(np.column_stack((lat, lon)) * 1e5).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    chunks = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def decode_polyline(polyline):
+    """[(lat, lon), ...] from a Google encoded polyline."""
+    values, value, shift = [], 0, 0
+    for char in polyline:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 1e5
+    return [tuple(point) for point in coords.tolist()]
+
+
+def _load_events(tracker, since):
+    events = TrackingEvent.objects.filter(
+        tracker=tracker, latitude__isnull=False, longitude__isnull=False,
+    )
+    if since is not None:
+        events = events.filter(timestamp__gte=since)
+    rows = list(
+        events.order_by('timestamp')
+        .values_list('timestamp', 'latitude', 'longitude', 'speed')[:TRIP_BUILD_MAX_EVENTS]
+    )
+    if not rows:
+        return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0), False
+    timestamps, lat, lon, speed = zip(*rows)
+    ts = np.array([timestamp.timestamp() for timestamp in timestamps])
+    return ts, np.array(lat), np.array(lon), np.array(speed, dtype=float), len(rows) == TRIP_BUILD_MAX_EVENTS
+
+
+def _advance(tracker, ts):
+    position = datetime.fromtimestamp(ts, timezone.get_current_timezone())
+    # update() rather than save(): Tracker.last_updated is auto_now
+    Tracker.objects.filter(pk=tracker.pk).update(trips_built_until=position)
+    tracker.trips_built_until = position
+
+
+def build_trips(tracker, now=None):
+    """Store the trips completed since the tracker's read position and advance it. Returns how many were added."""
+    now = now or timezone.now()
+    since = tracker.trips_built_until
+    if since is None:
+        # Trackers built before the read position was kept resume after their last trip
+        last_trip = tracker.trips.order_by('-ended_at').first()
+        since = last_trip.ended_at if last_trip else None
+    ts, lat, lon, speed, truncated = _load_events(tracker, since)
+    if len(ts) < 2:
+        return 0
+
+    # Cumulative distance, so each trip's distance is a subtraction
+    step_km = haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    step_km[np.diff(ts) > TRIP_GAP.total_seconds()] = 0  # no distance is claimed across a gap
+    travelled = np.concatenate(([0.0], np.cumsum(step_km)))
+
+    trips = []
+    # Next run starts at the last fix read (a trip may set off from it), or at an unfinished trip
+    resume_at = ts[-1]
+    for start, end in segment_trips(ts, speed):
+        # The last trip may still be under way if nothing follows it yet
+        if end == len(ts) - 1 and (truncated or now.timestamp() - ts[end] < TRIP_GAP.total_seconds()):
+            resume_at = ts[start]
+            continue
+        distance_km = travelled[end] - travelled[start]
+        if distance_km < MIN_TRIP_KM:
+            continue
+        kept = douglas_peucker(lat[start:end + 1], lon[start:end + 1]) + start
+        duration_s = ts[end] - ts[start]
+        trips.append(Trip(
+            tracker=tracker,
+            started_at=datetime.fromtimestamp(ts[start], timezone.get_current_timezone()),
+            ended_at=datetime.fromtimestamp(ts[end], timezone.get_current_timezone()),
+            start_latitude=lat[start], start_longitude=lon[start],
+            end_latitude=lat[end], end_longitude=lon[end],
+            distance_km=round(float(distance_km), 2),
+            max_speed=float(speed[start:end + 1].max()),
+            avg_speed=round(float(distance_km / duration_s * 3600), 1) if duration_s else 0.0,
+            point_count=end - start + 1,
+            polyline=encode_polyline(lat[kept], lon[kept]),
+        ))
+    with transaction.atomic():
+        Trip.objects.bulk_create(trips, ignore_conflicts=True)
+        _advance(tracker, resume_at)
+    return len(trips)
+
+
+def build_all_trips():
+    """Build trips for every tracker. Returns {'trackers': n, 'trips': n}."""
+    summary = {'trackers': 0, 'trips': 0}
+    for tracker in Tracker.objects.all().iterator():
+        summary['trackers'] += 1
+        summary['trips'] += build_trips(tracker)
+    logger.info(f"Built {summary['trips']} trips for {summary['trackers']} trackers")
+    return summary
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import TrackingDashboardView, FetchTrackingDataView, AssignTrackerView, RemoteControlView, GeofenceView
+from .views import TrackingDashboardView, FetchTrackingDataView, AssignTrackerView, RemoteControlView, RemoteCommandProgressView, GeofenceView, TruckTripsView
 
 urlpatterns = [
     path('tracking/<int:truck_id>/', TrackingDashboardView.as_view(), name='tracking_dashboard'),
     path('fetch-tracking-data/<int:truck_id>/', FetchTrackingDataView.as_view(), name='fetch_tracking_data'),
     path('assign-tracker/', AssignTrackerView.as_view(), name='assign-tracker'),
     path('remote-control/', RemoteControlView.as_view(), name='remote-control'),
+    path('remote-control/batches/<str:batch>/', RemoteCommandProgressView.as_view(), name='remote-command-progress'),
     path('geofence/', GeofenceView.as_view(), name='geofence'),
+    path('trips/<int:truck_id>/', TruckTripsView.as_view(), name='truck_trips'),
+    path('trips/<int:truck_id>/<int:trip_id>/', TruckTripsView.as_view(), name='trip_replay'),
 ]
@@ -6,8 +6,9 @@ from django.utils.decorators import method_decorator
 from django.http import JsonResponse, HttpResponseForbidden, HttpResponseServerError
 from django.contrib import messages
 from booking.models import Truck
-from .models import Geofence
-from .services import get_tracker_data, send_truck_command
+from .models import Geofence, Trip
+from .services import get_tracker_data
+from .trips import decode_polyline
 import logging
 
 logger = logging.getLogger(__name__)
@@ -105,6 +106,46 @@ class FetchTrackingDataView(View):
         return False
         
 
+def _trip_summary(trip):
+    return {
+        "id": trip.id,
+        "started_at": trip.started_at,
+        "ended_at": trip.ended_at,
+        "duration_minutes": round(trip.duration.total_seconds() / 60),
+        "distance_km": trip.distance_km,
+        "avg_speed": trip.avg_speed,
+        "max_speed": trip.max_speed,
+        "start": [trip.start_latitude, trip.start_longitude],
+        "end": [trip.end_latitude, trip.end_longitude],
+    }
+
+
+@method_decorator(login_required, name='dispatch')
+class TruckTripsView(FetchTrackingDataView):
+    """
+    Trips of a truck, newest first, as JSON. With a trip id, that trip's
+    simplified path for map replay: an encoded polyline, or decoded points
+    with ?format=points.
+    """
+    def get(self, request, truck_id, trip_id=None):
+        truck = get_object_or_404(Truck, id=truck_id)
+        if not self._check_access(request.user, truck):
+            return JsonResponse({"error": "Unauthorized access"}, status=403)
+        trips = Trip.objects.filter(tracker__truck=truck)
+
+        if trip_id is None:
+            trips = trips.defer('polyline')[:50]
+            return JsonResponse({"truck": truck.id, "trips": [_trip_summary(trip) for trip in trips]})
+
+        trip = get_object_or_404(trips, id=trip_id)
+        data = {**_trip_summary(trip), "point_count": trip.point_count}
+        if request.GET.get("format") == "points":
+            data["points"] = decode_polyline(trip.polyline)
+        else:
+            data["polyline"] = trip.polyline
+        return JsonResponse(data)
+
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views import View
 from django.utils.decorators import method_decorator
@@ -159,34 +200,68 @@ from django.utils.decorators import method_decorator
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views import View
 from django.contrib import messages
-from .services import send_truck_command
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
 from booking.models import Truck
+from .models import TruckCommand
+from .remote import batch_progress, enqueue_commands
 
 
 @method_decorator(staff_member_required, name='dispatch')
 class RemoteControlView(View):
     """
-    Admin-only view to lock/unlock a truck.
+    Admin-only view to lock/unlock trucks. Commands are queued for the
+    tracker.remote worker; the page follows a batch's progress live.
     """
     template_name = "tracker/remote_control.html"
 
     def get(self, request):
-        trucks = Truck.objects.exclude(tracker_id=None)
-        return render(request, self.template_name, {"trucks": trucks})
+        trucks = Truck.objects.exclude(tracker_id=None).select_related('owner').annotate(
+            last_command=Subquery(
+                TruckCommand.objects.filter(truck=OuterRef('pk')).order_by('-id').values('status')[:1]
+            ),
+        ).order_by('name')
+        owner = request.GET.get("owner", "").strip()
+        state = request.GET.get("state", "")
+        if owner:
+            trucks = trucks.filter(owner__username__icontains=owner)
+        if state:
+            trucks = trucks.filter(state=state)
+        return render(request, self.template_name, {
+            "trucks": trucks,
+            "owner": owner,
+            "state": state,
+            "states": Truck._meta.get_field('state').choices,
+            "batch": request.GET.get("batch"),
+        })
 
     def post(self, request):
-        truck_id = request.POST.get("truck_id")
         action = request.POST.get("action")  # lock or unlock
+        if action not in dict(TruckCommand.ACTION_CHOICES):
+            messages.error(request, "Invalid action")
+            return redirect("remote-control")
 
-        truck = get_object_or_404(Truck, id=truck_id, tracker_id__isnull=False)
-        result = send_truck_command(truck.tracker_id, action)
+        truck_ids = request.POST.getlist("truck_ids") or [request.POST.get("truck_id")]
+        trucks = Truck.objects.filter(id__in=[pk for pk in truck_ids if pk and pk.isdigit()], tracker_id__isnull=False)
+        batch, queued = enqueue_commands(trucks, action, request.user)
+        if not queued:
+            messages.error(request, "Select at least one truck with a tracker.")
+            return redirect("remote-control")
 
-        if "error" in result:
-            messages.error(request, f"Failed to {action} truck: {result['error']}")
-        else:
-            messages.success(request, f"Truck {action} successful!")
+        messages.success(request, f"Queued {action} for {queued} truck{'s' if queued != 1 else ''}.")
+        return redirect(f"{reverse('remote-control')}?batch={batch}")
 
-        return redirect("remote-control")
+
+@method_decorator(staff_member_required, name='dispatch')
+class RemoteCommandProgressView(View):
+    """
+    AJAX endpoint with the status of every command in a batch
+    """
+    def get(self, request, batch):
+        progress = batch_progress(batch)
+        if not progress['total']:
+            return JsonResponse({"error": "Batch not found"}, status=404)
+        return JsonResponse(progress)
 
 
 @method_decorator(staff_member_required, name='dispatch')
@@ -1,22 +1,76 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from .credentials import digest, clear_attempts, client_ip, is_rate_limited, record_attempt
 
 import logging
 logger = logging.getLogger(__name__)
 
+# (limit, window seconds) of failed logins before attempts are refused without hashing
+LOGIN_FAILURE_LIMIT_PER_EMAIL = (5, 15 * 60)
+LOGIN_FAILURE_LIMIT_PER_IP = (50, 15 * 60)
+
+
+def user_cache_key(email):
+    return f'auth:user:{digest(email.strip().lower())}'
+
+
 class EmailBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    """
+    Authenticate by email, case-insensitively.
+
+    Repeated failures for an email or client IP are refused before the
+    password hasher runs. With AUTH_USER_CACHE_TIMEOUT set, the email is
+    resolved to (id, is_active) from the cache (invalidated by users.signals
+    on every save), so inactive accounts skip the query and active ones are
+    loaded by primary key. Password hashes never go into the cache.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(email=username)
-            logger.info(f'User found: {user}')
-        except UserModel.DoesNotExist:
-            logger.error('User does not exist')
+        email = (email or username or kwargs.get(UserModel.USERNAME_FIELD) or '').strip()
+        if not email or password is None:
             return None
-        else:
-            if user.check_password(password):
-                logger.info('Password is correct')
-                return user
-            else:
-                logger.error('Password is incorrect')
+
+        ip = client_ip(request) if request is not None else None
+        if (
+            is_rate_limited('login:email', email.lower(), *LOGIN_FAILURE_LIMIT_PER_EMAIL)
+            or is_rate_limited('login:ip', ip, *LOGIN_FAILURE_LIMIT_PER_IP)
+        ):
+            logger.debug('Login throttled for %s', email)
+            # Stops authenticate() from trying the remaining backends
+            raise PermissionDenied
+
+        user = self._get_user(UserModel, email)
+        if user is None:
+            # Run the hasher anyway so a missing account takes as long as a wrong password
+            UserModel().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            clear_attempts('login:email', email.lower(), LOGIN_FAILURE_LIMIT_PER_EMAIL[1])
+            return user
+
+        record_attempt('login:email', email.lower(), LOGIN_FAILURE_LIMIT_PER_EMAIL[1])
+        record_attempt('login:ip', ip, LOGIN_FAILURE_LIMIT_PER_IP[1])
         return None
+
+    def _get_user(self, UserModel, email):
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+        key = user_cache_key(email)
+        cached = cache.get(key) if timeout else None
+        if cached is not None:
+            user_id, is_active = cached
+            if not is_active:
+                return None
+            return UserModel.objects.filter(pk=user_id).first()
+
+        try:
+            # Served by the UPPER(email) index
+            user = UserModel.objects.get(email__iexact=email)
+        except (UserModel.DoesNotExist, UserModel.MultipleObjectsReturned):
+            return None
+
+        if timeout:
+            cache.set(key, (user.pk, user.is_active), timeout)
+        return user
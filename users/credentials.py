@@ -0,0 +1,169 @@
+"""
+Short-lived auth credentials kept in the shared cache.
+
+OTPs and password-reset tokens live only as long as they are valid: the
+cache expires them, so there are no rows to write on every signup or to
+clean up later. Only keyed hashes are stored, never the codes themselves.
+
+The sliding-window limits on sending codes stop one email address or one
+client from using the OTP and reset forms to spam inboxes through SendGrid.
+"""
+import secrets
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+from .utils import generate_random_otp
+
+OTP_TTL = 10 * 60  # seconds
+OTP_MAX_ATTEMPTS = 5  # wrong guesses before the code is burned
+RESET_TOKEN_TTL = 60 * 60
+
+# (limit, window seconds) per identifier
+SEND_LIMIT_PER_EMAIL = (3, 10 * 60)
+SEND_LIMIT_PER_IP = (10, 60 * 60)
+
+
+def digest(value):
+    return salted_hmac('users.credentials', value, algorithm='sha256').hexdigest()
+
+
+def _otp_key(purpose, email):
+    return f'auth:otp:{purpose}:{digest(email.strip().lower())}'
+
+
+def client_ip(request):
+    """
+    The client's address as seen by the first of TRUSTED_PROXY_COUNT proxies.
+    Only entries those proxies appended to X-Forwarded-For are trusted; the
+    client can write anything to the left of them.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+# RATE LIMITS
+
+def _window_count(key, window, now):
+    """
+    Sliding-window estimate from two fixed windows: all of the current
+    window's hits plus the part of the previous window still in range.
+    """
+    current = int(now // window)
+    elapsed = (now % window) / window
+    counts = cache.get_many([f'{key}:{current}', f'{key}:{current - 1}'])
+    return counts.get(f'{key}:{current}', 0) + counts.get(f'{key}:{current - 1}', 0) * (1 - elapsed)
+
+
+def _rate_key(action, identifier):
+    return f'auth:rl:{action}:{digest(str(identifier).lower())}'
+
+
+def is_rate_limited(action, identifier, limit, window):
+    """True if `identifier` already has `limit` attempts at `action` in the last `window` seconds."""
+    if not identifier:
+        return False
+    return _window_count(_rate_key(action, identifier), window, time.time()) >= limit
+
+
+def record_attempt(action, identifier, window):
+    if not identifier:
+        return
+    key = f'{_rate_key(action, identifier)}:{int(time.time() // window)}'
+    # Kept for two windows so the next window can still weigh it
+    if not cache.add(key, 1, timeout=window * 2):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=window * 2)
+
+
+def clear_attempts(action, identifier, window):
+    current = int(time.time() // window)
+    key = _rate_key(action, identifier)
+    cache.delete_many([f'{key}:{current}', f'{key}:{current - 1}'])
+
+
+def allow_code_send(action, email, ip):
+    """
+    Per-email and per-IP limits on anything that emails the user a code.
+
+    Both limits are checked before either is recorded, so a refused send
+    never counts against the other identifier.
+    """
+    email = (email or '').strip().lower()
+    limits = [
+        (f'{action}:email', email, SEND_LIMIT_PER_EMAIL),
+        (f'{action}:ip', ip, SEND_LIMIT_PER_IP),
+    ]
+    if any(is_rate_limited(key, identifier, *limit) for key, identifier, limit in limits):
+        return False
+    for key, identifier, (_, window) in limits:
+        record_attempt(key, identifier, window)
+    return True
+
+
+# OTP
+
+def issue_otp(email, purpose='verify'):
+    """Create a fresh OTP for this email, replacing any earlier one. Returns the code to send."""
+    otp = generate_random_otp()
+    cache.set(
+        _otp_key(purpose, email),
+        {'hash': digest(otp), 'attempts': 0, 'expires': time.time() + OTP_TTL},
+        timeout=OTP_TTL,
+    )
+    return otp
+
+
+def verify_otp(email, otp, purpose='verify'):
+    """
+    Check an OTP. A correct code is consumed; after OTP_MAX_ATTEMPTS wrong
+    guesses the code is discarded and a new one must be requested.
+    """
+    key = _otp_key(purpose, email)
+    stored = cache.get(key)
+    if not stored:
+        return False
+
+    if constant_time_compare(stored['hash'], digest(otp or '')):
+        cache.delete(key)
+        return True
+
+    stored['attempts'] += 1
+    if stored['attempts'] >= OTP_MAX_ATTEMPTS:
+        cache.delete(key)
+    else:
+        # Keep the original expiry; a wrong guess must not extend the code's life
+        cache.set(key, stored, timeout=max(1, int(stored['expires'] - time.time())))
+    return False
+
+
+# PASSWORD RESET
+
+def issue_reset_token(user_id):
+    """Create a single-use reset token for a user, revoking the previous one."""
+    token = secrets.token_urlsafe(24)
+    user_key = f'auth:reset:user:{user_id}'
+    previous = cache.get(user_key)
+    if previous:
+        cache.delete(f'auth:reset:{previous}')
+
+    token_hash = digest(token)
+    cache.set_many({f'auth:reset:{token_hash}': user_id, user_key: token_hash}, timeout=RESET_TOKEN_TTL)
+    return token
+
+
+def consume_reset_token(token):
+    """Return the user id a reset token belongs to and invalidate it, or None if it is unknown or expired."""
+    key = f'auth:reset:{digest(token or "")}'
+    user_id = cache.get(key)
+    # Only the caller whose delete succeeds may use the token
+    if user_id is None or not cache.delete(key):
+        return None
+    cache.delete(f'auth:reset:user:{user_id}')
+    return user_id
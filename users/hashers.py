@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count from PASSWORD_HASH_ITERATIONS,
+    which can raise Django's default count but never lower it.
+
+    Same algorithm name as Django's hasher, so existing hashes still verify;
+    any hash stored with a different count is re-encoded on the user's next
+    successful login (Django calls must_update() from check_password()).
+    """
+
+    @property
+    def iterations(self):
+        return max(getattr(settings, 'PASSWORD_HASH_ITERATIONS', 0), PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,152 @@
+"""
+Credits ledger.
+
+Every change to User.credits is written as an append-only CreditEntry and
+applied to the balance with a single UPDATE ... SET credits = credits + x,
+so concurrent bonuses and withdrawals never overwrite each other. Entries
+that carry a reference are idempotent: replaying the same event is a no-op.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from .models import User, Referral, ReferralBonus, CreditEntry, CreditBalanceSnapshot
+
+REFERRAL_SIGNUP_BONUS = Decimal('1000.00')
+REFERRAL_BOOKING_RATE = Decimal('0.015')  # 1.5% of the delivery cost
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+class InsufficientCredits(Exception):
+    pass
+
+
+def _to_amount(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def credit(user_id, amount, entry_type, reference=''):
+    """
+    Add `amount` to a user's balance and record it.
+
+    Returns the new CreditEntry, or None when an entry with the same
+    entry_type and reference already exists.
+    """
+    amount = _to_amount(amount)
+    try:
+        with transaction.atomic():
+            entry = CreditEntry.objects.create(user_id=user_id, amount=amount, entry_type=entry_type, reference=reference)
+            User.objects.filter(pk=user_id).update(credits=F('credits') + amount)
+    except IntegrityError:
+        if not reference:
+            raise
+        return None
+    return entry
+
+
+def debit(user_id, amount, entry_type, reference=''):
+    """
+    Take `amount` from a user's balance and record it.
+
+    The balance check and the deduction are one conditional UPDATE, so two
+    concurrent withdrawals can never overdraw the account.
+    """
+    amount = _to_amount(amount)
+    with transaction.atomic():
+        updated = User.objects.filter(pk=user_id, credits__gte=amount).update(credits=F('credits') - amount)
+        if not updated:
+            raise InsufficientCredits("Insufficient balance")
+        return CreditEntry.objects.create(user_id=user_id, amount=-amount, entry_type=entry_type, reference=reference)
+
+
+def award_signup_referral_bonus(referrer_id, referred_user_id):
+    return credit(
+        referrer_id, REFERRAL_SIGNUP_BONUS, CreditEntry.REFERRAL_SIGNUP, reference=f'user:{referred_user_id}'
+    )
+
+
+def award_booking_referral_bonus(booking):
+    """
+    Credit the client's referrer with 1.5% of the booking's delivery cost.
+
+    Called when the booking's payment is settled. Keyed on the booking, so
+    the bonus is paid once however many times settlement runs. Returns the
+    bonus amount, or None if nothing was awarded.
+    """
+    if not booking.delivery_cost or booking.delivery_cost <= 0:
+        return None
+
+    referrer_id = Referral.objects.filter(referred_user_id=booking.client_id).values_list('referrer_id', flat=True).first()
+    if referrer_id is None:
+        return None
+
+    delivery_cost = _to_amount(booking.delivery_cost)
+    bonus_amount = _to_amount(delivery_cost * REFERRAL_BOOKING_RATE)
+    with transaction.atomic():
+        entry = credit(referrer_id, bonus_amount, CreditEntry.REFERRAL_BOOKING, reference=f'booking:{booking.pk}')
+        if entry is None:
+            return None
+        ReferralBonus.objects.create(referrer_id=referrer_id, booking_cost=delivery_cost, bonus_amount=bonus_amount)
+    return bonus_amount
+
+
+def credit_history(user_id, limit=50, before_id=None):
+    """Newest-first entries for a user, keyset-paginated on the (user, -id) index."""
+    entries = CreditEntry.objects.filter(user_id=user_id)
+    if before_id is not None:
+        entries = entries.filter(id__lt=before_id)
+    return list(entries.order_by('-id')[:limit])
+
+
+def ledger_balance(user_id):
+    """Balance derived from the ledger: latest snapshot plus the entries not yet in one."""
+    snapshot = CreditBalanceSnapshot.objects.filter(user_id=user_id).order_by('-id').first()
+    entries = CreditEntry.objects.filter(user_id=user_id, in_snapshot=False)
+    balance = snapshot.balance if snapshot else Decimal('0.00')
+    return balance + (entries.aggregate(total=Sum('amount'))['total'] or Decimal('0.00'))
+
+
+def take_balance_snapshots(batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Snapshot the balance of every user with entries not yet in a snapshot.
+
+    Work is bounded by the number of new entries, not the number of users:
+    unsnapshotted entries are claimed in id order, added per user to each
+    user's previous snapshot and flagged in_snapshot in one transaction.
+    An entry whose transaction commits after higher ids were snapshotted is
+    still unflagged, so the next run picks it up. Returns the number of
+    snapshots written.
+    """
+    written = 0
+    while True:
+        with transaction.atomic():
+            # Plain FOR UPDATE, not SKIP LOCKED: a concurrent run must not build on a snapshot it cannot see yet
+            entries = list(
+                CreditEntry.objects.select_for_update().filter(in_snapshot=False)
+                .order_by('id').values_list('id', 'user_id', 'amount')[:batch_size]
+            )
+            if not entries:
+                break
+
+            deltas, last_entry_ids = {}, {}
+            for entry_id, user_id, amount in entries:
+                deltas[user_id] = deltas.get(user_id, Decimal('0.00')) + amount
+                last_entry_ids[user_id] = entry_id
+
+            latest_ids = (
+                CreditBalanceSnapshot.objects.filter(user_id__in=list(deltas))
+                .values('user_id').annotate(latest=Max('id')).values_list('latest', flat=True)
+            )
+            previous = dict(CreditBalanceSnapshot.objects.filter(id__in=list(latest_ids)).values_list('user_id', 'balance'))
+
+            CreditBalanceSnapshot.objects.bulk_create([
+                CreditBalanceSnapshot(
+                    user_id=user_id,
+                    balance=previous.get(user_id, Decimal('0.00')) + delta,
+                    last_entry_id=last_entry_ids[user_id],
+                )
+                for user_id, delta in deltas.items()
+            ])
+            CreditEntry.objects.filter(id__in=[entry[0] for entry in entries]).update(in_snapshot=True)
+        written += len(deltas)
+
+    return written
@@ -0,0 +1,58 @@
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from users.backends import LOGIN_FAILURE_LIMIT_PER_EMAIL, LOGIN_FAILURE_LIMIT_PER_IP, user_cache_key
+from users.credentials import clear_attempts
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measure authenticate() throughput for one worker. Uses a throwaway user that is rolled back afterwards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Logins per scenario.')
+        parser.add_argument('--cache-timeout', type=int, default=60, help='AUTH_USER_CACHE_TIMEOUT for the cached scenario.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        email = f'bench-{uuid.uuid4().hex[:8]}@example.com'
+        password = uuid.uuid4().hex
+
+        self.stdout.write(f"PASSWORD_HASH_ITERATIONS={getattr(settings, 'PASSWORD_HASH_ITERATIONS', 'default')}")
+        with transaction.atomic():
+            user = User.objects.create_user(email=email, username=email, password=password, is_verified=True)
+
+            def run(label, login_email, login_password, ip, cache_timeout=0):
+                request = factory.post('/accounts/login/', REMOTE_ADDR=ip)
+                with override_settings(AUTH_USER_CACHE_TIMEOUT=cache_timeout):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        for _ in range(iterations):
+                            authenticate(request, email=login_email, password=login_password)
+                        elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<28} {iterations / elapsed:8.1f} logins/s  "
+                    f"{elapsed / iterations * 1000:7.1f} ms/login  {len(queries) / iterations:4.1f} queries/login"
+                )
+
+            run('valid password', email, password, '10.0.0.1')
+            run('valid password, cached', email.upper(), password, '10.0.0.2', options['cache_timeout'])
+            run('unknown account', f'missing-{email}', password, '10.0.0.3')
+            # The first few failures are hashed; the rest are refused by the throttle
+            run('wrong password (throttled)', email, 'wrong', '10.0.0.4')
+            self.stdout.write(f"(throttle engages after {LOGIN_FAILURE_LIMIT_PER_EMAIL[0]} failures per email)")
+
+            transaction.set_rollback(True)
+
+        # Leave no throttle counters or cached rows behind for the throwaway account
+        cache.delete(user_cache_key(email))
+        clear_attempts('login:email', email.lower(), LOGIN_FAILURE_LIMIT_PER_EMAIL[1])
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4'):
+            clear_attempts('login:ip', ip, LOGIN_FAILURE_LIMIT_PER_IP[1])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from users.referral_graph import rebuild_referral_graph
+
+
+class Command(BaseCommand):
+    help = 'Recompute the referral closure table and per-referrer totals from Referral and ReferralBonus.'
+
+    def handle(self, *args, **options):
+        referrers = rebuild_referral_graph()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt referral graph for {referrers} referrer(s).'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from users.ledger import SNAPSHOT_BATCH_SIZE, take_balance_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Snapshot the credit balance of every user with ledger entries not yet in a snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SNAPSHOT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = take_balance_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} balance snapshot(s).'))
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def record_opening_balances(apps, schema_editor):
+    """Give every existing non-zero balance an entry so the ledger sums to User.credits."""
+    User = apps.get_model('users', 'User')
+    CreditEntry = apps.get_model('users', 'CreditEntry')
+    balances = User.objects.exclude(credits=0).values_list('id', 'credits')
+    CreditEntry.objects.bulk_create(
+        [
+            CreditEntry(user_id=user_id, amount=credits, entry_type='opening_balance', reference=f'user:{user_id}')
+            for user_id, credits in balances.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_credit_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_email_upper_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferrerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='referrer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('direct_referrals', models.PositiveIntegerField(default=0)),
+                ('total_downline', models.PositiveIntegerField(default=0)),
+                ('bonus_count', models.PositiveIntegerField(default=0)),
+                ('bonus_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-bonus_total'], name='referrer_bonus_rank_idx'), models.Index(fields=['-total_downline'], name='referrer_reach_rank_idx'), models.Index(fields=['-direct_referrals'], name='referrer_direct_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferralPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='downline_paths', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upline_paths', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'depth', 'descendant'], name='referral_downline_idx'), models.Index(fields=['descendant', 'depth'], name='referral_upline_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_referral_path')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def build_graph(apps, schema_editor):
+    from users.referral_graph import build_referral_graph
+
+    build_referral_graph(
+        apps.get_model('users', 'Referral'),
+        apps.get_model('users', 'ReferralBonus'),
+        apps.get_model('users', 'ReferralPath'),
+        apps.get_model('users', 'ReferrerStats'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_referral_graph'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_graph, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:33
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def flag_snapshotted_entries(apps, schema_editor):
+    # Existing snapshots cover every entry up to the newest last_entry_id
+    CreditBalanceSnapshot = apps.get_model('users', 'CreditBalanceSnapshot')
+    CreditEntry = apps.get_model('users', 'CreditEntry')
+    covered = CreditBalanceSnapshot.objects.aggregate(last=Max('last_entry_id'))['last']
+    if covered is not None:
+        CreditEntry.objects.filter(id__lte=covered).update(in_snapshot=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_build_referral_graph'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditentry',
+            name='in_snapshot',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='creditentry',
+            index=models.Index(condition=models.Q(('in_snapshot', False)), fields=['id'], name='credit_entry_unsnapshotted_idx'),
+        ),
+        migrations.RunPython(flag_snapshotted_entries, migrations.RunPython.noop),
+    ]
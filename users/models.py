@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
 from .managers import CustomUserManager
 from django.utils import timezone
 from datetime import timedelta
@@ -25,6 +26,13 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # Case-insensitive login lookups (email__iexact)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -52,6 +60,109 @@ class ReferralBonus(models.Model):
     def __str__(self):
         return f"Bonus for {self.referrer.email}: {self.bonus_amount}"
 
+class ReferralPath(models.Model):
+    """
+    Closure table over Referral: one row per (ancestor, descendant) pair at any depth.
+    depth 1 is a direct referral, depth 2 a referral of a referral, and so on.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='downline_paths')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upline_paths')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_referral_path'),
+        ]
+        indexes = [
+            # Downline of a user, nearest levels first
+            models.Index(fields=['ancestor', 'depth', 'descendant'], name='referral_downline_idx'),
+            models.Index(fields=['descendant', 'depth'], name='referral_upline_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} (depth {self.depth})"
+
+
+class ReferrerStats(models.Model):
+    """Per-referrer totals, kept current by users.referral_graph as referrals and bonuses are recorded."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='referrer_stats')
+    direct_referrals = models.PositiveIntegerField(default=0)
+    total_downline = models.PositiveIntegerField(default=0)  # everyone below the user, at any depth
+    bonus_count = models.PositiveIntegerField(default=0)
+    bonus_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-bonus_total'], name='referrer_bonus_rank_idx'),
+            models.Index(fields=['-total_downline'], name='referrer_reach_rank_idx'),
+            models.Index(fields=['-direct_referrals'], name='referrer_direct_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.direct_referrals} direct, {self.total_downline} total, {self.bonus_total} earned"
+
+
+class CreditEntry(models.Model):
+    """Append-only record of every change to User.credits (positive credits, negative debits)."""
+    REFERRAL_SIGNUP = 'referral_signup'
+    REFERRAL_BOOKING = 'referral_booking'
+    WITHDRAWAL = 'withdrawal'
+    WITHDRAWAL_REVERSAL = 'withdrawal_reversal'
+    OPENING_BALANCE = 'opening_balance'
+    ADJUSTMENT = 'adjustment'
+
+    ENTRY_TYPE_CHOICES = [
+        (REFERRAL_SIGNUP, 'Referral Sign-up Bonus'),
+        (REFERRAL_BOOKING, 'Referral Booking Bonus'),
+        (WITHDRAWAL, 'Withdrawal'),
+        (WITHDRAWAL_REVERSAL, 'Withdrawal Reversal'),
+        (OPENING_BALANCE, 'Opening Balance'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='credit_entries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    reference = models.CharField(max_length=100, blank=True)  # e.g. "booking:42"; makes the entry idempotent
+    created_at = models.DateTimeField(auto_now_add=True)
+    in_snapshot = models.BooleanField(default=False)  # Set by ledger.take_balance_snapshots()
+
+    class Meta:
+        constraints = [
+            # A referenced event (booking bonus, withdrawal, ...) can only ever be booked once
+            models.UniqueConstraint(
+                fields=['entry_type', 'reference'],
+                condition=~models.Q(reference=''),
+                name='unique_credit_entry_reference',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='credit_entry_history_idx'),
+            # Serves the snapshot sweep, which only reads entries not yet in a snapshot
+            models.Index(fields=['id'], condition=models.Q(in_snapshot=False), name='credit_entry_unsnapshotted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for {self.user.email}"
+
+
+class CreditBalanceSnapshot(models.Model):
+    """Ledger balance of a user over every entry flagged in_snapshot; `last_entry_id` is the newest one it added."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='credit_snapshots')
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_entry_id = models.BigIntegerField()
+    taken_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-last_entry_id'], name='credit_snapshot_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email}: {self.balance} @ entry {self.last_entry_id}"
+
+
 class OTP(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     otp = models.CharField(max_length=6)
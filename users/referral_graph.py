@@ -0,0 +1,159 @@
+"""
+Referral graph read model.
+
+Referral stores only direct referrer -> referred pairs. ReferralPath
+materializes every (ancestor, descendant) pair with its depth, and
+ReferrerStats keeps running totals per referrer, so a user's downline, their
+reach per level and the leaderboards are each one indexed query.
+
+Both tables are maintained incrementally from users.signals when a Referral
+or ReferralBonus is created; rebuild_referral_graph() recomputes them from
+scratch (after deletions or a bulk import).
+"""
+import logging
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from .models import Referral, ReferralBonus, ReferralPath, ReferrerStats
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_METRICS = ('bonus_total', 'total_downline', 'direct_referrals')
+REBUILD_BATCH_SIZE = 5000
+MAX_DEPTH = 100  # guards the rebuild against a referral cycle in bad data
+
+
+def _ensure_stats(user_ids):
+    ReferrerStats.objects.bulk_create([ReferrerStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+
+
+def record_referral(referrer_id, referred_user_id):
+    """
+    Add the paths created by a new referral: every ancestor of the referrer
+    (and the referrer) now reaches the referred user and everyone below them.
+    """
+    if referrer_id == referred_user_id or ReferralPath.objects.filter(
+        ancestor_id=referred_user_id, descendant_id=referrer_id
+    ).exists():
+        logger.warning(f"Ignoring referral {referrer_id} -> {referred_user_id}: it would create a cycle")
+        return 0
+
+    uplines = [(referrer_id, 0)] + list(
+        ReferralPath.objects.filter(descendant_id=referrer_id).values_list('ancestor_id', 'depth')
+    )
+    downlines = [(referred_user_id, 0)] + list(
+        ReferralPath.objects.filter(ancestor_id=referred_user_id).values_list('descendant_id', 'depth')
+    )
+    ancestor_ids = [ancestor_id for ancestor_id, _ in uplines]
+
+    with transaction.atomic():
+        ReferralPath.objects.bulk_create(
+            [
+                ReferralPath(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+                for ancestor_id, up in uplines
+                for descendant_id, down in downlines
+            ],
+            batch_size=REBUILD_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        _ensure_stats(ancestor_ids)
+        ReferrerStats.objects.filter(user_id__in=ancestor_ids).update(total_downline=F('total_downline') + len(downlines))
+        ReferrerStats.objects.filter(user_id=referrer_id).update(direct_referrals=F('direct_referrals') + 1)
+    return len(uplines) * len(downlines)
+
+
+def record_bonus(referrer_id, bonus_amount):
+    with transaction.atomic():
+        _ensure_stats([referrer_id])
+        ReferrerStats.objects.filter(user_id=referrer_id).update(
+            bonus_count=F('bonus_count') + 1,
+            bonus_total=F('bonus_total') + bonus_amount,
+        )
+
+
+def downline(user_id, max_depth=None, limit=None):
+    """Everyone below a user, nearest levels first, with the referred users loaded."""
+    paths = ReferralPath.objects.filter(ancestor_id=user_id).select_related('descendant')
+    if max_depth is not None:
+        paths = paths.filter(depth__lte=max_depth)
+    paths = paths.order_by('depth', 'descendant_id')
+    return list(paths[:limit] if limit else paths)
+
+
+def downline_levels(user_id):
+    """[(depth, number of users at that depth), ...] for a user's downline."""
+    return list(
+        ReferralPath.objects.filter(ancestor_id=user_id)
+        .values_list('depth').annotate(users=Count('id')).order_by('depth')
+    )
+
+
+def upline(user_id):
+    """The chain of referrers above a user, nearest first."""
+    return list(ReferralPath.objects.filter(descendant_id=user_id).select_related('ancestor').order_by('depth'))
+
+
+def get_stats(user_id):
+    """A user's ReferrerStats, or an unsaved zero row if they have never referred anyone."""
+    return ReferrerStats.objects.filter(user_id=user_id).first() or ReferrerStats(user_id=user_id)
+
+
+def leaderboard(metric='bonus_total', limit=10):
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown leaderboard metric: {metric}")
+    return list(
+        ReferrerStats.objects.select_related('user')
+        .filter(**{f'{metric}__gt': 0})
+        .order_by(f'-{metric}', 'user_id')[:limit]
+    )
+
+
+def build_referral_graph(Referral, ReferralBonus, ReferralPath, ReferrerStats):
+    """
+    Recompute the closure table and stats from Referral and ReferralBonus.
+
+    Takes the model classes so data migrations can pass historical models.
+    Paths are built one depth level at a time with a single join per level.
+    """
+    ReferralPath.objects.all().delete()
+    ReferrerStats.objects.all().delete()
+
+    level = Referral.objects.values_list('referrer_id', 'referred_user_id')
+    depth = 1
+    while depth <= MAX_DEPTH:
+        batch, created = [], 0
+        for ancestor_id, descendant_id in level.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            if ancestor_id == descendant_id:
+                continue
+            batch.append(ReferralPath(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                created += len(ReferralPath.objects.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        created += len(ReferralPath.objects.bulk_create(batch, ignore_conflicts=True))
+        if not created:
+            break
+        # Next level: extend every path ending at depth `depth` by one referral
+        level = ReferralPath.objects.filter(
+            depth=depth, descendant__referrals_made__isnull=False
+        ).values_list('ancestor_id', 'descendant__referrals_made__referred_user_id')
+        depth += 1
+
+    stats = {}
+    reach = ReferralPath.objects.values('ancestor_id').annotate(
+        total=Count('id'), direct=Count('id', filter=Q(depth=1))
+    ).order_by()
+    for row in reach.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        stats[row['ancestor_id']] = ReferrerStats(
+            user_id=row['ancestor_id'], direct_referrals=row['direct'], total_downline=row['total']
+        )
+    bonuses = ReferralBonus.objects.values('referrer_id').annotate(n=Count('id'), total=Sum('bonus_amount')).order_by()
+    for row in bonuses.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        entry = stats.setdefault(row['referrer_id'], ReferrerStats(user_id=row['referrer_id']))
+        entry.bonus_count = row['n']
+        entry.bonus_total = row['total']
+    ReferrerStats.objects.bulk_create(stats.values(), batch_size=REBUILD_BATCH_SIZE)
+    return len(stats)
+
+
+def rebuild_referral_graph():
+    with transaction.atomic():
+        return build_referral_graph(Referral, ReferralBonus, ReferralPath, ReferrerStats)
@@ -1,8 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
+from django.core.cache import cache
 from django.dispatch import receiver
 from .models import User, Referral, ReferralBonus, Profile
-from booking.models import Booking
-from decimal import Decimal
+from .ledger import award_signup_referral_bonus
+from .backends import user_cache_key
+from .referral_graph import record_bonus, record_referral
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -15,46 +17,12 @@ def handle_referral_bonus(sender, instance, created, **kwargs):
     if created:
         try:
             referral = instance.referral_received
-            referrer = referral.referrer
-            referrer.credits += 1000
-            referrer.save()
+            award_signup_referral_bonus(referral.referrer_id, instance.id)
         except Referral.DoesNotExist:
             # No referral exists for this user
             pass
 
 
-@receiver(post_save, sender=Booking)
-def handle_booking_referral_bonus(sender, instance, **kwargs):
-    """
-    Trigger referral bonus logic when a booking's delivery cost is set.
-    """
-    if instance.delivery_cost > 0:  # Only trigger if delivery cost is set
-        user = instance.client  # Use the correct field (e.g., 'client')
-        try:
-            referral = user.referral_received
-            referrer = referral.referrer
-
-            # Explicitly convert delivery_cost to Decimal
-            delivery_cost = Decimal(str(instance.delivery_cost))  # Convert to string first, then to Decimal
-
-            # Calculate the bonus_amount using Decimal arithmetic
-            bonus_amount = delivery_cost * Decimal('0.015')  # Use Decimal for calculations
-
-            # Add the bonus_amount to the referrer's credits
-            referrer.credits += bonus_amount
-            referrer.save()
-
-            # Create a ReferralBonus record
-            ReferralBonus.objects.create(
-                referrer=referrer,
-                booking_cost=delivery_cost,  # Use the Decimal value
-                bonus_amount=bonus_amount
-            )
-        except AttributeError:
-            # Handle the case where the user has no referral_received
-            pass
-
-
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
@@ -69,4 +37,28 @@ def save_user_profile(sender, instance, **kwargs):
     Signal to save the Profile object whenever the User object is saved.
     """
     instance.profile.save()
-    
\ No newline at end of file
+    
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_login_user(sender, instance, **kwargs):
+    """
+    Drop the user from EmailBackend's login cache whenever the row changes.
+    """
+    cache.delete(user_cache_key(instance.email))
+
+
+@receiver(post_save, sender=Referral)
+def update_referral_graph(sender, instance, created, **kwargs):
+    """
+    Extend the referral closure table and the referrers' totals.
+    """
+    if created:
+        record_referral(instance.referrer_id, instance.referred_user_id)
+
+
+@receiver(post_save, sender=ReferralBonus)
+def update_referrer_bonus_totals(sender, instance, created, **kwargs):
+    if created:
+        record_bonus(instance.referrer_id, instance.bonus_amount)
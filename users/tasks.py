@@ -0,0 +1,8 @@
+from celery import shared_task
+from .ledger import take_balance_snapshots
+
+
+@shared_task
+def take_credit_snapshots_task():
+    """Snapshot credit balances so ledger reads only sum recent entries"""
+    return take_balance_snapshots()
@@ -1,3 +1,142 @@
-from django.test import TestCase
+import re
+from decimal import Decimal
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.core import mail
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from .backends import user_cache_key
+from .credentials import SEND_LIMIT_PER_IP, allow_code_send, client_ip, consume_reset_token, issue_reset_token
+from .ledger import InsufficientCredits, award_signup_referral_bonus, credit, debit, ledger_balance, take_balance_snapshots
+from .models import CreditEntry, User
 
-# Create your tests here.
+
+class ClientIpTests(TestCase):
+    def request(self, forwarded=None):
+        extra = {'HTTP_X_FORWARDED_FOR': forwarded} if forwarded else {}
+        return RequestFactory().get('/', REMOTE_ADDR='10.0.0.2', **extra)
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_forwarded_header_ignored_without_proxies(self):
+        self.assertEqual(client_ip(self.request('1.2.3.4')), '10.0.0.2')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_spoofed_entries_left_of_the_proxy_are_ignored(self):
+        self.assertEqual(client_ip(self.request('6.6.6.6, 203.0.113.9')), '203.0.113.9')
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_short_header_falls_back_to_remote_addr(self):
+        self.assertEqual(client_ip(self.request('203.0.113.9')), '10.0.0.2')
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ledger@example.com', username='ledger', password='x')
+
+    def balance(self):
+        self.user.refresh_from_db()
+        return self.user.credits
+
+    def test_referenced_credit_is_applied_once(self):
+        self.assertIsNotNone(credit(self.user.id, '250', CreditEntry.ADJUSTMENT, reference='adjustment:1'))
+        self.assertIsNone(credit(self.user.id, '250', CreditEntry.ADJUSTMENT, reference='adjustment:1'))
+        self.assertEqual(self.balance(), Decimal('250.00'))
+        self.assertEqual(CreditEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_unreferenced_credits_all_apply(self):
+        credit(self.user.id, '100', CreditEntry.ADJUSTMENT)
+        credit(self.user.id, '100', CreditEntry.ADJUSTMENT)
+        self.assertEqual(self.balance(), Decimal('200.00'))
+
+    def test_signup_bonus_is_paid_once_per_referred_user(self):
+        award_signup_referral_bonus(self.user.id, 42)
+        award_signup_referral_bonus(self.user.id, 42)
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+    def test_debit_never_overdraws(self):
+        credit(self.user.id, '100', CreditEntry.ADJUSTMENT)
+        with self.assertRaises(InsufficientCredits):
+            debit(self.user.id, '100.01', CreditEntry.WITHDRAWAL, reference='withdrawal:1')
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertFalse(CreditEntry.objects.filter(entry_type=CreditEntry.WITHDRAWAL).exists())
+
+    def test_ledger_balance_matches_stored_balance(self):
+        credit(self.user.id, '300', CreditEntry.ADJUSTMENT)
+        debit(self.user.id, '120.50', CreditEntry.WITHDRAWAL, reference='withdrawal:2')
+        self.assertEqual(ledger_balance(self.user.id), self.balance())
+
+    def test_late_committing_entry_reaches_a_snapshot(self):
+        CreditEntry.objects.create(id=1000, user=self.user, amount=Decimal('50.00'), entry_type=CreditEntry.ADJUSTMENT)
+        self.assertEqual(take_balance_snapshots(), 1)
+        # Allocated a lower id, but committed after the snapshot above
+        CreditEntry.objects.create(id=500, user=self.user, amount=Decimal('20.00'), entry_type=CreditEntry.ADJUSTMENT)
+        self.assertEqual(take_balance_snapshots(), 1)
+        self.assertEqual(take_balance_snapshots(), 0)
+        self.assertEqual(self.user.credit_snapshots.order_by('-id').first().balance, Decimal('70.00'))
+        self.assertEqual(ledger_balance(self.user.id), Decimal('70.00'))
+
+
+class ResetTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reset@example.com', username='reset', password='old-pass-123')
+
+    def reset(self, token, password='new-pass-456'):
+        return self.client.post(reverse('reset-password'), {
+            'token': token, 'new_password': password, 'confirm_password': password,
+        })
+
+    def test_emailed_token_resets_password_once(self):
+        self.client.post(reverse('forgot-password'), {'email': self.user.email})
+        token = re.search(r'password: (\S+)\.', mail.outbox[0].body).group(1)
+
+        self.assertRedirects(self.reset(token), reverse('login'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass-456'))
+
+        self.assertRedirects(self.reset(token, 'other-pass-789'), reverse('reset-password'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass-456'))
+
+    def test_new_token_revokes_the_previous_one(self):
+        first = issue_reset_token(self.user.id)
+        second = issue_reset_token(self.user.id)
+        self.assertIsNone(consume_reset_token(first))
+        self.assertEqual(consume_reset_token(second), self.user.id)
+
+    def test_unknown_token_is_rejected(self):
+        self.assertIsNone(consume_reset_token('not-a-token'))
+        self.assertIsNone(consume_reset_token(''))
+
+
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='secret')
+        self.request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='10.0.0.1')
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+    def test_cache_holds_only_id_and_active_flag(self):
+        self.assertEqual(authenticate(self.request, email='CLIENT@example.com', password='secret'), self.user)
+        self.assertEqual(cache.get(user_cache_key(self.user.email)), (self.user.pk, True))
+        self.assertEqual(authenticate(self.request, email='client@example.com', password='secret'), self.user)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(self.request, email='client@example.com', password='secret'))
+        self.assertEqual(cache.get(user_cache_key(self.user.email)), (self.user.pk, False))
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_iterations_never_drop_below_django_default(self):
+        self.assertEqual(get_hasher().iterations, PBKDF2PasswordHasher.iterations)
+
+
+class CodeSendLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sends_refused_by_the_ip_limit_are_not_charged_to_the_email(self):
+        for n in range(SEND_LIMIT_PER_IP[0]):
+            self.assertTrue(allow_code_send('otp', f'user{n}@example.com', '10.0.0.1'))
+        for _ in range(5):
+            self.assertFalse(allow_code_send('otp', 'client@example.com', '10.0.0.1'))
+        self.assertTrue(allow_code_send('otp', 'client@example.com', '10.0.0.2'))
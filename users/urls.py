@@ -6,6 +6,7 @@ from .views import (RegisterView, VerifyEmailView,
     ProfileUpdateView, ReferralView,
     admin_create_user, admin_delete_user,
     AdminUserListView, AdminUserDetailView,
+    AdminReferralLeaderboardView,
 
 )
 
@@ -29,6 +30,7 @@ urlpatterns = [
     path('admin/users/', AdminUserListView.as_view(), name='admin_users_list'),
     path('admin/users/<int:pk>/', AdminUserDetailView.as_view(), name='admin_user_detail'),
     path('admin/users/<int:pk>/delete/', admin_delete_user, name='admin_delete_user'),
+    path('admin/referrals/', AdminReferralLeaderboardView.as_view(), name='admin_referral_leaderboard'),
     
 ]
 
@@ -1,4 +1,4 @@
-import random
+import secrets
 import string
 from typing import Optional
 
@@ -15,5 +15,5 @@ def generate_random_otp(length: int = 6) -> str:
     if length <= 0:
         raise ValueError("OTP length must be greater than 0.")
     
-    otp = ''.join(random.choices(string.digits, k=length))  # Generates a 6-digit OTP
+    otp = ''.join(secrets.choice(string.digits) for _ in range(length))  # Generates a 6-digit OTP
     return otp
\ No newline at end of file
@@ -8,7 +8,7 @@ from django.views import View
 from django.views.generic import FormView, DetailView, ListView
 from django.urls import reverse_lazy
 from .forms import RegisterForm, LoginForm, OTPForm, ForgotPasswordForm, ResetPasswordForm, ProfileForm, AdminUserCreationForm
-from .models import User, OTP, PasswordResetToken, Profile, Referral
+from .models import User, Profile, Referral
 from subscriptions.models import SubscriptionPlan, UserSubscription
 from .emails import send_otp_email
 from googleapiclient.discovery import build
@@ -17,7 +17,9 @@ from email.mime.text import MIMEText
 from datetime import timedelta
 from django.utils import timezone
 from django.conf import settings
-from .utils import generate_random_otp
+from .credentials import allow_code_send, client_ip, consume_reset_token, issue_otp, issue_reset_token, verify_otp
+from .ledger import award_signup_referral_bonus
+from . import referral_graph
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.core.exceptions import PermissionDenied
@@ -131,9 +133,12 @@ class RegisterView(View):
                 user_data['is_staff'] = True
                 user_data['is_superuser'] = True
 
+            if not allow_code_send('otp', user_data['email'], client_ip(request)):
+                messages.error(request, "Too many verification codes requested. Please try again later.")
+                return render(request, self.template_name, {'form': form})
+
             request.session['user_data'] = user_data
-            otp = get_random_string(length=6, allowed_chars='0123456789')
-            request.session['otp'] = otp
+            otp = issue_otp(user_data['email'])
             
             # Send OTP using SendGrid
             email_sent = send_otp_email(
@@ -161,12 +166,12 @@ class VerifyEmailView(FormView):
 
     def form_valid(self, form):
         otp = form.cleaned_data.get('otp')
-        session_otp = self.request.session.get('otp')
-        if otp == session_otp:
-            user_data = self.request.session.get('user_data')
-            if not user_data:
-                form.add_error(None, 'User data not found. Please register again.')
-                return self.form_invalid(form)
+        user_data = self.request.session.get('user_data')
+        if not user_data:
+            form.add_error(None, 'User data not found. Please register again.')
+            return self.form_invalid(form)
+
+        if verify_otp(user_data['email'], otp):
 
             # Create user in the database now
             user = User.objects.create_user(
@@ -196,20 +201,18 @@ class VerifyEmailView(FormView):
                     # Create the Referral object
                     Referral.objects.create(referrer=referrer, referred_user=user)
                     # Credit the referrer with #1000
-                    referrer.credits += 1000
-                    referrer.save()
+                    award_signup_referral_bonus(referrer.id, user.id)
                     messages.success(self.request, f"Referral successful! {referrer.email} has been credited with #1000.")
                 except User.DoesNotExist:
                     messages.warning(self.request, "Invalid referral code. Proceeding without referral.")
 
             # Clear session data
             del self.request.session['user_data']
-            del self.request.session['otp']
 
             messages.success(self.request, "Your email has been verified! You can now log in.")
             return super().form_valid(form)
         else:
-            form.add_error('otp', 'Invalid OTP')
+            form.add_error('otp', 'Invalid or expired OTP')
             return self.form_invalid(form)       
                              
 
@@ -228,6 +231,9 @@ class ReferralView(View):
         context = {
             'referral_link': referral_link,
             'referral_code': referral_code,
+            'referral_stats': referral_graph.get_stats(user.id),
+            'downline_levels': referral_graph.downline_levels(user.id),
+            'recent_referrals': referral_graph.downline(user.id, max_depth=1, limit=20),
         }
         return render(request, self.template_name, context)
 
@@ -244,17 +250,17 @@ class ResendOTPView(View):
             messages.error(request, "Email is required.")
             return redirect('resend-otp')
 
-        try:
-            user = get_object_or_404(User, email=email)
-        except User.DoesNotExist:
-            messages.error(request, "User with this email does not exist.")
+        # Codes are only issued for the registration waiting in this session
+        user_data = request.session.get('user_data')
+        if not user_data or user_data['email'].lower() != email.strip().lower():
+            messages.error(request, "No pending registration for this email. Please register again.")
             return redirect('resend-otp')
 
-        otp = generate_random_otp()
-        otp_instance, created = OTP.objects.update_or_create(
-            user=user,
-            defaults={'otp': otp, 'created_at': timezone.now()}
-        )
+        if not allow_code_send('otp', email, client_ip(request)):
+            messages.error(request, "Too many verification codes requested. Please try again later.")
+            return redirect('resend-otp')
+
+        otp = issue_otp(user_data['email'])
 
         # Send OTP using SendGrid
         email_sent = send_otp_email(
@@ -325,10 +331,11 @@ class ForgotPasswordView(View):
                 messages.error(request, "No user found with this email.")
                 return redirect('forgot-password')
 
-            token = get_random_string(length=20)
-            expiry_date = timezone.now() + timedelta(hours=1)  # Token valid for 1 hour
+            if not allow_code_send('reset', email, client_ip(request)):
+                messages.error(request, "Too many reset requests. Please try again later.")
+                return redirect('forgot-password')
 
-            PasswordResetToken.objects.create(user=user, token=token, expiry_date=expiry_date)
+            token = issue_reset_token(user.id)  # Token valid for 1 hour
 
             send_mail(
                 'Password Reset Request',
@@ -355,21 +362,15 @@ class ResetPasswordView(View):
             token = form.cleaned_data.get('token')
             new_password = form.cleaned_data.get('new_password')
 
-            try:
-                reset_token = PasswordResetToken.objects.get(token=token)
-            except PasswordResetToken.DoesNotExist:
-                messages.error(request, "Invalid or non-existent token.")
-                return redirect('reset-password')
-
-            if reset_token.expiry_date < timezone.now():
-                messages.error(request, "Token has expired. Request a new one.")
+            user_id = consume_reset_token(token)
+            if user_id is None:
+                messages.error(request, "Invalid or expired token. Request a new one.")
                 return redirect('reset-password')
 
-            user = reset_token.user
+            user = get_object_or_404(User, pk=user_id)
             user.set_password(new_password)
             user.save()
 
-            reset_token.delete()
             messages.success(request, "Password reset successful.")
             return redirect('login')
 
@@ -471,8 +472,26 @@ class AdminUserDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['user'] = self.get_object()
+        context['referral_stats'] = referral_graph.get_stats(self.object.id)
+        context['downline_levels'] = referral_graph.downline_levels(self.object.id)
+        context['upline'] = referral_graph.upline(self.object.id)
         return context
 
+
+@method_decorator([login_required, user_type_required('admin')], name='dispatch')
+class AdminReferralLeaderboardView(View):
+    template_name = 'users/admin/referral_leaderboard.html'
+
+    def get(self, request, *args, **kwargs):
+        metric = request.GET.get('metric', 'bonus_total')
+        if metric not in referral_graph.LEADERBOARD_METRICS:
+            metric = 'bonus_total'
+        context = {
+            'metric': metric,
+            'leaders': referral_graph.leaderboard(metric, limit=50),
+        }
+        return render(request, self.template_name, context)
+
 @user_passes_test(is_admin)
 def admin_delete_user(request, pk):
     user = get_object_or_404(User, pk=pk)